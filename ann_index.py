@@ -0,0 +1,88 @@
+"""Approximate nearest-neighbour index types for faiss_index.
+
+The flat index.faiss stays the source of truth (the incremental builder edits
+it); an ANN index is derived from it and written next to it as
+index.<type>.faiss, with vectors added in the same order so FAISS positions
+still line up with the docstore.
+"""
+import os
+import math
+
+INDEX_TYPES = ('flat', 'ivf', 'hnsw', 'ivfpq')
+
+# Serving configuration
+FAISS_INDEX_TYPE = os.environ.get('FAISS_INDEX_TYPE', 'flat')
+FAISS_NPROBE = int(os.environ.get('FAISS_NPROBE', '8'))
+FAISS_EF_SEARCH = int(os.environ.get('FAISS_EF_SEARCH', '64'))
+
+# Build configuration
+FAISS_NLIST = int(os.environ.get('FAISS_NLIST', '0'))  # 0 picks ~4*sqrt(n)
+FAISS_HNSW_M = int(os.environ.get('FAISS_HNSW_M', '32'))
+FAISS_HNSW_EF_CONSTRUCTION = int(os.environ.get('FAISS_HNSW_EF_CONSTRUCTION', '200'))
+FAISS_PQ_M = int(os.environ.get('FAISS_PQ_M', '48'))  # sub-quantizers, must divide the dimension
+FAISS_PQ_NBITS = int(os.environ.get('FAISS_PQ_NBITS', '8'))
+
+
+def ann_index_path(index_dir, index_type):
+    return os.path.join(index_dir, f"index.{index_type}.faiss")
+
+
+def is_ann_index_file(name):
+    return name.startswith('index.') and name.endswith('.faiss') and name != 'index.faiss'
+
+
+def default_nlist(n):
+    # Rule of thumb ~4*sqrt(n), while keeping at least ~39 training points per list
+    return max(1, min(int(4 * math.sqrt(n)), n // 39))
+
+
+def build_ann_index(flat_index, index_type, nlist=FAISS_NLIST, hnsw_m=FAISS_HNSW_M,
+                    ef_construction=FAISS_HNSW_EF_CONSTRUCTION, pq_m=FAISS_PQ_M, pq_nbits=FAISS_PQ_NBITS):
+    """Build an index of the given type holding the same vectors, in the same order, as flat_index."""
+    import faiss
+
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{index_type}', expected one of {', '.join(INDEX_TYPES)}")
+    vectors = flat_index.reconstruct_n(0, flat_index.ntotal)
+    dim = flat_index.d
+
+    if index_type == 'flat':
+        index = faiss.IndexFlatL2(dim)
+    elif index_type == 'hnsw':
+        index = faiss.IndexHNSWFlat(dim, hnsw_m)
+        index.hnsw.efConstruction = ef_construction
+    else:
+        nlist = nlist or default_nlist(len(vectors))
+        quantizer = faiss.IndexFlatL2(dim)
+        if index_type == 'ivf':
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist)
+        else:
+            if dim % pq_m:
+                raise ValueError(f"FAISS_PQ_M={pq_m} must divide the vector dimension {dim}")
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, pq_m, pq_nbits)
+        index.train(vectors)
+    index.add(vectors)
+    return index
+
+
+def apply_search_params(index, nprobe=FAISS_NPROBE, ef_search=FAISS_EF_SEARCH):
+    import faiss
+
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = nprobe
+    if hasattr(index, 'hnsw'):
+        index.hnsw.efSearch = ef_search
+    return index
+
+
+def load_ann_index(index_dir, read_index, index_type=FAISS_INDEX_TYPE):
+    """Return the configured ANN index, or None to keep serving the flat index."""
+    if index_type == 'flat':
+        return None
+    path = ann_index_path(index_dir, index_type)
+    if not os.path.exists(path):
+        print(f"FAISS_INDEX_TYPE={index_type} but {path} does not exist, using the flat index "
+              f"(build it with 'python build_index.py --index-type {index_type}')")
+        return None
+    return apply_search_params(read_index(path))
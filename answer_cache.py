@@ -0,0 +1,215 @@
+import os
+import json
+import time
+import atexit
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+
+# Semantic answer cache settings
+ANSWER_CACHE_PATH = os.environ.get('ANSWER_CACHE_PATH', 'answer_cache.json')
+ANSWER_CACHE_THRESHOLD = float(os.environ.get('ANSWER_CACHE_THRESHOLD', '0.95'))  # cosine similarity
+ANSWER_CACHE_MAX_ENTRIES = int(os.environ.get('ANSWER_CACHE_MAX_ENTRIES', '2000'))
+ANSWER_CACHE_TTL = int(os.environ.get('ANSWER_CACHE_TTL', str(24 * 3600)))  # seconds
+# Persist after this many new answers, or this many seconds after the first
+# unsaved one (and always on shutdown); saves run on a background thread
+ANSWER_CACHE_SAVE_EVERY = int(os.environ.get('ANSWER_CACHE_SAVE_EVERY', '20'))
+ANSWER_CACHE_SAVE_INTERVAL = float(os.environ.get('ANSWER_CACHE_SAVE_INTERVAL', '60'))
+
+
+def index_fingerprint(persist_directory):
+    # Changes whenever the FAISS index is rebuilt, which invalidates cached answers
+    digest = hashlib.sha1()
+    for name in ('index.faiss', 'index.pkl', 'docstore.sqlite'):
+        path = os.path.join(persist_directory, name)
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(chunk)
+    return digest.hexdigest()
+
+
+def context_fingerprint(documents):
+    digest = hashlib.sha1()
+    for doc in documents:
+        digest.update(doc.page_content.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def conversation_fingerprint(chat_history=None, summary=None):
+    # The user's rolling summary and recent turns also go into the prompt, so an
+    # answer is only reusable for the same conversation state ('' when there is none)
+    if not chat_history and not summary:
+        return ''
+    digest = hashlib.sha1()
+    digest.update((summary or '').encode('utf-8'))
+    for message in chat_history or []:
+        digest.update(b'\0')
+        digest.update(message.type.encode('utf-8'))
+        digest.update(b'\1')
+        digest.update(message.content.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def answer_key(documents, chat_history=None, summary=None):
+    """Cache key for everything besides the question that shaped an answer."""
+    conversation = conversation_fingerprint(chat_history, summary)
+    context = context_fingerprint(documents)
+    return f"{context}:{conversation}" if conversation else context
+
+
+def _normalize(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class SemanticAnswerCache:
+    """Answers keyed on query embedding and retrieved context.
+
+    A lookup hits when a cached query is within the cosine threshold of the new
+    one and the retrieval step returned exactly the same context for both.
+    """
+
+    def __init__(self, path=ANSWER_CACHE_PATH, fingerprint=None, threshold=ANSWER_CACHE_THRESHOLD,
+                 max_entries=ANSWER_CACHE_MAX_ENTRIES, ttl=ANSWER_CACHE_TTL):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._matrix = None
+        self._keys = []
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()  # one writer to the cache file at a time
+        self._wake = threading.Event()
+        self._unsaved = 0
+        self.hits = 0
+        self.misses = 0
+        self._next_key = 0
+        self.load()
+        if self.path:
+            threading.Thread(target=self._run_saver, name='answer-cache-saver', daemon=True).start()
+        atexit.register(self.save)
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                stored = json.load(f)
+        except Exception as e:
+            print(f"Answer cache load error: {e}")
+            return
+        if stored.get('fingerprint') != self.fingerprint:
+            print("FAISS index changed, discarding cached answers")
+            return
+        now = time.time()
+        for entry in stored.get('entries', []):
+            if now - entry['created_at'] <= self.ttl:
+                entry['embedding'] = _normalize(entry['embedding'])
+                self._entries[self._new_key()] = entry
+        self._matrix = None
+        print(f"Loaded {len(self._entries)} cached answers")
+
+    def save(self):
+        if not self.path:
+            return
+        with self._save_lock:
+            with self._lock:
+                entries = list(self._entries.values())
+                fingerprint = self.fingerprint
+                self._unsaved = 0
+            # Entries are never modified in place, so they can be serialised outside the lock
+            entries = [dict(entry, embedding=entry['embedding'].tolist()) for entry in entries]
+            tmp_path = self.path + '.tmp'
+            try:
+                with open(tmp_path, 'w') as f:
+                    json.dump({'fingerprint': fingerprint, 'entries': entries}, f)
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                print(f"Answer cache save error: {e}")
+
+    def _run_saver(self):
+        while True:
+            self._wake.wait(ANSWER_CACHE_SAVE_INTERVAL)
+            self._wake.clear()
+            if self._unsaved:
+                self.save()
+
+    def _new_key(self):
+        self._next_key += 1
+        return self._next_key
+
+    def _rebuild_matrix(self):
+        self._keys = list(self._entries.keys())
+        if self._keys:
+            self._matrix = np.stack([self._entries[k]['embedding'] for k in self._keys])
+        else:
+            self._matrix = np.zeros((0, 0), dtype=np.float32)
+
+    def lookup(self, embedding, context_key):
+        query = _normalize(embedding)
+        with self._lock:
+            if self._matrix is None:
+                self._rebuild_matrix()
+            if not self._keys:
+                self.misses += 1
+                return None
+            scores = self._matrix @ query
+            now = time.time()
+            for i in np.argsort(-scores):
+                if scores[i] < self.threshold:
+                    break
+                key = self._keys[i]
+                entry = self._entries.get(key)
+                if entry is None or entry['context_key'] != context_key:
+                    continue
+                if now - entry['created_at'] > self.ttl:
+                    continue
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry['answer']
+            self.misses += 1
+            return None
+
+    def put(self, query, embedding, context_key, answer):
+        with self._lock:
+            self._entries[self._new_key()] = {
+                'query': query,
+                'embedding': _normalize(embedding),
+                'context_key': context_key,
+                'answer': answer,
+                'created_at': time.time()
+            }
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+            self._unsaved += 1
+            should_save = self._unsaved >= ANSWER_CACHE_SAVE_EVERY
+        if should_save:
+            self._wake.set()
+
+    def invalidate(self, fingerprint=None):
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+            if fingerprint is not None:
+                self.fingerprint = fingerprint
+        self.save()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'threshold': self.threshold,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
@@ -340,18 +340,32 @@
 #     app.run(debug=True, port=4000)
 
 
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify, send_from_directory, Response, stream_with_context, g
 from flask_cors import CORS
 import os
 import json
 from bson import ObjectId
 from datetime import datetime
-import asyncio
+import time
+import atexit
+import signal
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from langchain_core.messages import HumanMessage, AIMessage
-from openai import OpenAI  # OpenRouter uses the OpenAI-compatible API
-from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import HuggingFaceEmbeddings
 from pymongo import MongoClient
+from answer_cache import SemanticAnswerCache, index_fingerprint, context_fingerprint, answer_key
+from embeddings import CachedEmbeddings, BatchingEmbeddings, load_embedding_model, normalize_query, EMBEDDING_BATCHING, EMBEDDING_BACKEND
+from docstore import load_vectorstore
+from curated import load_curated_answers, direct_answer
+from llm_gateway import LLMGateway, LLMDeadlineExceeded, LLM_DEADLINE_SECONDS
+from singleflight import SingleFlight
+from dashboard_jobs import DashboardRefresher, RefreshQueueFull
+from dashboard_history import record_scrape, attendance_series, dashboard_changes, ensure_indexes as ensure_dashboard_indexes
+from retrieval import BM25Index, is_lexically_decisive, reciprocal_rank_fusion, HYBRID_RETRIEVAL, LEXICAL_FAST_PATH
+from write_behind import WriteBehindQueue
+from metrics import span, start_request, request_spans, log_json, register_collector, render as render_metrics, HTTP_REQUEST_SECONDS
+from chat_memory import load_recent_turns, build_window, load_summary, update_summary, load_history_page, decode_history_cursor, ConversationCache, HISTORY_TOKEN_BUDGET, SUMMARY_BATCH_TURNS
 
 app = Flask(__name__, static_folder='build')
 CORS(app, resources={
@@ -366,85 +380,274 @@ def add_header(response):
     response.headers['Expires'] = '0'
     return response
 
-# MongoDB connection
-try:
-    client = MongoClient('mongodb://localhost:27017/')
-    db = client['campus-genie']
-    chat_history_collection = db['chat_history']
-    users_collection = db['users']
-    # Test the connection
-    client.admin.command('ping')
-    print("Successfully connected to MongoDB")
-except Exception as e:
-    print(f"Error connecting to MongoDB: {e}")
-    raise
-
-# Create indexes for chat history
-try:
-    chat_history_collection.create_index([('user_id', 1), ('timestamp', -1)])
-    print("Created index on chat_history collection")
-except Exception as e:
-    print(f"Error creating index: {e}")
+# Every request gets an id (the caller's X-Request-ID if it sent one) that
+# tags its JSON log line, along with the time spent in each stage
+@app.before_request
+def begin_request():
+    g.request_id = start_request(request.headers.get('X-Request-ID'))
+    g.started = time.perf_counter()
+
+@app.after_request
+def log_request(response):
+    seconds = time.perf_counter() - g.started
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    HTTP_REQUEST_SECONDS.observe(seconds, endpoint, request.method, str(response.status_code))
+    response.headers['X-Request-ID'] = g.request_id
+    if endpoint != '/metrics':
+        log_json('request', method=request.method, path=request.path, status=response.status_code,
+                 duration_ms=round(seconds * 1000, 2), spans=request_spans())
+    return response
+
+# Set EAGER_STARTUP=1 to load everything before serving (the old behaviour);
+# by default the model and index load on a background thread behind /readyz
+EAGER_STARTUP = os.environ.get('EAGER_STARTUP', '0') == '1'
+# How long a chat request waits for retrieval to finish loading before giving up
+RETRIEVAL_WAIT_SECONDS = float(os.environ.get('RETRIEVAL_WAIT_SECONDS', '30'))
+
+# MongoDB connection (MongoClient connects lazily, the ping runs during startup);
+# MONGO_DB lets benchmarks/load_test.py point the app at a throwaway database
+MONGO_URI = os.environ.get('MONGO_URI', 'mongodb://localhost:27017/')
+MONGO_DB = os.environ.get('MONGO_DB', 'campus-genie')
+client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
+db = client[MONGO_DB]
+chat_history_collection = db['chat_history']
+users_collection = db['users']
+chat_summary_collection = db['chat_summaries']
+
+# Chat inserts and ratings are acknowledged immediately and written to Mongo in batches
+chat_writes = WriteBehindQueue(chat_history_collection)
+atexit.register(chat_writes.close)
+chat_writes.close_on_sigterm()
+dashboard_snapshot_collection = db['dashboard_snapshots']
+
+startup_state = {
+    'mongo': False,
+    'retrieval': False,
+    'errors': {},
+    'started_at': time.time(),
+    'ready_after_seconds': None
+}
+retrieval_ready = threading.Event()
+
+def connect_mongo():
+    try:
+        # Test the connection
+        client.admin.command('ping')
+        print("Successfully connected to MongoDB")
+    except Exception as e:
+        print(f"Error connecting to MongoDB: {e}")
+        startup_state['errors']['mongo'] = str(e)
+        return
+    # Create indexes for chat history
+    try:
+        # _id breaks timestamp ties so history pages are a single index walk
+        chat_history_collection.create_index([('user_id', 1), ('timestamp', -1), ('_id', -1)])
+        chat_summary_collection.create_index('user_id', unique=True)
+        ensure_dashboard_indexes(db)
+        print("Created index on chat_history collection")
+    except Exception as e:
+        print(f"Error creating index: {e}")
+    startup_state['mongo'] = True
 
 # Set the OpenRouter API key securely
-OPENROUTER_API_KEY = "#"
+OPENROUTER_API_KEY = os.environ.get('OPENROUTER_API_KEY', "#")
 
-# Initialize OpenRouter client
-openrouter_client = OpenAI(
-    base_url="https://openrouter.ai/api/v1",
-    api_key=OPENROUTER_API_KEY,
-)
+# Pooled async OpenRouter client (OpenAI-compatible API) with deadlines, retries and hedging
+llm_gateway = LLMGateway(api_key=OPENROUTER_API_KEY)
 
-# Load the embedding function (HuggingFaceEmbeddings)
-embedding_function = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+# Identical questions over the same context that arrive together share one LLM call
+llm_flights = SingleFlight(wait_timeout=LLM_DEADLINE_SECONDS + 5)
 
 # Load the FAISS vector store from the persisted directory
 persist_directory = "./faiss_index"
 if not os.path.exists(persist_directory):
     raise FileNotFoundError(f"The directory '{persist_directory}' does not exist. Please ensure the 'faiss_index' folder is in the same directory as this script.")
 
-vectorstore = FAISS.load_local(
-    persist_directory,
-    embeddings=embedding_function,
-    allow_dangerous_deserialization=True  # Only enable if you trust the source
-)
+# Set by load_retrieval() once the model and index are usable
+embedding_function = None
+vectorstore = None
+bm25_index = None
+answer_cache = None
 
-print("FAISS vector store loaded successfully from './faiss_index'")
+def load_retrieval():
+    global embedding_function, vectorstore, bm25_index, answer_cache
+    try:
+        started = time.perf_counter()
+        embeddings = embedding_function
+        if embeddings is None:
+            # Load the embedding function (HuggingFaceEmbeddings or the int8 ONNX model, see
+            # EMBEDDING_BACKEND), with repeated queries served from an LRU cache and misses
+            # from concurrent requests encoded together in micro-batches
+            model = load_embedding_model()
+            print(f"Loaded '{EMBEDDING_BACKEND}' embedding backend")
+            embeddings = CachedEmbeddings(BatchingEmbeddings(model) if EMBEDDING_BATCHING else model)
+        # Warm up the model outside the cache so the first real query isn't slow; on a
+        # reload the model and its batcher are kept, only the index, docstore and BM25 change
+        warmup_vector = embeddings.embeddings.embed_query("What is the EAPCET code for KMIT?")
+
+        # Memory-maps index.faiss and reads documents from the SQLite docstore on demand
+        store = load_vectorstore(persist_directory, embeddings)
+        store.similarity_search_by_vector(warmup_vector, k=1)
+        print("FAISS vector store loaded successfully from './faiss_index'")
+
+        # Keyword index over the same documents for hybrid retrieval
+        lexical_index = BM25Index.from_vectorstore(store) if HYBRID_RETRIEVAL else None
+
+        # Answers for near-duplicate questions, dropped whenever faiss_index is rebuilt
+        fingerprint = index_fingerprint(persist_directory)
+        cache = answer_cache or SemanticAnswerCache(fingerprint=fingerprint)
+
+        embedding_function, vectorstore, bm25_index, answer_cache = embeddings, store, lexical_index, cache
+        if cache.fingerprint != fingerprint:
+            # A rebuilt index was swapped in: answers from the old corpus no longer apply
+            cache.invalidate(fingerprint)
+            print("FAISS index changed, discarded cached answers")
+        if not retrieval_ready.is_set():
+            startup_state['retrieval'] = True
+            startup_state['ready_after_seconds'] = round(time.time() - startup_state['started_at'], 2)
+            retrieval_ready.set()
+        print(f"Retrieval ready in {time.perf_counter() - started:.1f}s")
+    except Exception as e:
+        print(f"Error loading retrieval: {e}")
+        startup_state['errors']['retrieval'] = str(e)
+
+def reload_retrieval(signum=None, frame=None):
+    # kill -HUP after build_index.py swaps in a rebuilt faiss_index; requests keep
+    # using the old index until the new one has loaded
+    threading.Thread(target=load_retrieval, name='retrieval-reload', daemon=True).start()
+
+if hasattr(signal, 'SIGHUP'):
+    try:
+        signal.signal(signal.SIGHUP, reload_retrieval)
+    except ValueError:
+        pass  # Imported off the main thread; reload by restarting instead
+
+def start_background_loading():
+    if EAGER_STARTUP:
+        connect_mongo()
+        load_retrieval()
+        return
+    threading.Thread(target=connect_mongo, name='mongo-startup', daemon=True).start()
+    threading.Thread(target=load_retrieval, name='retrieval-startup', daemon=True).start()
+
+# Curated Q/A pairs that can be served without calling the LLM
+curated_answers = load_curated_answers()
+print(f"Loaded {len(curated_answers)} curated answers")
+answer_path_counts = Counter()
+retrieval_mode_counts = Counter()
+
+# Recent turns per user, kept in step with chat_history_collection by the chat handlers
+conversation_cache = ConversationCache()
 
 # Define the LLM function to use the Qwen model via OpenRouter
 def llm(prompt):
-    response = openrouter_client.chat.completions.create(
-        model="qwen/qwen2.5-vl-32b-instruct:free",  # Specify the Qwen model
-        messages=[
-            {"role": "system", "content": "You are a helpful assistant."},
-            {"role": "user", "content": prompt}
-        ],
-        max_tokens=200,
-        temperature=0.7,
-    )
-    return response.choices[0].message.content
+    with span('llm'):
+        return llm_gateway.complete(prompt)
 
-# Function to get a response from the chatbot
-def get_response(query, chat_history):
-    # Perform similarity search on the vectorstore
-    search_results = vectorstore.similarity_search(query, k=4)  # Retrieve top 3 most relevant chunks
+# Same call as llm(), yielding the answer text as it is generated
+def llm_stream(prompt):
+    return llm_gateway.stream(prompt)
+
+class RetrievalNotReady(Exception):
+    pass
+
+def retrieve(query, k=4):
+    """Find the context documents for a query.
+
+    Returns (documents, scored_results, query_embedding). Short keyword queries
+    that BM25 answers decisively skip the embedding model, in which case
+    scored_results and query_embedding are None.
+    """
+    if not retrieval_ready.wait(RETRIEVAL_WAIT_SECONDS):
+        raise RetrievalNotReady("The assistant is still starting up, please try again shortly")
+
+    with span('bm25'):
+        bm25_results = bm25_index.search(query, k) if bm25_index else []
+    if LEXICAL_FAST_PATH and is_lexically_decisive(query, bm25_results):
+        retrieval_mode_counts['lexical'] += 1
+        return [vectorstore.docstore.search(vectorstore.index_to_docstore_id[position])
+                for position, _ in bm25_results], None, None
+
+    # Embed once and reuse the vector for both the search and the answer cache
+    with span('embedding'):
+        query_embedding = embedding_function.embed_query(query)
+    with span('vector_search'):
+        scored_results = vectorstore.similarity_search_with_score_by_vector(query_embedding, k=k)
+    documents = [doc for doc, _ in scored_results]
+    if not bm25_results:
+        retrieval_mode_counts['vector'] += 1
+        return documents, scored_results, query_embedding
+
+    # Reciprocal-rank fusion of the dense and keyword rankings, keyed by document text
+    lexical_documents = [vectorstore.docstore.search(vectorstore.index_to_docstore_id[position])
+                         for position, _ in bm25_results]
+    by_text = {doc.page_content: doc for doc in lexical_documents + documents}
+    fused = reciprocal_rank_fusion([
+        [doc.page_content for doc in documents],
+        [doc.page_content for doc in lexical_documents]
+    ], limit=k)
+    retrieval_mode_counts['hybrid'] += 1
+    return [by_text[text] for text in fused], scored_results, query_embedding
+
+def plan_response(query, chat_history, summary=None):
+    """Resolve everything that comes before the LLM call.
+
+    Returns a dict with 'answer' and 'answered_by' set when the curated answers
+    or the answer cache can serve the query; otherwise 'answer' is None and
+    'prompt' holds the prompt to send to the LLM.
+    """
+    # Word-for-word curated questions need neither the model nor the index
+    with span('curated_lookup'):
+        answer, answered_by = direct_answer(curated_answers, query)
+    plan = {'answer': answer, 'answered_by': answered_by, 'prompt': None,
+            'query_embedding': None, 'context_key': None, 'cache_key': None, 'flight_key': None}
+    if answer is not None:
+        return plan
+
+    search_results, scored_results, query_embedding = retrieve(query)
+    plan['query_embedding'] = query_embedding
+    plan['answer'], plan['answered_by'] = direct_answer(curated_answers, query, scored_results)
+    if plan['answer'] is not None:
+        return plan
 
     # Combine search results into a single context
     context = "\n\n".join([result.page_content for result in search_results])
+    plan['context_key'] = context_fingerprint(search_results)
+    # Cached and coalesced answers are keyed on the user's history and summary too:
+    # the prompt carries them, so one student's personalised answer never reaches another
+    plan['cache_key'] = answer_key(search_results, chat_history, summary)
+    plan['flight_key'] = (normalize_query(query), plan['cache_key'])
+
+    # Near-duplicate questions over the same context reuse the stored answer
+    # (only possible when the query was embedded)
+    if query_embedding is not None:
+        with span('answer_cache_lookup'):
+            plan['answer'] = answer_cache.lookup(query_embedding, plan['cache_key'])
+        if plan['answer'] is not None:
+            plan['answered_by'] = 'answer_cache'
+            return plan
 
     # Define the prompt template
-    prompt_template = f"""
+    plan['prompt'] = f"""
 Answer the question based only on the following context:
 {context}
 
+Conversation Summary:
+{summary or ""}
+
 Chat History:
 {" ".join([f"{msg.content}" for msg in chat_history])}
 
 Question: {query}
-Answer: """
+Answer: """.strip()
+    plan['answered_by'] = 'llm'
+    return plan
 
-    # Send the prompt to the LLM via OpenRouter
-    answer = llm(prompt_template.strip())
+def finish_response(query, plan, answer, chat_history):
+    if plan['answered_by'] == 'llm' and plan['query_embedding'] is not None:
+        with span('answer_cache_put'):
+            answer_cache.put(query, plan['query_embedding'], plan['cache_key'], answer)
+    answer_path_counts[plan['answered_by']] += 1
 
     # Update chat history
     chat_history.extend([
@@ -452,18 +655,84 @@ Answer: """
         AIMessage(content=answer)
     ])
 
-    return answer
+# Function to get a response from the chatbot
+def get_response(query, chat_history, summary=None):
+    """Answer a query and report which path produced the answer.
+
+    Returns (answer, answered_by) where answered_by is one of 'curated_exact',
+    'curated_match', 'answer_cache' or 'llm'.
+    """
+    plan = plan_response(query, chat_history, summary)
+    answer = plan['answer']
+    if answer is None:
+        # Send the prompt to the LLM via OpenRouter, unless the same question is already in flight
+        answer, shared = llm_flights.do(plan['flight_key'], lambda: llm(plan['prompt']))
+        if shared:
+            plan['answered_by'] = 'llm_coalesced'
+    finish_response(query, plan, answer, chat_history)
+    return answer, plan['answered_by']
 
-# Global variable to store dashboard data
-dashboard_data = {
-    'attendance': None,
-    'timetable': None,
-    'last_updated': None
-}
+def scraper_service():
+    # Imported on first use so the chat API starts without Playwright/sa.py loaded
+    from scraper_service import get_scraper_service
+    return get_scraper_service()
+
+# Per-student dashboard snapshots, refreshed by background scrape jobs
+dashboard_refresher = DashboardRefresher(
+    scrape=lambda mobile_number: scraper_service().scrape(mobile_number),
+    collection=dashboard_snapshot_collection,
+    save=lambda mobile_number, data: record_scrape(db, mobile_number, data)
+)
+
+def dashboard_mobile_number():
+    # Either the student's mobile number or a user whose profile has one
+    mobile_number = request.args.get('mobile_number')
+    if mobile_number:
+        return mobile_number
+    user_id = request.args.get('user_id')
+    if not user_id or user_id == 'undefined':
+        return None
+    try:
+        user = users_collection.find_one({'_id': ObjectId(user_id)}, {'mobile_number': 1})
+    except Exception:
+        return None
+    return user.get('mobile_number') if user else None
+
+def job_response(job):
+    return {
+        'job_id': job['job_id'],
+        'status': job['status'],
+        'error': job['error'],
+        'status_url': f"/api/dashboard-jobs/{job['job_id']}"
+    }
 
 @app.route('/api/dashboard-data', methods=['GET'])
 def get_dashboard_data():
-    return jsonify(dashboard_data)
+    try:
+        mobile_number = dashboard_mobile_number()
+        if not mobile_number:
+            return jsonify({'error': 'No Netra mobile number is saved for this user; enter one to load the dashboard'}), 400
+        snapshot, job = dashboard_refresher.read(mobile_number)
+        refresh = job_response(job) if job else None
+        if snapshot is None:
+            # Nothing cached yet: the client polls the job, then reads again
+            return jsonify({
+                'attendance': None,
+                'timetable': None,
+                'last_updated': None,
+                'stale': True,
+                'refresh': refresh
+            }), 202
+        return jsonify({
+            **snapshot['data'],
+            'last_updated': snapshot['updated_at'].isoformat(),
+            'age_seconds': snapshot['age_seconds'],
+            'stale': job is not None,
+            'refresh': refresh
+        })
+    except Exception as e:
+        print(f"Error reading dashboard data: {str(e)}")
+        return jsonify({'error': str(e)}), 500
 
 @app.route('/api/update-dashboard', methods=['POST'])
 def update_dashboard():
@@ -471,15 +740,46 @@ def update_dashboard():
         mobile_number = request.json.get('mobile_number')
         if not mobile_number:
             return jsonify({'error': 'Mobile number is required'}), 400
-        data = asyncio.run(login_to_kmit_netra(mobile_number))
-        dashboard_data.update(data)
-        return jsonify({
-            'message': 'Dashboard data updated successfully',
-            'data': dashboard_data
-        })
+        # The scrape runs in the background; poll the job, then read /api/dashboard-data
+        job = dashboard_refresher.submit(mobile_number)
+        return jsonify(job_response(job)), 202
+    except RefreshQueueFull as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/dashboard-history', methods=['GET'])
+def get_dashboard_history():
+    try:
+        mobile_number = dashboard_mobile_number()
+        if not mobile_number:
+            return jsonify({'error': 'mobile_number or a user_id with a mobile number is required'}), 400
+        start_day = request.args.get('from')
+        end_day = request.args.get('to')
+        response = {'series': attendance_series(db, mobile_number, start_day, end_day)}
+        if request.args.get('changes') == '1':
+            response['changes'] = dashboard_changes(db, mobile_number, start_day, end_day)
+        return jsonify(response)
     except Exception as e:
+        print(f"Error reading dashboard history: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/dashboard-jobs/<job_id>', methods=['GET'])
+def get_dashboard_job(job_id):
+    job = dashboard_refresher.get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify({
+        **job_response(job),
+        'created_at': job['created_at'],
+        'started_at': job['started_at'],
+        'finished_at': job['finished_at']
+    })
+
+@app.route('/api/scraper/health', methods=['GET'])
+def scraper_health():
+    return jsonify({**scraper_service().health(), 'refresh_jobs': dashboard_refresher.stats()})
+
 @app.route('/api/auth/login', methods=['POST', 'OPTIONS'])
 def login():
     if request.method == 'OPTIONS':
@@ -500,13 +800,37 @@ def login():
             'user': {
                 '_id': str(user['_id']),
                 'email': user['email'],
-                'name': user.get('name', '')
+                'name': user.get('name', ''),
+                'mobile_number': user.get('mobile_number')
             }
         })
     except Exception as e:
         print(f"Login error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/auth/profile', methods=['PUT'])
+def update_profile():
+    # The Netra mobile number the dashboard and cohort refresh scrape for this user
+    try:
+        data = request.json or {}
+        user_id = data.get('userId')
+        mobile_number = str(data.get('mobile_number') or '').strip()
+        if not user_id or user_id == 'undefined':
+            return jsonify({'error': 'Invalid user ID'}), 400
+        if not mobile_number.isdigit() or len(mobile_number) != 10:
+            return jsonify({'error': 'mobile_number must be 10 digits'}), 400
+        try:
+            user_id_obj = ObjectId(user_id)
+        except:
+            return jsonify({'error': 'Invalid user ID format'}), 400
+        result = users_collection.update_one({'_id': user_id_obj}, {'$set': {'mobile_number': mobile_number}})
+        if not result.matched_count:
+            return jsonify({'error': 'User not found'}), 404
+        return jsonify({'message': 'Profile updated', 'mobile_number': mobile_number})
+    except Exception as e:
+        print(f"Profile update error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/auth/profile', methods=['GET', 'OPTIONS'])
 def get_profile():
     if request.method == 'OPTIONS':
@@ -526,33 +850,93 @@ def get_profile():
             'user': {
                 '_id': str(user['_id']),
                 'email': user['email'],
-                'name': user.get('name', '')
+                'name': user.get('name', ''),
+                'mobile_number': user.get('mobile_number')
             }
         })
     except Exception as e:
         print(f"Profile error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+# Chat history pages
+HISTORY_PAGE_SIZE = int(os.environ.get('HISTORY_PAGE_SIZE', '50'))
+HISTORY_MAX_PAGE_SIZE = int(os.environ.get('HISTORY_MAX_PAGE_SIZE', '200'))
+HISTORY_SUMMARY_CHARS = int(os.environ.get('HISTORY_SUMMARY_CHARS', '160'))
+
+def serialize_chat(chat):
+    chat['_id'] = str(chat['_id'])
+    timestamp = chat.get('timestamp')
+    chat['timestamp'] = timestamp.isoformat() if isinstance(timestamp, datetime) else timestamp
+    return chat
+
+def check_history_user(user_id):
+    # Returns an error response, or None when the user exists
+    if not user_id or user_id == 'undefined':
+        return jsonify({'error': 'Invalid user ID'}), 400
+    try:
+        user_id_obj = ObjectId(user_id)
+    except:
+        return jsonify({'error': 'Invalid user ID format'}), 400
+    if not users_collection.find_one({'_id': user_id_obj}, {'_id': 1}):
+        return jsonify({'error': 'User not found'}), 404
+    return None
+
 @app.route('/api/chat/history/<user_id>', methods=['GET'])
 def get_chat_history(user_id):
+    """Newest-first page of a user's chats: ?limit=&before=<next_cursor>&fields=summary"""
     try:
-        if not user_id or user_id == 'undefined':
-            return jsonify({'error': 'Invalid user ID'}), 400
+        error = check_history_user(user_id)
+        if error:
+            return error
         try:
-            user_id_obj = ObjectId(user_id)
+            limit = min(max(int(request.args.get('limit', HISTORY_PAGE_SIZE)), 1), HISTORY_MAX_PAGE_SIZE)
+        except ValueError:
+            return jsonify({'error': 'limit must be a number'}), 400
+        before = request.args.get('before')
+        if before:
+            try:
+                before = decode_history_cursor(before)
+            except Exception:
+                return jsonify({'error': 'Invalid cursor'}), 400
+
+        if request.args.get('fields') == 'summary':
+            # Trim responses inside Mongo so the full text never leaves the server;
+            # legacy records with a missing or non-string response trim to ''
+            response = {'$cond': [{'$eq': [{'$type': '$response'}, 'string']}, '$response', '']}
+            projection = {
+                'query': 1,
+                'timestamp': 1,
+                'response': {'$substrCP': [response, 0, HISTORY_SUMMARY_CHARS]},
+                'response_truncated': {'$gt': [{'$strLenCP': response}, HISTORY_SUMMARY_CHARS]}
+            }
+        else:
+            projection = {'_id': 1, 'query': 1, 'response': 1, 'timestamp': 1}
+        chats, next_cursor = load_history_page(chat_history_collection, user_id, limit, before, projection)
+        return jsonify({
+            'items': [serialize_chat(chat) for chat in chats],
+            'next_cursor': next_cursor
+        })
+    except Exception as e:
+        print(f"Chat history error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/chat/history/<user_id>/<chat_id>', methods=['GET'])
+def get_chat(user_id, chat_id):
+    try:
+        error = check_history_user(user_id)
+        if error:
+            return error
+        try:
+            chat_id_obj = ObjectId(chat_id)
         except:
-            return jsonify({'error': 'Invalid user ID format'}), 400
-        user = users_collection.find_one({'_id': user_id_obj})
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
-        history = list(chat_history_collection.find(
-            {'user_id': user_id},
-            {'_id': 1, 'query': 1, 'response': 1, 'timestamp': 1}
-        ).sort('timestamp', -1))
-        for chat in history:
-            chat['_id'] = str(chat['_id'])
-            chat['timestamp'] = chat['timestamp'].isoformat() if isinstance(chat['timestamp'], datetime) else chat['timestamp']
-        return jsonify(history)
+            return jsonify({'error': 'Invalid chat ID format'}), 400
+        chat = chat_history_collection.find_one(
+            {'_id': chat_id_obj, 'user_id': user_id},
+            {'_id': 1, 'query': 1, 'response': 1, 'timestamp': 1, 'rating': 1}
+        )
+        if not chat:
+            return jsonify({'error': 'Chat not found'}), 404
+        return jsonify(serialize_chat(chat))
     except Exception as e:
         print(f"Chat history error: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -560,7 +944,13 @@ def get_chat_history(user_id):
 @app.route('/api/chat/history/<user_id>', methods=['DELETE'])
 def clear_chat_history(user_id):
     try:
+        # Queued chats would otherwise land after the delete; if some are stuck in
+        # the spill file, a later replay would bring the cleared chats back
+        if not chat_writes.flush():
+            return jsonify({'error': 'Chat history is still being saved, please try again shortly'}), 503
         result = chat_history_collection.delete_many({'user_id': user_id})
+        chat_summary_collection.delete_one({'user_id': user_id})
+        conversation_cache.invalidate(user_id)
         return jsonify({
             'message': 'Chat history cleared successfully',
             'deleted_count': result.deleted_count
@@ -568,6 +958,67 @@ def clear_chat_history(user_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Rolling summary updates, one at a time per user
+SUMMARY_WORKERS = int(os.environ.get('SUMMARY_WORKERS', '2'))
+summary_executor = ThreadPoolExecutor(max_workers=SUMMARY_WORKERS, thread_name_prefix='summary-fold')
+summary_folds = set()
+summary_folds_lock = threading.Lock()
+
+def load_turn_context(user_id):
+    # Only the newest turns that fit the token budget go into the prompt,
+    # older turns are represented by the rolling summary
+    def load():
+        # A cache miss reads Mongo, so write out any turns still queued first
+        # (cheap when nothing is queued)
+        chat_writes.flush()
+        return load_recent_turns(chat_history_collection, user_id), load_summary(chat_summary_collection, user_id)
+    history_records, summary_doc = conversation_cache.get(user_id, load)
+    chat_history, window_start = build_window(history_records, HISTORY_TOKEN_BUDGET)
+    return chat_history, window_start, summary_doc
+
+def save_turn(user_id, query, response, answered_by, window_start, summary_doc):
+    # Store in MongoDB through the write-behind queue; the _id is made here
+    # so the client can rate the message before it has been written
+    record = {
+        '_id': ObjectId(),
+        'user_id': user_id,
+        'query': query,
+        'response': response,
+        'answered_by': answered_by,
+        'timestamp': datetime.now()
+    }
+    chat_writes.insert(record)
+    turns_since_fold = conversation_cache.append(user_id, {
+        'query': query,
+        'response': response,
+        'timestamp': record['timestamp']
+    })
+    # Only look for turns to summarize once enough have dropped out of the window;
+    # the fold runs off the request path and the previous summary is used until it's done
+    if turns_since_fold >= SUMMARY_BATCH_TURNS:
+        with summary_folds_lock:
+            start = user_id not in summary_folds
+            summary_folds.add(user_id)
+        if start:
+            summary_executor.submit(fold_summary, user_id, window_start, summary_doc)
+    return record
+
+def fold_summary(user_id, window_start, summary_doc):
+    try:
+        # The summary reads evicted turns back from Mongo
+        chat_writes.flush()
+        new_summary = update_summary(chat_history_collection, chat_summary_collection,
+                                     user_id, window_start, llm_gateway.complete, summary_doc)
+        if new_summary:
+            conversation_cache.set_summary(user_id, new_summary)
+        else:
+            conversation_cache.mark_checked(user_id)
+    except Exception as e:
+        print(f"Summary update error: {str(e)}")
+    finally:
+        with summary_folds_lock:
+            summary_folds.discard(user_id)
+
 @app.route('/api/chat', methods=['POST'])
 def chat():
     try:
@@ -578,26 +1029,99 @@ def chat():
             return jsonify({'error': 'Query is required'}), 400
         if not user_id or user_id == 'undefined':
             return jsonify({'error': 'User ID is required'}), 400
-        # Get in-memory chat history for the user
-        chat_history = []
-        history_records = list(chat_history_collection.find({'user_id': user_id}))
-        for record in history_records:
-            chat_history.append(HumanMessage(content=record['query']))
-            chat_history.append(AIMessage(content=record['response']))
+        with span('history_load'):
+            chat_history, window_start, summary_doc = load_turn_context(user_id)
         # Get response using FAISS and LLM
-        response = get_response(query, chat_history)
-        # Store in MongoDB
-        chat_history_collection.insert_one({
-            'user_id': user_id,
-            'query': query,
-            'response': response,
-            'timestamp': datetime.now()
-        })
-        return jsonify({'response': response})
+        response, answered_by = get_response(query, chat_history, summary_doc.get('summary'))
+        with span('save'):
+            save_turn(user_id, query, response, answered_by, window_start, summary_doc)
+        return jsonify({'response': response, 'answered_by': answered_by})
+    except RetrievalNotReady as e:
+        return jsonify({'error': str(e)}), 503
+    except LLMDeadlineExceeded as e:
+        log_json('error', where='chat', error=str(e))
+        return jsonify({'error': str(e)}), 504
     except Exception as e:
         print(f"Chat error: {str(e)}")
+        log_json('error', where='chat', error=str(e))
         return jsonify({'error': str(e)}), 500
 
+def sse_event(data, event=None):
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data)}\n\n"
+
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """Server-sent events version of /api/chat.
+
+    Sends {"token": ...} events while the answer is generated, then a 'done'
+    event with the stored message id once the turn is saved.
+    """
+    data = request.json or {}
+    query = data.get('query')
+    user_id = data.get('userId')
+    if not query:
+        return jsonify({'error': 'Query is required'}), 400
+    if not user_id or user_id == 'undefined':
+        return jsonify({'error': 'User ID is required'}), 400
+    request_id, request_path = g.request_id, request.path
+
+    def generate():
+        # Runs after the response headers (and the request log line) went out,
+        # so the stream logs its own line with the stage spans once it ends
+        start_request(request_id)
+        started = time.perf_counter()
+        first_token_ms = None
+        try:
+            with span('history_load'):
+                chat_history, window_start, summary_doc = load_turn_context(user_id)
+            plan = plan_response(query, chat_history, summary_doc.get('summary'))
+            if plan['answer'] is not None:
+                answer = plan['answer']
+                yield sse_event({'token': answer})
+            else:
+                flight, leader = llm_flights.begin(plan['flight_key'])
+                if not leader:
+                    # Someone is already generating this answer; wait and send it whole
+                    answer = llm_flights.wait(flight)
+                    plan['answered_by'] = 'llm_coalesced'
+                    yield sse_event({'token': answer})
+                else:
+                    parts = []
+                    try:
+                        with span('llm_stream'):
+                            for token in llm_stream(plan['prompt']):
+                                if first_token_ms is None:
+                                    first_token_ms = round((time.perf_counter() - started) * 1000, 2)
+                                parts.append(token)
+                                yield sse_event({'token': token})
+                    except BaseException as e:
+                        # A disconnecting client closes this generator; waiting requests get a plain error
+                        error = e if isinstance(e, Exception) else RuntimeError("The answer stream was closed early")
+                        llm_flights.finish(plan['flight_key'], flight, error=error)
+                        raise
+                    answer = "".join(parts)
+                    llm_flights.finish(plan['flight_key'], flight, result=answer)
+            finish_response(query, plan, answer, chat_history)
+            with span('save'):
+                record = save_turn(user_id, query, answer, plan['answered_by'], window_start, summary_doc)
+            log_json('stream', path=request_path, answered_by=plan['answered_by'], first_token_ms=first_token_ms,
+                     duration_ms=round((time.perf_counter() - started) * 1000, 2), spans=request_spans())
+            yield sse_event({'message_id': str(record['_id']), 'answered_by': plan['answered_by']}, event='done')
+        except RetrievalNotReady as e:
+            yield sse_event({'error': str(e), 'status': 503}, event='error')
+        except LLMDeadlineExceeded as e:
+            log_json('error', where='chat_stream', error=str(e), spans=request_spans())
+            yield sse_event({'error': str(e), 'status': 504}, event='error')
+        except Exception as e:
+            print(f"Chat stream error: {str(e)}")
+            log_json('error', where='chat_stream', error=str(e), spans=request_spans())
+            yield sse_event({'error': str(e), 'status': 500}, event='error')
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'X-Accel-Buffering': 'no'  # Don't let a reverse proxy hold back the tokens
+    })
+
 @app.route('/api/rate', methods=['POST'])
 def rate_message():
     try:
@@ -607,8 +1131,19 @@ def rate_message():
         user_id = data.get('userId')
         if not all([message_id, rating, user_id]):
             return jsonify({'error': 'Message ID, rating, and user ID are required'}), 400
-        result = chat_history_collection.update_one(
-            {'_id': ObjectId(message_id), 'user_id': user_id},
+        try:
+            message_id_obj = ObjectId(message_id)
+        except:
+            return jsonify({'error': 'Invalid message ID format'}), 400
+        # The message may still be queued for writing, in which case that's where it is
+        message = chat_history_collection.find_one({'_id': message_id_obj}, {'user_id': 1}) \
+            or chat_writes.pending_insert(message_id_obj)
+        if not message or message.get('user_id') != user_id:
+            return jsonify({'error': 'Message not found or not owned by user'}), 404
+        # Queued behind the chat insert it rates; the user_id filter keeps
+        # ratings to the owner's messages
+        chat_writes.update(
+            {'_id': message_id_obj, 'user_id': user_id},
             {
                 '$set': {
                     'rating': rating,
@@ -616,13 +1151,83 @@ def rate_message():
                 }
             }
         )
-        if result.modified_count == 0:
-            return jsonify({'error': 'Message not found or not owned by user'}), 404
+        conversation_cache.invalidate(user_id)
         return jsonify({'message': 'Message rated successfully'})
     except Exception as e:
         print(f"Rate error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/chat/cache-stats', methods=['GET'])
+def chat_cache_stats():
+    return jsonify({
+        'conversations': conversation_cache.stats(),
+        'answers': answer_cache.stats() if answer_cache else None,
+        'embeddings': embedding_function.stats() if embedding_function else None,
+        'answered_by': dict(answer_path_counts),
+        'retrieval': dict(retrieval_mode_counts),
+        'llm': llm_gateway.stats(),
+        'coalescing': llm_flights.stats(),
+        'writes': chat_writes.stats()
+    })
+
+def collect_metrics():
+    # The same counters /api/chat/cache-stats shows, as Prometheus samples
+    caches = {'conversations': conversation_cache.stats()}
+    if answer_cache:
+        caches['answers'] = answer_cache.stats()
+    if embedding_function:
+        caches['embeddings'] = embedding_function.stats()
+    for cache, stats in caches.items():
+        for result in ('hits', 'misses'):
+            yield 'campus_genie_cache_lookups_total', 'counter', 'Cache lookups by result', {'cache': cache, 'result': result}, stats[result]
+        yield 'campus_genie_cache_entries', 'gauge', 'Entries held per cache', {'cache': cache}, stats.get('entries', stats.get('users'))
+    for path, count in answer_path_counts.items():
+        yield 'campus_genie_answers_total', 'counter', 'Chat answers by the path that produced them', {'answered_by': path}, count
+    for mode, count in retrieval_mode_counts.items():
+        yield 'campus_genie_retrievals_total', 'counter', 'Retrievals by mode', {'mode': mode}, count
+    llm_stats = llm_gateway.stats()
+    for kind in ('prompt', 'completion'):
+        yield 'campus_genie_llm_tokens_total', 'counter', 'LLM tokens used', {'kind': kind}, llm_stats.get(f'{kind}_tokens', 0)
+    for outcome in ('primary', 'hedged', 'hedge_won', 'retries', 'errors', 'deadline_exceeded', 'streamed'):
+        yield 'campus_genie_llm_calls_total', 'counter', 'LLM gateway calls by outcome', {'outcome': outcome}, llm_stats.get(outcome, 0)
+    flights = llm_flights.stats()
+    yield 'campus_genie_llm_coalesced_total', 'counter', 'Chat requests that shared an in-flight LLM answer', {}, flights['coalesced']
+    yield 'campus_genie_llm_in_flight', 'gauge', 'Distinct LLM answers being generated', {}, flights['in_flight']
+    writes = chat_writes.stats()
+    yield 'campus_genie_write_behind_pending', 'gauge', 'Chat history writes waiting to be flushed', {}, writes['pending']
+    yield 'campus_genie_write_behind_spilling', 'gauge', 'Whether chat history writes are going to the spill file', {}, int(writes['spilling'])
+    for result in ('written', 'spilled', 'dropped', 'duplicates_skipped', 'flush_errors'):
+        yield 'campus_genie_write_behind_ops_total', 'counter', 'Chat history writes by result', {'result': result}, writes.get(result, 0)
+    jobs = dashboard_refresher.stats()
+    yield 'campus_genie_refresh_jobs_active', 'gauge', 'Dashboard refresh jobs queued or running', {}, jobs['active_jobs']
+    yield 'campus_genie_ready', 'gauge', 'Whether Mongo and retrieval are ready', {}, int(startup_state['mongo'] and startup_state['retrieval'])
+
+register_collector(collect_metrics)
+
+# Prometheus text exposition of the latency histograms and the counters above
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+# Liveness: the process is up and serving requests
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    return jsonify({'status': 'ok'})
+
+# Readiness: Mongo answered a ping and retrieval has run a warmup search
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    ready = startup_state['mongo'] and startup_state['retrieval']
+    return jsonify({
+        'status': 'ready' if ready else 'starting',
+        'mongo': startup_state['mongo'],
+        'retrieval': startup_state['retrieval'],
+        'errors': startup_state['errors'],
+        'ready_after_seconds': startup_state['ready_after_seconds']
+    }), 200 if ready else 503
+
+start_background_loading()
+
 # Serve static files and handle client-side routing
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
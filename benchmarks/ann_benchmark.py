@@ -0,0 +1,96 @@
+"""Recall vs latency of the ANN index types against the flat faiss_index.
+
+    python benchmarks/ann_benchmark.py [--index faiss_index] [--k 4] [--types ivf hnsw ivfpq]
+                                       [--nprobe 1 8 32] [--ef-search 16 64 256]
+
+Queries are the questions in Data.json. Recall@k is measured against the
+exact results of the flat index; memory is the serialized index size.
+"""
+import os
+import sys
+import time
+import json
+import argparse
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ann_index import INDEX_TYPES, build_ann_index, apply_search_params
+from curated import load_qa_records
+
+
+def percentile_ms(samples, q):
+    return round(float(np.percentile(samples, q)) * 1000, 3)
+
+
+def run_queries(index, queries, k):
+    latencies = []
+    results = []
+    for query in queries:
+        started = time.perf_counter()
+        _, ids = index.search(query.reshape(1, -1), k)
+        latencies.append(time.perf_counter() - started)
+        results.append(ids[0])
+    return np.array(results), latencies
+
+
+def recall_at_k(results, truth):
+    hits = sum(len(set(r[r >= 0]) & set(t[t >= 0])) for r, t in zip(results, truth))
+    return round(hits / max(1, sum(len(t[t >= 0]) for t in truth)), 4)
+
+
+def main():
+    import faiss
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--index', default='faiss_index')
+    parser.add_argument('--queries', default='Data.json')
+    parser.add_argument('--k', type=int, default=4)
+    parser.add_argument('--types', nargs='+', default=[t for t in INDEX_TYPES if t != 'flat'])
+    parser.add_argument('--nprobe', nargs='+', type=int, default=[1, 4, 8, 16, 32])
+    parser.add_argument('--ef-search', nargs='+', type=int, default=[16, 32, 64, 128, 256])
+    parser.add_argument('--json', help="also write the results to this file")
+    args = parser.parse_args()
+
+    flat_index = faiss.read_index(os.path.join(args.index, 'index.faiss'))
+    questions = [item['question'] for item in load_qa_records(args.queries)]
+    embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+    queries = np.array(embeddings.embed_documents(questions), dtype=np.float32)
+    print(f"{flat_index.ntotal} vectors, {len(queries)} queries, k={args.k}\n")
+
+    truth, flat_latencies = run_queries(flat_index, queries, args.k)
+    rows = [{
+        'type': 'flat', 'param': '-', 'recall': 1.0,
+        'p50_ms': percentile_ms(flat_latencies, 50), 'p99_ms': percentile_ms(flat_latencies, 99),
+        'memory_kb': round(len(faiss.serialize_index(flat_index)) / 1024, 1), 'build_s': 0.0
+    }]
+
+    for index_type in args.types:
+        started = time.perf_counter()
+        index = build_ann_index(flat_index, index_type)
+        build_seconds = round(time.perf_counter() - started, 2)
+        memory_kb = round(len(faiss.serialize_index(index)) / 1024, 1)
+        if index_type == 'hnsw':
+            settings = [('efSearch', value, {'ef_search': value}) for value in args.ef_search]
+        else:
+            settings = [('nprobe', value, {'nprobe': value}) for value in args.nprobe]
+        for name, value, params in settings:
+            apply_search_params(index, **params)
+            results, latencies = run_queries(index, queries, args.k)
+            rows.append({
+                'type': index_type, 'param': f"{name}={value}", 'recall': recall_at_k(results, truth),
+                'p50_ms': percentile_ms(latencies, 50), 'p99_ms': percentile_ms(latencies, 99),
+                'memory_kb': memory_kb, 'build_s': build_seconds
+            })
+
+    print(f"{'type':<7} {'param':<13} {'recall@' + str(args.k):>9} {'p50 ms':>8} {'p99 ms':>8} {'mem KB':>9} {'build s':>8}")
+    for row in rows:
+        print(f"{row['type']:<7} {row['param']:<13} {row['recall']:>9.4f} {row['p50_ms']:>8.3f} "
+              f"{row['p99_ms']:>8.3f} {row['memory_kb']:>9.1f} {row['build_s']:>8.2f}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""Check that cached answers are never shared between different conversations.
+
+    python benchmarks/answer_cache_check.py
+
+Two students with different chat histories ask the same question over the
+same retrieved context: the first one's answer is cached under the key
+app.py builds with answer_cache.answer_key, and the second must miss it. The
+same student asking again, and two students without any history, must hit.
+Exits non-zero on a leak or a missing hit.
+"""
+import os
+import sys
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.messages import HumanMessage, AIMessage
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from answer_cache import SemanticAnswerCache, answer_key
+
+QUESTION = "Which electives can I take next semester?"
+DOCUMENTS = [Document(page_content="Question: What electives are offered?\nAnswer: Open electives are listed per branch.")]
+
+
+def main():
+    cache = SemanticAnswerCache(path=None, fingerprint='check')
+    embedding = np.random.default_rng(0).random(384).astype(np.float32)
+
+    history_a = [HumanMessage(content="I'm in CSE, third year."), AIMessage(content="Noted, CSE third year.")]
+    history_b = [HumanMessage(content="I'm an IT first-year student."), AIMessage(content="Noted, IT first year.")]
+    key_a = answer_key(DOCUMENTS, history_a, "Student A is in CSE, third year.")
+    key_b = answer_key(DOCUMENTS, history_b, "Student B is in IT, first year.")
+
+    cache.put(QUESTION, embedding, key_a, "As a CSE third-year student you can take ...")
+    checks = {
+        'other student misses': cache.lookup(embedding, key_b) is None,
+        'same student hits': cache.lookup(embedding, key_a) is not None,
+        'history-free student misses': cache.lookup(embedding, answer_key(DOCUMENTS)) is None,
+    }
+    cache.put(QUESTION, embedding, answer_key(DOCUMENTS), "Open electives are listed per branch.")
+    checks['history-free students share'] = cache.lookup(embedding, answer_key(DOCUMENTS, [], None)) is not None
+
+    for name, ok in checks.items():
+        print(f"{name}: {'ok' if ok else 'FAIL'}")
+    if not all(checks.values()):
+        sys.exit(1)
+    print("\nOK")
+
+
+if __name__ == '__main__':
+    main()
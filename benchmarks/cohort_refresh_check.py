@@ -0,0 +1,113 @@
+"""Check cohort_refresh.py's resume, rate limiting and report, then run it against the stand-in.
+
+    python benchmarks/cohort_refresh_check.py [--students 20] [--workers 4] [--rate 5]
+
+Offline part (no browser): refreshes a fake cohort with a scrape function
+that fails some students, stops half way with --limit, and checks that the
+second run (after a crash that left a truncated checkpoint line) only does
+what was left plus the failures, and that starts were spaced by the rate
+limit. Browser part (needs playwright): refreshes the
+cohort from benchmarks/netra_standin.py through a real ScraperService and
+prints the report.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from netra_standin import serve
+from cohort_refresh import run_cohort, print_report
+
+SAMPLE = {'sessions': ['Present'], 'overall_attendance_percentage': 80.0, 'timetable': [], 'attendance': []}
+
+
+def check_offline(students, workers, rate):
+    mobiles = [f"90000{i:05d}" for i in range(students)]
+    calls, starts = [], []
+    lock = threading.Lock()
+
+    def fake_scrape(mobile_number, timings=None):
+        with lock:
+            calls.append(mobile_number)
+            starts.append(time.monotonic())
+        time.sleep(0.02)
+        timings['login'] = 0.01
+        if mobile_number.endswith('7'):
+            raise RuntimeError("login failed")
+        return SAMPLE
+
+    with tempfile.TemporaryDirectory() as tmp:
+        checkpoint = os.path.join(tmp, 'checkpoint.jsonl')
+        run_cohort(mobiles, fake_scrape, workers=workers, rate_per_host=rate,
+                   checkpoint_path=checkpoint, host='standin', limit=students // 2)
+        first_calls = list(calls)
+        calls.clear()
+        starts.clear()
+        # The "crash": killed mid-append, then a new run with the same checkpoint
+        with open(checkpoint, 'a', encoding='utf-8') as f:
+            f.write('{"mobile_number": "90000')
+        second = run_cohort(mobiles, fake_scrape, workers=workers, rate_per_host=rate,
+                            checkpoint_path=checkpoint, host='standin')
+        with open(checkpoint, 'r', encoding='utf-8') as f:
+            readable = all(json.loads(line) for line in f if line.strip())
+
+    failed_first = [m for m in first_calls if m.endswith('7')]
+    expected_second = set(mobiles[students // 2:]) | set(failed_first)
+    resumed = readable and set(calls) == expected_second and second['skipped_from_checkpoint'] == students // 2 - len(failed_first)
+    # After the second run's initial burst, starts can't come faster than the rate
+    spacing = sorted(starts)[workers:]
+    min_elapsed = (len(spacing) - 1) / rate
+    rate_limited = len(spacing) < 2 or spacing[-1] - spacing[0] >= min_elapsed * 0.9
+    print(f"resume: {'ok' if resumed else 'MISMATCH'}; rate limit: {'ok' if rate_limited else 'TOO FAST'}")
+    print_report(second)
+    return resumed and rate_limited
+
+
+def check_standin(students, workers, rate, port):
+    import sa
+    from scraper_service import ScraperService
+
+    server = serve(port, asset_delay=1.0, api_delay=0.2, panel_delay=0.1)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    sa.NETRA_URL = f"http://127.0.0.1:{port}"
+    service = ScraperService(concurrency=workers, max_contexts=workers * 2, max_queue=workers * 4)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            report = run_cohort([f"91000{i:05d}" for i in range(students)], service.scrape, workers=workers,
+                                rate_per_host=rate, checkpoint_path=os.path.join(tmp, 'checkpoint.jsonl'),
+                                host=f"127.0.0.1:{port}")
+    finally:
+        service.shutdown()
+        server.shutdown()
+    print_report(report)
+    return report['failed'] == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--students', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--rate', type=float, default=5)
+    parser.add_argument('--port', type=int, default=8098)
+    args = parser.parse_args()
+
+    ok = check_offline(args.students, args.workers, args.rate)
+    try:
+        import playwright  # noqa: F401
+    except ImportError:
+        print("\nplaywright not installed, skipping the stand-in run")
+    else:
+        ok = check_standin(args.students, args.workers, args.rate, args.port) and ok
+
+    if not ok:
+        print("\nFAIL")
+        sys.exit(1)
+    print("\nOK")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Query-embedding throughput with and without micro-batching.
+
+    python benchmarks/embedding_batch_benchmark.py [--clients 1 8 32] [--queries 256]
+                                                   [--max-batch-size 32] [--max-wait-ms 5]
+
+Each client thread embeds distinct Data.json questions back to back, first by
+calling the model directly (batch of one per request, as before) and then
+through BatchingEmbeddings. Reports queries/s and p50/p99 latency.
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from curated import load_qa_records
+from embeddings import BatchingEmbeddings
+
+
+def run(embeddings, questions, clients):
+    latencies = []
+    lock = threading.Lock()
+    chunks = [questions[i::clients] for i in range(clients)]
+
+    def client(chunk):
+        local = []
+        for question in chunk:
+            started = time.perf_counter()
+            embeddings.embed_query(question)
+            local.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client, args=(chunk,)) for chunk in chunks]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return {
+        'qps': round(len(questions) / elapsed, 1),
+        'p50_ms': round(float(np.percentile(latencies, 50)) * 1000, 2),
+        'p99_ms': round(float(np.percentile(latencies, 99)) * 1000, 2)
+    }
+
+
+def main():
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--clients', nargs='+', type=int, default=[1, 8, 32])
+    parser.add_argument('--queries', type=int, default=256, help="queries per run")
+    parser.add_argument('--max-batch-size', type=int, default=32)
+    parser.add_argument('--max-wait-ms', type=float, default=5)
+    args = parser.parse_args()
+
+    questions = [item['question'] for item in load_qa_records('Data.json')][:args.queries]
+    model = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+    model.embed_query("warmup")
+    batcher = BatchingEmbeddings(model, args.max_batch_size, args.max_wait_ms)
+
+    print(f"{len(questions)} queries per run, max batch {args.max_batch_size}, max wait {args.max_wait_ms} ms\n")
+    print(f"{'clients':>7} {'mode':<8} {'q/s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for clients in args.clients:
+        for mode, embeddings in (('direct', model), ('batched', batcher)):
+            result = run(embeddings, questions, clients)
+            print(f"{clients:>7} {mode:<8} {result['qps']:>8.1f} {result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f}")
+    stats = batcher.stats()
+    print(f"\nbatched runs: {stats['batches']} batches, avg size {stats['avg_batch_size']}, largest {stats['largest_batch']}")
+
+
+if __name__ == '__main__':
+    main()
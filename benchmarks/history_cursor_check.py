@@ -0,0 +1,81 @@
+"""Check that chat history paging reaches legacy records.
+
+    python benchmarks/history_cursor_check.py [--page-size 3]
+
+Seeds one user's chats into a scratch database (MONGO_URI, default a local
+mongod; dropped afterwards): dated chats, two of them sharing a timestamp,
+plus legacy records whose timestamp is a string, a number or missing. Pages
+through them with chat_memory.load_history_page the way
+/api/chat/history/<user_id> does, round-tripping every next_cursor, and
+checks each chat comes back exactly once, dated ones newest first. Exits
+non-zero otherwise.
+"""
+import os
+import sys
+import argparse
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from pymongo import MongoClient
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from chat_memory import load_history_page, decode_history_cursor
+
+MONGO_URI = os.environ.get('MONGO_URI', 'mongodb://localhost:27017/')
+USER_ID = 'history-check-user'
+
+
+def seed(collection):
+    start = datetime(2024, 6, 1, 9, 0)
+    chats = [{'_id': ObjectId(), 'user_id': USER_ID, 'query': f"dated {i}", 'response': 'ok',
+              'timestamp': start + timedelta(minutes=i // 2 * 2)} for i in range(8)]
+    chats += [
+        {'_id': ObjectId(), 'user_id': USER_ID, 'query': 'legacy string', 'response': 'ok',
+         'timestamp': '2023-11-02 10:15:00'},
+        {'_id': ObjectId(), 'user_id': USER_ID, 'query': 'legacy number', 'response': 'ok', 'timestamp': 1698919000},
+        {'_id': ObjectId(), 'user_id': USER_ID, 'query': 'legacy missing', 'response': 'ok'},
+    ]
+    collection.insert_many(chats)
+    collection.create_index([('user_id', 1), ('timestamp', -1), ('_id', -1)])
+    return chats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--page-size', type=int, default=3)
+    parser.add_argument('--mongo-db', default='campus-genie-history-check')
+    args = parser.parse_args()
+
+    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
+    client.drop_database(args.mongo_db)
+    collection = client[args.mongo_db]['chat_history']
+    try:
+        chats = seed(collection)
+        seen, before, pages = [], None, 0
+        while True:
+            page, next_cursor = load_history_page(collection, USER_ID, args.page_size, before,
+                                                  {'_id': 1, 'query': 1, 'timestamp': 1})
+            pages += 1
+            seen += [chat['_id'] for chat in page]
+            print(f"page {pages}: {[chat['query'] for chat in page]}")
+            if not next_cursor:
+                break
+            before = decode_history_cursor(next_cursor)
+    finally:
+        client.drop_database(args.mongo_db)
+
+    dated = sorted((c for c in chats if isinstance(c.get('timestamp'), datetime)),
+                   key=lambda c: (c['timestamp'], c['_id']), reverse=True)
+    checks = {
+        'every chat once': sorted(seen) == sorted(c['_id'] for c in chats),
+        'dated chats newest first': seen[:len(dated)] == [c['_id'] for c in dated],
+    }
+    for name, ok in checks.items():
+        print(f"{name}: {'ok' if ok else 'FAIL'}")
+    if not all(checks.values()):
+        sys.exit(1)
+    print("\nOK")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""Measure how often the BM25 fast path in retrieve() skips the embedding model.
+
+    python benchmarks/lexical_fast_path_check.py [--index faiss_index] [--questions Data.json]
+
+Builds the same BM25Index app.py builds from faiss_index and runs every
+curated question through is_lexically_decisive, printing the hit rate and a
+few of the questions that would be answered from BM25 alone. Tune
+LEXICAL_MAX_TERMS, LEXICAL_MIN_SCORE and LEXICAL_MARGIN through the
+environment and re-run.
+"""
+import os
+import sys
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from docstore import load_vectorstore
+from curated import load_qa_records
+from retrieval import BM25Index, is_lexically_decisive, LEXICAL_MAX_TERMS, LEXICAL_MIN_SCORE, LEXICAL_MARGIN
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--index', default='faiss_index')
+    parser.add_argument('--questions', nargs='+', default=['Data.json'])
+    parser.add_argument('--show', type=int, default=5, help="decisive questions to print")
+    args = parser.parse_args()
+
+    vectorstore = load_vectorstore(args.index, embeddings=None)
+    bm25 = BM25Index.from_vectorstore(vectorstore)
+    print(f"{vectorstore.index.ntotal} documents, {len(bm25.doc_lengths)} distinct texts indexed by BM25")
+
+    questions = [item['question'] for path in args.questions for item in load_qa_records(path)]
+    decisive = [q for q in questions if is_lexically_decisive(q, bm25.search(q))]
+    print(f"max_terms={LEXICAL_MAX_TERMS} min_score={LEXICAL_MIN_SCORE} margin={LEXICAL_MARGIN}: "
+          f"{len(decisive)}/{len(questions)} questions ({len(decisive) / len(questions):.1%}) take the fast path")
+    for question in decisive[:args.show]:
+        position, score = bm25.search(question, 1)[0]
+        text = vectorstore.docstore.search(vectorstore.index_to_docstore_id[position]).page_content
+        print(f"  {question}\n    {score:.1f} -> {text[:100]!r}")
+
+
+if __name__ == '__main__':
+    main()
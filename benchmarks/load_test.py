@@ -0,0 +1,366 @@
+"""End-to-end load test of app.py against a stub LLM and a throwaway Mongo database.
+
+    python benchmarks/load_test.py [--concurrency 1 4 16 32] [--duration 30] [--llm-latency 0.5]
+                                   [--save-baseline PATH] [--baseline PATH]
+
+Starts benchmarks/stub_openai_server.py, seeds users, chat history and
+dashboard snapshots into a separate database (MONGO_URI, default a local
+mongod; the database is dropped afterwards unless --keep-db), launches the app
+pointed at both, and waits for /readyz. It then replays a mix of
+
+  chat       POST /api/chat with a question sampled from Data.json (a share of
+             them reworded so they miss the curated answers and go through
+             retrieval, the answer cache and the LLM)
+  history    GET /api/chat/history/<user_id>?fields=summary
+  rate       POST /api/rate on a message from the user's history
+  dashboard  GET /api/dashboard-data?user_id=<user_id>
+
+from closed-loop clients, one step per concurrency level, and reports
+requests per second and p50/p95/p99 latency per endpoint. With --baseline the
+report is compared against an earlier --save-baseline run and the script exits
+non-zero on a regression. Latencies depend on the machine, so no baseline is
+committed: save one on the machine you compare on. --app-url load-tests an app that is already running
+(e.g. under gunicorn) instead; it must use the same MONGO_URI and MONGO_DB.
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+import subprocess
+import urllib.error
+import urllib.request
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from stub_openai_server import serve as serve_stub_llm
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MONGO_URI = os.environ.get('MONGO_URI', 'mongodb://localhost:27017/')
+ENDPOINTS = ('chat', 'history', 'rate', 'dashboard')
+DEFAULT_MIX = 'chat=4,history=3,rate=1,dashboard=2'
+LEAD_INS = ("Can you tell me", "I wanted to know", "Quick question:", "Please explain", "Do you know")
+
+# Runs the app without the debug reloader, on the port given as argv[1]
+LAUNCH = "import sys, app; app.app.run(host='127.0.0.1', port=int(sys.argv[1]), threaded=True, debug=False)"
+
+
+def load_questions(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [item['question'] for item in json.load(f) if item.get('question')]
+
+
+def parse_mix(mix):
+    weights = {}
+    for part in mix.split(','):
+        name, _, weight = part.partition('=')
+        if name.strip() not in ENDPOINTS:
+            raise ValueError(f"unknown endpoint in --mix: {name}")
+        weights[name.strip()] = float(weight)
+    return weights
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def seed(db, users, turns_per_user, questions, dashboard_path):
+    """Users with a mobile number, some chat history each and a dashboard snapshot; returns the users."""
+    from bson import ObjectId
+    from dashboard_jobs import save_snapshot
+
+    with open(dashboard_path, 'r', encoding='utf-8') as f:
+        dashboard = json.load(f)
+    seeded = []
+    now = datetime.now()
+    chats = []
+    for i in range(users):
+        user = {'_id': ObjectId(), 'name': f"Load Test {i}", 'email': f"loadtest{i}@example.com",
+                'mobile_number': f"80000{i:05d}"}
+        db['users'].insert_one(user)
+        save_snapshot(db['dashboard_snapshots'], user['mobile_number'], dashboard)
+        message_ids = []
+        for turn in range(turns_per_user):
+            chat = {'_id': ObjectId(), 'user_id': str(user['_id']), 'query': random.choice(questions),
+                    'response': "Seeded answer. " * 20, 'answered_by': 'llm',
+                    'timestamp': now - timedelta(minutes=turns_per_user - turn)}
+            chats.append(chat)
+            message_ids.append(str(chat['_id']))
+        seeded.append({'user_id': str(user['_id']), 'message_ids': message_ids})
+    if chats:
+        db['chat_history'].insert_many(chats)
+    db['chat_history'].create_index([('user_id', 1), ('timestamp', -1), ('_id', -1)])
+    return seeded
+
+
+def start_app(port, env, log_path):
+    log = open(log_path, 'w', encoding='utf-8') if log_path else subprocess.DEVNULL
+    return subprocess.Popen([sys.executable, '-c', LAUNCH, str(port)], cwd=ROOT, env={**os.environ, **env},
+                            stdout=log, stderr=subprocess.STDOUT)
+
+
+def wait_ready(base_url, timeout, process=None):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"The app exited with code {process.returncode} during startup")
+        try:
+            with urllib.request.urlopen(f"{base_url}/readyz", timeout=5) as response:
+                if response.status == 200:
+                    return
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(1)
+    raise RuntimeError(f"{base_url} was not ready after {timeout}s")
+
+
+def call(base_url, method, path, body=None, timeout=60):
+    """One request; returns (status, parsed JSON body or None)."""
+    data = json.dumps(body).encode('utf-8') if body is not None else None
+    request = urllib.request.Request(f"{base_url}{path}", data=data, method=method,
+                                     headers={'Content-Type': 'application/json'} if data else {})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            payload = response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        payload, status = e.read(), e.code
+    try:
+        return status, json.loads(payload) if payload else None
+    except ValueError:
+        return status, None
+
+
+class Client:
+    """Picks the next request from the mix and remembers message ids it can rate."""
+
+    def __init__(self, base_url, users, questions, weights, novel, rng):
+        self.base_url = base_url
+        self.users = users
+        self.questions = questions
+        self.names = list(weights)
+        self.weights = [weights[name] for name in self.names]
+        self.novel = novel
+        self.rng = rng
+
+    def question(self):
+        question = self.rng.choice(self.questions)
+        if self.rng.random() < self.novel:
+            # Reworded, so it misses the word-for-word curated answers
+            question = f"{self.rng.choice(LEAD_INS)} {question[0].lower()}{question[1:]}"
+        return question
+
+    def request(self, endpoint, user):
+        if endpoint == 'chat':
+            return 'POST', '/api/chat', {'query': self.question(), 'userId': user['user_id']}
+        if endpoint == 'history':
+            return 'GET', f"/api/chat/history/{user['user_id']}?limit=20&fields=summary", None
+        if endpoint == 'rate':
+            message_id = self.rng.choice(user['message_ids'])
+            return 'POST', '/api/rate', {'messageId': message_id, 'rating': self.rng.choice([1, 5]),
+                                         'userId': user['user_id']}
+        return 'GET', f"/api/dashboard-data?user_id={user['user_id']}", None
+
+    def step(self):
+        endpoint = self.rng.choices(self.names, self.weights)[0]
+        user = self.rng.choice(self.users)
+        method, path, body = self.request(endpoint, user)
+        started = time.perf_counter()
+        try:
+            status, payload = call(self.base_url, method, path, body)
+        except Exception:
+            status, payload = None, None
+        seconds = time.perf_counter() - started
+        if endpoint == 'history' and status == 200 and payload:
+            ids = [item['_id'] for item in payload.get('items', [])]
+            if ids:
+                user['message_ids'] = ids
+        return endpoint, seconds, status is not None and status < 400
+
+
+def run_level(base_url, users, questions, weights, novel, concurrency, duration, seed_value):
+    samples = {name: [] for name in weights}
+    errors = {name: 0 for name in weights}
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def worker(index):
+        client = Client(base_url, users, questions, weights, novel, random.Random(seed_value * 1000 + index))
+        while time.monotonic() < stop_at:
+            endpoint, seconds, ok = client.step()
+            with lock:
+                samples[endpoint].append(seconds)
+                if not ok:
+                    errors[endpoint] += 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    def summarize(values, error_count):
+        if not values:
+            return {'requests': 0, 'errors': 0, 'rps': 0.0, 'p50_ms': None, 'p95_ms': None, 'p99_ms': None}
+        return {
+            'requests': len(values),
+            'errors': error_count,
+            'rps': round(len(values) / elapsed, 2),
+            'p50_ms': round(percentile(values, 50) * 1000, 1),
+            'p95_ms': round(percentile(values, 95) * 1000, 1),
+            'p99_ms': round(percentile(values, 99) * 1000, 1)
+        }
+
+    level = {name: summarize(values, errors[name]) for name, values in samples.items()}
+    level['total'] = summarize([s for values in samples.values() for s in values], sum(errors.values()))
+    return level
+
+
+def print_level(concurrency, level):
+    print(f"\nconcurrency {concurrency}")
+    print(f"{'endpoint':<10} {'requests':>9} {'errors':>7} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, stats in level.items():
+        if not stats['requests']:
+            continue
+        print(f"{name:<10} {stats['requests']:>9} {stats['errors']:>7} {stats['rps']:>8.1f} "
+              f"{stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f}")
+
+
+def compare(report, baseline, tolerance, min_delta_ms):
+    """Regressions against the baseline, as printable strings."""
+    regressions = []
+    for concurrency, level in report['levels'].items():
+        base_level = baseline.get('levels', {}).get(concurrency)
+        if not base_level:
+            continue
+        for name, stats in level.items():
+            base = base_level.get(name)
+            if not base or not base['requests'] or not stats['requests']:
+                continue
+            for key in ('p95_ms', 'p99_ms'):
+                if stats[key] > base[key] * (1 + tolerance) and stats[key] - base[key] > min_delta_ms:
+                    regressions.append(f"c={concurrency} {name} {key} {base[key]} -> {stats[key]}")
+            if stats['rps'] < base['rps'] * (1 - tolerance):
+                regressions.append(f"c={concurrency} {name} rps {base['rps']} -> {stats['rps']}")
+            base_error_rate = base['errors'] / base['requests']
+            error_rate = stats['errors'] / stats['requests']
+            if error_rate > base_error_rate + 0.01:
+                regressions.append(f"c={concurrency} {name} error rate {base_error_rate:.1%} -> {error_rate:.1%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--concurrency', nargs='+', type=int, default=[1, 4, 16, 32])
+    parser.add_argument('--duration', type=float, default=30, help="seconds per concurrency level")
+    parser.add_argument('--warmup', type=float, default=5, help="seconds of traffic before measuring")
+    parser.add_argument('--mix', default=DEFAULT_MIX, help="relative weights per endpoint")
+    parser.add_argument('--novel', type=float, default=0.5, help="share of chat questions reworded to miss the curated answers")
+    parser.add_argument('--questions', default=os.path.join(ROOT, 'Data.json'))
+    parser.add_argument('--dashboard', default=os.path.join(ROOT, 'kmit_data.json'), help="snapshot seeded for every user")
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--turns', type=int, default=30, help="seeded chat history per user")
+    parser.add_argument('--llm-latency', type=float, default=0.5)
+    parser.add_argument('--llm-jitter', type=float, default=0.1)
+    parser.add_argument('--llm-port', type=int, default=8099)
+    parser.add_argument('--app-port', type=int, default=4100)
+    parser.add_argument('--app-url', help="load-test this running app instead of starting one")
+    parser.add_argument('--app-log', help="write the app's output here")
+    parser.add_argument('--mongo-db', default='campus-genie-loadtest')
+    parser.add_argument('--keep-db', action='store_true')
+    parser.add_argument('--startup-timeout', type=float, default=300)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help="also write the report to this file")
+    parser.add_argument('--save-baseline', help="write the report here as the new baseline")
+    parser.add_argument('--baseline', help="compare against this earlier report")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="allowed relative change before flagging")
+    parser.add_argument('--min-delta-ms', type=float, default=10, help="ignore latency changes smaller than this")
+    args = parser.parse_args()
+    weights = parse_mix(args.mix)
+    if args.mongo_db == 'campus-genie':
+        parser.error("refusing to seed and drop the production database")
+
+    from pymongo import MongoClient
+    random.seed(args.seed)
+    questions = load_questions(args.questions)
+    db = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)[args.mongo_db]
+    db.client.drop_database(args.mongo_db)
+    users = seed(db, args.users, args.turns, questions, args.dashboard)
+
+    stub = serve_stub_llm(args.llm_port, latency=args.llm_latency, jitter=args.llm_jitter)
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+    app_process = None
+    base_url = args.app_url.rstrip('/') if args.app_url else f"http://127.0.0.1:{args.app_port}"
+    # The app's on-disk state (write spill, answer cache) goes to a temp dir, so
+    # nothing from another run is replayed here and no stub answers reach the real cache
+    spill_dir = tempfile.mkdtemp(prefix='load-test-')
+    try:
+        if not args.app_url:
+            app_process = start_app(args.app_port, {
+                'MONGO_URI': MONGO_URI,
+                'MONGO_DB': args.mongo_db,
+                'LLM_BASE_URL': f"http://127.0.0.1:{args.llm_port}/v1",
+                'OPENROUTER_API_KEY': 'load-test',
+                # Seeded snapshots stay fresh, so dashboard reads never start a scrape
+                'DASHBOARD_TTL_SECONDS': str(10 ** 9),
+                'WRITE_SPILL_PATH': os.path.join(spill_dir, 'chat_write_spill.jsonl'),
+                'ANSWER_CACHE_PATH': os.path.join(spill_dir, 'answer_cache.json')
+            }, args.app_log)
+        print(f"Waiting for {base_url}/readyz ...")
+        wait_ready(base_url, args.startup_timeout, app_process)
+
+        if args.warmup > 0:
+            run_level(base_url, users, questions, weights, args.novel, min(args.concurrency), args.warmup, args.seed)
+        report = {
+            'config': {
+                'mix': weights, 'novel': args.novel, 'duration': args.duration, 'users': args.users,
+                'turns': args.turns, 'llm_latency': args.llm_latency, 'llm_jitter': args.llm_jitter,
+                'app_url': args.app_url, 'at': datetime.now().isoformat()
+            },
+            'levels': {}
+        }
+        for concurrency in args.concurrency:
+            level = run_level(base_url, users, questions, weights, args.novel, concurrency, args.duration, args.seed)
+            report['levels'][str(concurrency)] = level
+            print_level(concurrency, level)
+        _, report['app_stats'] = call(base_url, 'GET', '/api/chat/cache-stats')
+        with stub.RequestHandlerClass.lock:
+            report['llm_stub'] = dict(stub.RequestHandlerClass.stats)
+    finally:
+        if app_process is not None:
+            app_process.terminate()
+            try:
+                app_process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                app_process.kill()
+        stub.shutdown()
+        shutil.rmtree(spill_dir, ignore_errors=True)
+        if not args.keep_db:
+            db.client.drop_database(args.mongo_db)
+
+    for path in (args.json, args.save_baseline):
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+    if args.save_baseline:
+        print(f"\nBaseline written to {args.save_baseline}")
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare(report, json.load(f), args.tolerance, args.min_delta_ms)
+        if regressions:
+            print(f"\n{len(regressions)} regressions against {args.baseline}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"\nNo regressions against {args.baseline}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""Check the API scraping mode against the Netra stand-in.
+
+    python benchmarks/netra_api_check.py [--port 8098] [--parsers-only]
+
+First round-trips kmit_data.json through the stand-in's API payloads and
+netra_api.parse_portal_data (no browser needed). Then, if playwright is
+installed, scrapes benchmarks/netra_standin.py in api mode (cold and warm
+session), dom mode, and api mode with a broken endpoint to exercise the DOM
+fallback, timing each and comparing the result with kmit_data.json. Exits
+non-zero on any mismatch. The stand-in serves the same guessed payloads that
+netra_api.py parses, so this checks the code paths, not the real portal.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import threading
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from netra_standin import serve, to_api_payloads
+import netra_api
+
+FIELDS = ('sessions', 'overall_attendance_percentage', 'timetable')
+
+
+def same(data, expected):
+    return all(data[field] == expected[field] for field in FIELDS)
+
+
+def check_parsers(expected):
+    attendance, timetable = to_api_payloads(expected)
+    ok = same(netra_api.parse_portal_data(attendance, timetable), expected)
+    try:
+        netra_api.parse_portal_data({'overall': {}}, timetable)
+        rejects_bad_payload = False
+    except ValueError:
+        rejects_bad_payload = True
+    print(f"parser round trip: {'ok' if ok else 'MISMATCH'}; bad payload rejected: {rejects_bad_payload}")
+    return ok and rejects_bad_payload
+
+
+async def scrape_all(mobile_number, expected):
+    from playwright.async_api import async_playwright
+    import sa
+
+    results = []
+
+    async def timed(name, context, **kwargs):
+        page = await context.new_page()
+        started = time.perf_counter()
+        data, logged_in = await sa.scrape_netra(page, mobile_number, **kwargs)
+        results.append((name, time.perf_counter() - started, same(data, expected) and logged_in))
+        await page.close()
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+
+        context = await browser.new_context()
+        await sa.apply_lean_profile(context)
+        await timed('api cold', context, mode='api')
+        await timed('api warm', context, mode='api', reuse_session=True)
+        await context.close()
+
+        context = await browser.new_context()
+        await sa.apply_lean_profile(context)
+        await timed('dom cold', context, mode='dom')
+        await context.close()
+
+        # An endpoint the portal doesn't serve must fall back to the DOM
+        timetable_api = netra_api.NETRA_TIMETABLE_API
+        sa.NETRA_TIMETABLE_API = '/api/student/missing'
+        context = await browser.new_context()
+        await sa.apply_lean_profile(context)
+        await timed('api fallback', context, mode='api')
+        await context.close()
+        sa.NETRA_TIMETABLE_API = timetable_api
+
+        await browser.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--port', type=int, default=8098)
+    parser.add_argument('--data', default='kmit_data.json')
+    parser.add_argument('--mobile', default='9999999999')
+    parser.add_argument('--parsers-only', action='store_true')
+    args = parser.parse_args()
+
+    with open(args.data, 'r', encoding='utf-8') as f:
+        expected = json.load(f)
+    ok = check_parsers(expected)
+
+    if not args.parsers_only:
+        try:
+            import playwright  # noqa: F401
+        except ImportError:
+            print("playwright not installed, skipping browser checks")
+        else:
+            import sa
+            server = serve(args.port, asset_delay=1.0, api_delay=0.2, panel_delay=0.1, data_path=args.data)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            sa.NETRA_URL = f"http://127.0.0.1:{args.port}"
+            results = asyncio.run(scrape_all(args.mobile, expected))
+            server.shutdown()
+
+            print(f"\n{'mode':<14} {'seconds':>8}  result")
+            for name, seconds, matched in results:
+                print(f"{name:<14} {seconds:>8.2f}  {'ok' if matched else 'MISMATCH'}")
+                ok = ok and matched
+
+    if not ok:
+        print("\nFAIL")
+        sys.exit(1)
+    print("\nOK")
+
+
+if __name__ == '__main__':
+    main()
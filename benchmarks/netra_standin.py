@@ -0,0 +1,251 @@
+"""Local stand-in for the KMIT Netra portal, for scraper benchmarks and checks.
+
+    python benchmarks/netra_standin.py [--port 8098] [--asset-delay 1.0] [--api-delay 0.2]
+                                       [--panel-delay 0.1] [--data kmit_data.json]
+
+Reconstructed from the selectors sa.py relies on, not from the real portal:
+a login form (#login_mobilenumber / #login_password) that posts to a JSON
+login endpoint and sets a session cookie, and attendance / time-table pages
+that render Ant Design-like markup from JSON endpoints after the user clicks
+a collapse header. Every page also pulls a slow image, web font and analytics
+script, which is what makes load/networkidle waits expensive. Data comes from
+kmit_data.json so scraped output can be compared against it. Point the
+scraper at it with NETRA_URL=http://127.0.0.1:8098.
+"""
+import json
+import time
+import uuid
+import argparse
+import threading
+from http.cookies import SimpleCookie
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+SESSION_COOKIE = 'netra_session'
+
+ASSETS = """
+<style>
+  @font-face { font-family: 'PortalSans'; src: url('/assets/portal-sans.woff2') format('woff2'); }
+  body { font-family: 'PortalSans', sans-serif; }
+</style>
+<script async src="https://www.googletagmanager.com/gtag/js?id=G-STANDIN"></script>
+<script async src="/analytics.js"></script>
+"""
+
+LOGIN_PAGE = """<!doctype html>
+<html><head><title>Netra</title>""" + ASSETS + """</head>
+<body>
+  <img src="/assets/banner.png" alt="">
+  <form id="login">
+    <input id="login_mobilenumber" name="mobile">
+    <input id="login_password" name="password" type="password">
+    <button type="submit">Login</button>
+  </form>
+  <script>
+    document.getElementById('login').addEventListener('submit', async event => {
+      event.preventDefault();
+      const response = await fetch('/api/auth/login', {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({
+          mobile: document.getElementById('login_mobilenumber').value,
+          password: document.getElementById('login_password').value
+        })
+      });
+      if (response.ok) location.href = '/student/attendance';
+    });
+  </script>
+</body></html>
+"""
+
+ATTENDANCE_PAGE = """<!doctype html>
+<html><head><title>Attendance</title>""" + ASSETS + """</head>
+<body>
+  <img src="/assets/banner.png" alt="">
+  <div class="ant-page-header"><span class="ant-page-header-heading-title">Attendance</span></div>
+  <div class="ant-collapse">
+    <div class="ant-collapse-item" id="overall">
+      <div class="ant-collapse-header"><h4>Overall</h4></div>
+    </div>
+  </div>
+  <script>
+    const item = document.getElementById('overall');
+    item.querySelector('.ant-collapse-header').addEventListener('click', async () => {
+      const data = await (await fetch('/api/student/attendance')).json();
+      item.classList.add('ant-collapse-item-active');
+      const content = document.createElement('div');
+      content.className = 'ant-collapse-content ant-collapse-content-active';
+      const icons = data.lastWorkingDay.sessions.map(present =>
+        `<span><svg fill="${present ? 'green' : 'red'}" width="12" height="12"></svg></span>`).join('');
+      content.innerHTML = `<div class="ant-collapse-content-box">
+        <div class="ant-progress"><div class="ant-progress-bg" style="width: ${data.overall.percentage}%; height: 8px;"></div></div>
+        ${icons}</div>`;
+      item.appendChild(content);
+    });
+  </script>
+</body></html>
+"""
+
+TIMETABLE_PAGE = """<!doctype html>
+<html><head><title>Time Table</title>""" + ASSETS + """</head>
+<body>
+  <img src="/assets/banner.png" alt="">
+  <div class="ant-page-header"><span class="ant-page-header-heading-title">Time Table</span></div>
+  <div class="ant-collapse" id="days"></div>
+  <script>
+    const PANEL_DELAY_MS = %(panel_delay_ms)d;
+    (async () => {
+      const data = await (await fetch('/api/student/timetable')).json();
+      const container = document.getElementById('days');
+      for (const day of data.days) {
+        const item = document.createElement('div');
+        item.className = 'ant-collapse-item';
+        item.innerHTML = `<div class="ant-collapse-header">${day.day}</div>`;
+        item.querySelector('.ant-collapse-header').addEventListener('click', () => {
+          if (item.classList.contains('ant-collapse-item-active')) {
+            item.classList.remove('ant-collapse-item-active');
+            item.querySelector('.ant-collapse-content').remove();
+            return;
+          }
+          // Panels animate open before their table is in the DOM
+          setTimeout(() => {
+            item.classList.add('ant-collapse-item-active');
+            const rows = day.periods.map(p => `<tr><td>${p.time}</td><td>${p.subject}</td></tr>`).join('');
+            const content = document.createElement('div');
+            content.className = 'ant-collapse-content ant-collapse-content-active';
+            content.innerHTML = `<div class="ant-collapse-content-box"><table>
+              <thead><tr><th>PERIOD</th><th>SUBJECT</th></tr></thead><tbody>${rows}</tbody></table></div>`;
+            item.appendChild(content);
+          }, PANEL_DELAY_MS);
+        });
+        container.appendChild(item);
+      }
+    })();
+  </script>
+</body></html>
+"""
+
+
+def to_api_payloads(data):
+    """Split kmit_data.json into the JSON the stand-in's API endpoints return."""
+    attendance = {
+        'overall': {'percentage': data.get('overall_attendance_percentage')},
+        'lastWorkingDay': {'sessions': [status == 'Present' for status in data.get('sessions', [])]}
+    }
+    days = []
+    for day in data.get('timetable', []):
+        rows = [row for row in day['rows'] if row != ['PERIOD', 'SUBJECT']]
+        days.append({
+            'day': day['header'],
+            'periods': [{'time': row[0], 'subject': row[1] if len(row) > 1 else ''} for row in rows]
+        })
+    return attendance, {'days': days}
+
+
+class NetraHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    config = {}
+    sessions = set()
+    lock = threading.Lock()
+    stats = {'logins': 0, 'pages': 0, 'api': 0, 'assets': 0}
+
+    def log_message(self, format, *args):
+        pass
+
+    def _count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    def _send(self, status, body, content_type='text/html; charset=utf-8', headers=None):
+        payload = body if isinstance(body, bytes) else body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_json(self, status, body, headers=None):
+        self._send(status, json.dumps(body), 'application/json', headers)
+
+    def _logged_in(self):
+        cookie = SimpleCookie(self.headers.get('Cookie', ''))
+        return SESSION_COOKIE in cookie and cookie[SESSION_COOKIE].value in self.sessions
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0].rstrip('/') or '/'
+        config = self.config
+
+        if path.startswith('/assets/') or path == '/analytics.js':
+            self._count('assets')
+            time.sleep(config['asset_delay'])
+            content_type = 'application/javascript' if path.endswith('.js') else 'application/octet-stream'
+            self._send(200, b'', content_type)
+        elif path == '/stats':
+            with self.lock:
+                self._send_json(200, dict(self.stats))
+        elif path.startswith('/api/student/'):
+            if not self._logged_in():
+                self._send_json(401, {'error': 'session expired'})
+                return
+            self._count('api')
+            time.sleep(config['api_delay'])
+            if path == '/api/student/attendance':
+                self._send_json(200, config['attendance'])
+            elif path == '/api/student/timetable':
+                self._send_json(200, config['timetable'])
+            else:
+                self._send_json(404, {'error': 'not found'})
+        elif path in ('/', '/student/attendance', '/student/time-table'):
+            self._count('pages')
+            # Like the portal, pages behind login fall back to the login form
+            if path == '/' or not self._logged_in():
+                self._send(200, LOGIN_PAGE)
+            elif path == '/student/attendance':
+                self._send(200, ATTENDANCE_PAGE)
+            else:
+                self._send(200, TIMETABLE_PAGE % {'panel_delay_ms': int(config['panel_delay'] * 1000)})
+        else:
+            self._send(404, 'not found', 'text/plain')
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = json.loads(self.rfile.read(length) or b'{}')
+        if self.path.rstrip('/') != '/api/auth/login':
+            self._send_json(404, {'error': 'not found'})
+            return
+        if not body.get('mobile') or not body.get('password'):
+            self._send_json(400, {'error': 'mobile and password are required'})
+            return
+        self._count('logins')
+        time.sleep(self.config['api_delay'])
+        token = uuid.uuid4().hex
+        with self.lock:
+            self.sessions.add(token)
+        self._send_json(200, {'token': token}, {'Set-Cookie': f"{SESSION_COOKIE}={token}; Path=/; HttpOnly"})
+
+
+def serve(port=8098, asset_delay=1.0, api_delay=0.2, panel_delay=0.1, data_path='kmit_data.json'):
+    with open(data_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    attendance, timetable = to_api_payloads(data)
+    NetraHandler.config = {
+        'asset_delay': asset_delay, 'api_delay': api_delay, 'panel_delay': panel_delay,
+        'attendance': attendance, 'timetable': timetable, 'data': data
+    }
+    server = ThreadingHTTPServer(('127.0.0.1', port), NetraHandler)
+    server.daemon_threads = True
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Stand-in for the KMIT Netra portal")
+    parser.add_argument('--port', type=int, default=8098)
+    parser.add_argument('--asset-delay', type=float, default=1.0, help="seconds to serve each image/font/analytics asset")
+    parser.add_argument('--api-delay', type=float, default=0.2, help="seconds per JSON API call")
+    parser.add_argument('--panel-delay', type=float, default=0.1, help="seconds a timetable panel takes to open")
+    parser.add_argument('--data', default='kmit_data.json')
+    args = parser.parse_args()
+    server = serve(args.port, args.asset_delay, args.api_delay, args.panel_delay, args.data)
+    print(f"Netra stand-in on http://127.0.0.1:{args.port}")
+    server.serve_forever()
@@ -0,0 +1,88 @@
+"""Check that the int8 ONNX embedder retrieves the same top-k as the PyTorch model.
+
+    python benchmarks/onnx_parity_check.py [--index faiss_index] [--k 4] [--min-overlap 0.95]
+
+Embeds every Data.json question with both backends, searches faiss_index with
+each and compares the top-k ids. Also reports per-query latency, load time
+and the resident memory each backend adds. Exits non-zero if the mean top-k
+overlap falls below --min-overlap.
+"""
+import os
+import sys
+import time
+import argparse
+import resource
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from curated import load_qa_records
+from embeddings import load_embedding_model
+
+
+def rss_mb():
+    # ru_maxrss is in KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def load(backend):
+    rss_before = rss_mb()
+    started = time.perf_counter()
+    model = load_embedding_model(backend)
+    model.embed_query("warmup")
+    return model, time.perf_counter() - started, rss_mb() - rss_before
+
+
+def embed_all(model, questions):
+    vectors, latencies = [], []
+    for question in questions:
+        started = time.perf_counter()
+        vectors.append(model.embed_query(question))
+        latencies.append(time.perf_counter() - started)
+    return np.array(vectors, dtype=np.float32), latencies
+
+
+def main():
+    import faiss
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--index', default='faiss_index')
+    parser.add_argument('--k', type=int, default=4)
+    parser.add_argument('--min-overlap', type=float, default=0.95)
+    args = parser.parse_args()
+
+    index = faiss.read_index(os.path.join(args.index, 'index.faiss'))
+    questions = [item['question'] for item in load_qa_records('Data.json')]
+
+    # Load ONNX first so its RSS delta isn't hidden under torch's
+    results = {}
+    for backend in ('onnx', 'huggingface'):
+        model, load_seconds, rss_delta = load(backend)
+        vectors, latencies = embed_all(model, questions)
+        _, ids = index.search(vectors, args.k)
+        results[backend] = {
+            'vectors': vectors, 'ids': ids, 'load_s': load_seconds, 'rss_mb': rss_delta,
+            'p50_ms': float(np.percentile(latencies, 50)) * 1000,
+            'p99_ms': float(np.percentile(latencies, 99)) * 1000
+        }
+
+    onnx, torch_ = results['onnx'], results['huggingface']
+    overlaps = [len(set(a) & set(b)) / args.k for a, b in zip(onnx['ids'], torch_['ids'])]
+    top1 = np.mean(onnx['ids'][:, 0] == torch_['ids'][:, 0])
+    cosine = np.sum(onnx['vectors'] * torch_['vectors'], axis=1) / (
+        np.linalg.norm(onnx['vectors'], axis=1) * np.linalg.norm(torch_['vectors'], axis=1))
+
+    print(f"{len(questions)} queries, k={args.k}")
+    print(f"top-{args.k} overlap: mean {np.mean(overlaps):.4f}, min {np.min(overlaps):.2f}; top-1 agreement {top1:.4f}")
+    print(f"cosine(onnx, torch): mean {np.mean(cosine):.4f}, min {np.min(cosine):.4f}\n")
+    print(f"{'backend':<12} {'load s':>7} {'+RSS MB':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for backend, r in results.items():
+        print(f"{backend:<12} {r['load_s']:>7.2f} {r['rss_mb']:>8.1f} {r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f}")
+
+    if np.mean(overlaps) < args.min_overlap:
+        print(f"\nFAIL: mean overlap below {args.min_overlap}")
+        sys.exit(1)
+    print("\nOK")
+
+
+if __name__ == '__main__':
+    main()
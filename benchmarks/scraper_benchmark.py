@@ -0,0 +1,134 @@
+"""Wall-clock time of one dashboard scrape, old waits vs the lean profile.
+
+    python benchmarks/scraper_benchmark.py [--runs 5] [--asset-delay 1.0] [--api-delay 0.2]
+
+Starts benchmarks/netra_standin.py and scrapes it three ways, each in a fresh
+browser context:
+
+  legacy  the previous flow: load/networkidle navigation, fixed 1 s sleeps,
+          one click per timetable panel, every image/font/analytics request
+  lean    sa.scrape_netra with apply_lean_profile (cold, logs in)
+  warm    sa.scrape_netra reusing the lean context's session cookie
+
+and checks each result against kmit_data.json. Needs playwright and chromium.
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import threading
+import statistics
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from netra_standin import serve
+import sa
+
+
+async def legacy_scrape(page, mobile_number):
+    # The pre-lean flow, kept here only as a baseline
+    data = {"attendance": [], "sessions": [], "overall_attendance_percentage": None, "timetable": []}
+    await page.goto(f"{sa.NETRA_URL}/", wait_until="load")
+    await page.wait_for_selector('#login_mobilenumber', timeout=3000)
+    await page.fill('#login_mobilenumber', mobile_number)
+    await page.fill('#login_password', 'Kmit123$')
+    await page.click('button[type="submit"]')
+    await page.wait_for_load_state('networkidle')
+
+    await page.goto(f"{sa.NETRA_URL}/student/attendance", wait_until="networkidle")
+    await page.wait_for_selector('.ant-page-header-heading-title', timeout=3000)
+    await page.click('//div[contains(@class, "ant-collapse-header") and .//h4[text()="Overall"]]')
+    await page.wait_for_selector('div.ant-collapse-content-active')
+    await page.wait_for_timeout(1000)
+    data['overall_attendance_percentage'] = await page.evaluate('''() => {
+        const style = document.querySelector('.ant-progress-bg').getAttribute('style');
+        const widthMatch = style.match(/width:\\s*([\\d.]+)%/);
+        return widthMatch ? parseFloat(widthMatch[1]) : null;
+    }''')
+    data['sessions'] = await page.evaluate('''() => Array.from(document.querySelectorAll(
+        'div.ant-collapse-content-active span > svg')).map(svg => svg.getAttribute('fill') === 'green' ? 'Present' : 'Absent')''')
+
+    await page.goto(f"{sa.NETRA_URL}/student/time-table", wait_until="networkidle")
+    await page.wait_for_selector('.ant-page-header-heading-title', timeout=3000)
+    for header in await page.query_selector_all('//div[contains(@class, "ant-collapse-header")]'):
+        await header.click()
+        await page.wait_for_timeout(1000)
+    data['timetable'] = await page.evaluate('''() => Array.from(document.querySelectorAll('div.ant-collapse-item')).map(day => ({
+        header: day.querySelector('.ant-collapse-header').innerText.trim(),
+        rows: Array.from(day.querySelectorAll('div.ant-collapse-content-box table tr')).map(row =>
+            Array.from(row.querySelectorAll('td, th')).map(col => col.innerText.trim()))
+    }))''')
+    return data
+
+
+def matches(data, expected):
+    return (data['overall_attendance_percentage'] == expected['overall_attendance_percentage']
+            and data['sessions'] == expected['sessions']
+            and data['timetable'] == expected['timetable'])
+
+
+async def timed(fn):
+    started = time.perf_counter()
+    result = await fn()
+    return result, time.perf_counter() - started
+
+
+async def run(runs, mobile_number, expected):
+    from playwright.async_api import async_playwright
+
+    timings = {'legacy': [], 'lean': [], 'warm': []}
+    correct = {mode: 0 for mode in timings}
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        for _ in range(runs):
+            context = await browser.new_context()
+            page = await context.new_page()
+            data, seconds = await timed(lambda: legacy_scrape(page, mobile_number))
+            timings['legacy'].append(seconds)
+            correct['legacy'] += matches(data, expected)
+            await context.close()
+
+            context = await browser.new_context()
+            await sa.apply_lean_profile(context)
+            page = await context.new_page()
+            (data, _), seconds = await timed(lambda: sa.scrape_netra(page, mobile_number))
+            timings['lean'].append(seconds)
+            correct['lean'] += matches(data, expected)
+            await page.close()
+
+            page = await context.new_page()
+            (data, _), seconds = await timed(lambda: sa.scrape_netra(page, mobile_number, reuse_session=True))
+            timings['warm'].append(seconds)
+            correct['warm'] += matches(data, expected)
+            await context.close()
+        await browser.close()
+    return timings, correct
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--port', type=int, default=8098)
+    parser.add_argument('--asset-delay', type=float, default=1.0)
+    parser.add_argument('--api-delay', type=float, default=0.2)
+    parser.add_argument('--panel-delay', type=float, default=0.1)
+    parser.add_argument('--mobile', default='9999999999')
+    args = parser.parse_args()
+
+    server = serve(args.port, args.asset_delay, args.api_delay, args.panel_delay)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    sa.NETRA_URL = f"http://127.0.0.1:{args.port}"
+    expected = server.RequestHandlerClass.config['data']
+
+    timings, correct = asyncio.run(run(args.runs, args.mobile, expected))
+    server.shutdown()
+
+    print(f"\n{args.runs} runs, asset delay {args.asset_delay}s, api delay {args.api_delay}s\n")
+    print(f"{'mode':<8} {'mean s':>8} {'min s':>8} {'max s':>8} {'correct':>8}")
+    for mode, values in timings.items():
+        print(f"{mode:<8} {statistics.mean(values):>8.2f} {min(values):>8.2f} {max(values):>8.2f} "
+              f"{correct[mode]:>5}/{args.runs}")
+
+
+if __name__ == '__main__':
+    main()
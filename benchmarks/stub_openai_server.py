@@ -0,0 +1,123 @@
+"""Minimal OpenAI-compatible chat completions server for local testing.
+
+    python benchmarks/stub_openai_server.py [--port 8099] [--latency 0.5] [--jitter 0.2]
+                                            [--error-rate 0.0] [--tokens 40]
+
+Answers POST /v1/chat/completions (streaming and non-streaming) after a
+configurable delay, and fails a configurable fraction of requests with 429 or
+503 so retries can be observed. Run the app against it with
+LLM_BASE_URL=http://127.0.0.1:8099/v1.
+"""
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+WORDS = ("KMIT offers B.Tech programmes in CSE, CSM, CSD and IT with an intake decided by "
+         "the university. Admissions follow the EAPCET counselling process.").split()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    config = {}
+    lock = threading.Lock()
+    stats = {'requests': 0, 'errors': 0}
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path.rstrip('/') == '/stats':
+            with self.lock:
+                self._send_json(200, dict(self.stats))
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length) or b'{}')
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send_json(404, {'error': {'message': 'not found'}})
+            return
+        with self.lock:
+            self.stats['requests'] += 1
+        config = self.config
+        model_latency = config['model_latency'].get(request.get('model'), config['latency'])
+        delay = max(0.0, random.gauss(model_latency, config['jitter']))
+
+        if random.random() < config['error_rate']:
+            with self.lock:
+                self.stats['errors'] += 1
+            time.sleep(delay / 4)
+            self._send_json(random.choice([429, 503]), {'error': {'message': 'stub overloaded'}})
+            return
+
+        words = [random.choice(WORDS) for _ in range(config['tokens'])]
+        created = int(time.time())
+        if not request.get('stream'):
+            time.sleep(delay)
+            self._send_json(200, {
+                'id': 'chatcmpl-stub', 'object': 'chat.completion', 'created': created,
+                'model': request.get('model'),
+                'choices': [{'index': 0, 'finish_reason': 'stop',
+                             'message': {'role': 'assistant', 'content': " ".join(words)}}],
+                'usage': {'prompt_tokens': sum(len(m.get('content', '')) // 4 for m in request.get('messages', [])),
+                          'completion_tokens': len(words), 'total_tokens': 0}
+            })
+            return
+
+        # Time to first token is the configured latency, the rest trickles out
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        time.sleep(delay)
+        for i, word in enumerate(words):
+            chunk = {
+                'id': 'chatcmpl-stub', 'object': 'chat.completion.chunk', 'created': created,
+                'model': request.get('model'),
+                'choices': [{'index': 0, 'delta': {'content': word + ' '}, 'finish_reason': None}]
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+            time.sleep(config['token_interval'])
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+
+def serve(port=8099, latency=0.5, jitter=0.0, error_rate=0.0, tokens=40, token_interval=0.01, model_latency=None):
+    StubHandler.config = {
+        'latency': latency, 'jitter': jitter, 'error_rate': error_rate, 'tokens': tokens,
+        'token_interval': token_interval, 'model_latency': model_latency or {}
+    }
+    server = ThreadingHTTPServer(('127.0.0.1', port), StubHandler)
+    server.daemon_threads = True
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Stub OpenAI-compatible server")
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--latency', type=float, default=0.5, help="seconds before the answer / first token")
+    parser.add_argument('--jitter', type=float, default=0.0, help="std-dev of the latency in seconds")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of requests failed with 429/503")
+    parser.add_argument('--tokens', type=int, default=40)
+    parser.add_argument('--token-interval', type=float, default=0.01)
+    parser.add_argument('--model-latency', action='append', default=[], metavar='MODEL=SECONDS',
+                        help="per-model latency override, e.g. for a fast fallback model")
+    args = parser.parse_args()
+    overrides = dict((m, float(s)) for m, s in (item.split('=', 1) for item in args.model_latency))
+    server = serve(args.port, args.latency, args.jitter, args.error_rate, args.tokens, args.token_interval, overrides)
+    print(f"Stub OpenAI server on http://127.0.0.1:{args.port}/v1")
+    server.serve_forever()
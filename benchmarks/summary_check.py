@@ -0,0 +1,100 @@
+"""Check that the rolling summary reaches the edge of the history window.
+
+    python benchmarks/summary_check.py
+
+A student with a long pre-existing history (200 turns, no summary yet) keeps
+chatting. After every fold the summary must cover up to the turn just before
+the window, so nothing between the summary and the window is missing from the
+prompt. Exits non-zero otherwise.
+"""
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from chat_memory import update_summary, load_recent_turns, HISTORY_MAX_TURNS, SUMMARY_BATCH_TURNS
+
+USER_ID = 'student-1'
+START = datetime(2024, 1, 1)
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, key, direction):
+        self.docs = sorted(self.docs, key=lambda d: d[key], reverse=direction < 0)
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    def __iter__(self):
+        return iter(self.docs)
+
+
+def matches(doc, query):
+    for key, cond in query.items():
+        value = doc.get(key)
+        if not isinstance(cond, dict):
+            if value != cond:
+                return False
+            continue
+        if '$lt' in cond and not value < cond['$lt']:
+            return False
+        if '$gt' in cond and not value > cond['$gt']:
+            return False
+    return True
+
+
+class FakeCollection:
+    # Just enough of a pymongo collection for chat_memory
+    def __init__(self):
+        self.docs = []
+
+    def find(self, query, projection=None):
+        return FakeCursor([dict(d) for d in self.docs if matches(d, query)])
+
+    def find_one(self, query, projection=None):
+        return next((dict(d) for d in self.docs if matches(d, query)), None)
+
+    def update_one(self, query, update, upsert=False):
+        for d in self.docs:
+            if matches(d, query):
+                d.update(update['$set'])
+                return
+        if upsert:
+            self.docs.append({**query, **update['$set']})
+
+
+def main():
+    history = FakeCollection()
+    summaries = FakeCollection()
+    for i in range(200):
+        history.docs.append({'user_id': USER_ID, 'query': f"question {i}", 'response': f"answer {i}",
+                             'timestamp': START + timedelta(minutes=i)})
+
+    ok = True
+    for i in range(200, 240):
+        history.docs.append({'user_id': USER_ID, 'query': f"question {i}", 'response': f"answer {i}",
+                             'timestamp': START + timedelta(minutes=i)})
+        if (i - 200) % SUMMARY_BATCH_TURNS:
+            continue
+        window = load_recent_turns(history, USER_ID)
+        window_start = window[0]['timestamp']
+        doc = update_summary(history, summaries, USER_ID, window_start, lambda prompt: f"summary after turn {i}")
+        edge = window_start - timedelta(minutes=1)
+        reached = doc is not None and doc['summarized_until'] == edge
+        print(f"turn {i}: summarized until {doc['summarized_until'] if doc else None}, "
+              f"window starts {window_start} {'ok' if reached else 'GAP'}")
+        ok = reached and ok
+
+    if not ok:
+        print(f"\nFAIL (window of {HISTORY_MAX_TURNS} turns)")
+        sys.exit(1)
+    print("\nOK")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Check that queued chat writes survive a SIGTERM.
+
+    python benchmarks/write_behind_check.py
+
+Starts a child process with a WriteBehindQueue whose flush interval is far in
+the future, queues an insert and sends the child SIGTERM (what docker stop,
+systemd and load_test.py's terminate() do). The insert must end up written
+to the collection, or, when the collection is unreachable, on disk in the
+spill for the next start. Exits non-zero otherwise.
+"""
+import os
+import sys
+import time
+import signal
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import sys, json, time
+from pymongo.errors import PyMongoError
+from write_behind import WriteBehindQueue
+
+written_path, spill_path, reachable = sys.argv[1], sys.argv[2], sys.argv[3] == '1'
+
+class FileCollection:
+    # Stands in for the chat_history collection: bulk writes are appended to a file
+    def bulk_write(self, requests, ordered=True):
+        if not reachable:
+            raise PyMongoError("server selection timed out")
+        with open(written_path, 'a') as f:
+            for request in requests:
+                f.write(json.dumps(request._doc, default=str) + '\\n')
+
+queue = WriteBehindQueue(FileCollection(), batch_size=100, flush_interval_ms=60000, spill_path=spill_path)
+queue.close_on_sigterm()
+queue.insert({'_id': 'chat-1', 'query': 'What is the EAPCET code for KMIT?'})
+print('queued', flush=True)
+time.sleep(60)
+"""
+
+
+def run(reachable):
+    with tempfile.TemporaryDirectory() as tmp:
+        written_path = os.path.join(tmp, 'written.jsonl')
+        spill_path = os.path.join(tmp, 'spill.jsonl')
+        child = subprocess.Popen([sys.executable, '-c', CHILD, written_path, spill_path, '1' if reachable else '0'],
+                                 cwd=ROOT, stdout=subprocess.PIPE, text=True)
+        assert child.stdout.readline().strip() == 'queued'
+        time.sleep(0.2)
+        child.send_signal(signal.SIGTERM)
+        child.wait(timeout=30)
+        # A failed replay leaves the spill renamed to .draining, which the next start also replays
+        targets = [written_path] if reachable else [spill_path, spill_path + '.draining']
+        kept = any(os.path.exists(target) and 'chat-1' in open(target).read() for target in targets)
+    where = 'written' if reachable else 'spilled'
+    print(f"mongo {'up' if reachable else 'down'}: {where} {'ok' if kept else 'LOST'} (exit code {child.returncode})")
+    return kept
+
+
+def main():
+    ok = run(reachable=True)
+    ok = run(reachable=False) and ok
+    if not ok:
+        print("\nFAIL")
+        sys.exit(1)
+    print("\nOK")
+
+
+if __name__ == '__main__':
+    main()
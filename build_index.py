@@ -0,0 +1,191 @@
+"""Incrementally (re)build faiss_index from the curated Q/A sources.
+
+    python build_index.py [--index faiss_index] [--sources Data.json Updated_Data.json]
+                          [--index-type flat|ivf|hnsw|ivfpq]
+
+Each Q/A record is hashed and the hashes live in faiss_index/manifest.json,
+so only new or changed records are embedded and deleted ones are removed.
+Documents in the index that did not come from these sources (the scraped
+site content) are left untouched. With --index-type, an ANN index is derived
+from the flat index after every build (see ann_index.py).
+
+Every build is written to its own directory under faiss_index.versions/, and
+faiss_index is a symlink that is switched to the new build with one atomic
+rename, so readers always see a complete index. The newest KEEP_VERSIONS
+builds are kept; a process still running on an older one keeps its open files.
+"""
+import os
+import json
+import shutil
+import hashlib
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from langchain_community.vectorstores import FAISS
+from langchain_community.embeddings import HuggingFaceEmbeddings
+from curated import CURATED_SOURCES, load_qa_records
+from docstore import export_docstore, DOCSTORE_NAME
+from ann_index import INDEX_TYPES, ann_index_path, build_ann_index, is_ann_index_file
+
+MANIFEST_NAME = 'manifest.json'
+KEEP_VERSIONS = int(os.environ.get('INDEX_KEEP_VERSIONS', '3'))
+EMBEDDING_MODEL = 'all-MiniLM-L6-v2'
+
+
+def record_hash(question, answer):
+    return hashlib.sha1(f"{question.strip()}\0{answer.strip()}".encode('utf-8')).hexdigest()
+
+
+def load_records(sources):
+    # Keyed by hash, so the same pair appearing in both sources is indexed once
+    records = {}
+    for path in sources:
+        for item in load_qa_records(path):
+            records[record_hash(item['question'], item['answer'])] = {
+                'question': item['question'].strip(),
+                'answer': item['answer'].strip(),
+                'source': path
+            }
+    return records
+
+
+def load_manifest(index_dir):
+    path = os.path.join(index_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {'model': EMBEDDING_MODEL, 'records': []}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def embed_batches(embeddings, texts, batch_size, workers):
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(embeddings.embed_documents, batches)
+    vectors = []
+    for batch in results:
+        vectors.extend(batch)
+    return vectors
+
+
+def versions_dir(index_dir):
+    return index_dir.rstrip('/') + '.versions'
+
+
+def write_version(vectorstore, index_dir, manifest):
+    """Save a complete build into a new directory under faiss_index.versions/ and return its path."""
+    version = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+    tmp_dir = os.path.join(versions_dir(index_dir), version + '.tmp')
+    os.makedirs(versions_dir(index_dir), exist_ok=True)
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    vectorstore.save_local(tmp_dir)
+    # index.pkl is kept for the next incremental build, the app reads the SQLite docstore
+    export_docstore(vectorstore, tmp_dir)
+    for name in os.listdir(index_dir) if os.path.isdir(index_dir) else []:
+        # Keep any extra files that live next to the index; ANN indexes are
+        # derived from the old vectors and must be rebuilt
+        if is_ann_index_file(name) or name in (MANIFEST_NAME, DOCSTORE_NAME):
+            continue
+        if not os.path.exists(os.path.join(tmp_dir, name)):
+            shutil.copy2(os.path.join(index_dir, name), os.path.join(tmp_dir, name))
+    with open(os.path.join(tmp_dir, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    version_dir = tmp_dir[:-len('.tmp')]
+    os.rename(tmp_dir, version_dir)
+    return version_dir
+
+
+def activate_version(index_dir, version_dir):
+    """Point the index_dir symlink at version_dir with a single atomic rename."""
+    index_dir = index_dir.rstrip('/')
+    link_tmp = index_dir + '.link.tmp'
+    if os.path.lexists(link_tmp):
+        os.remove(link_tmp)
+    os.symlink(os.path.relpath(version_dir, os.path.dirname(os.path.abspath(index_dir))), link_tmp)
+    if os.path.isdir(index_dir) and not os.path.islink(index_dir):
+        # First versioned build: the plain directory moves under the versions
+        # (a directory can't be replaced by a symlink in one rename, so this once isn't atomic)
+        built_at = time.strftime('%Y%m%d-%H%M%S', time.localtime(os.path.getmtime(index_dir)))
+        os.rename(index_dir, os.path.join(versions_dir(index_dir), built_at + '-initial'))
+    os.replace(link_tmp, index_dir)
+
+
+def prune_versions(index_dir, keep=KEEP_VERSIONS):
+    current = os.path.realpath(index_dir)
+    root = versions_dir(index_dir)
+    builds = sorted(name for name in os.listdir(root) if not name.endswith('.tmp'))
+    for name in builds[:-keep] if keep > 0 else builds:
+        path = os.path.join(root, name)
+        if os.path.realpath(path) != current:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def write_ann_index(index_dir, index_type):
+    import faiss
+
+    started = time.perf_counter()
+    flat_index = faiss.read_index(os.path.join(index_dir, 'index.faiss'))
+    ann_index = build_ann_index(flat_index, index_type)
+    path = ann_index_path(index_dir, index_type)
+    faiss.write_index(ann_index, path + '.tmp')
+    os.replace(path + '.tmp', path)
+    print(f"Wrote {path} in {time.perf_counter() - started:.1f}s")
+
+
+def build_index(index_dir='faiss_index', sources=CURATED_SOURCES, batch_size=64, workers=4, embeddings=None,
+                index_type='flat'):
+    started = time.perf_counter()
+    embeddings = embeddings or HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+    records = load_records(sources)
+    manifest = load_manifest(index_dir)
+    indexed = set(manifest.get('records', []))
+
+    added = [h for h in records if h not in indexed]
+    removed = [h for h in indexed if h not in records]
+    print(f"{len(records)} records: {len(added)} new/changed, {len(removed)} removed, "
+          f"{len(records) - len(added)} unchanged")
+    if not added and not removed and os.path.exists(os.path.join(index_dir, 'index.faiss')):
+        print("Index is up to date")
+        if index_type != 'flat' and not os.path.exists(ann_index_path(index_dir, index_type)):
+            write_ann_index(index_dir, index_type)
+        return
+
+    # Embed the question only: user queries are matched against curated
+    # questions, while the stored text carries the answer as context
+    questions = [records[h]['question'] for h in added]
+    vectors = embed_batches(embeddings, questions, batch_size, workers) if added else []
+    text_embeddings = [
+        (f"Question: {records[h]['question']}\nAnswer: {records[h]['answer']}", vector)
+        for h, vector in zip(added, vectors)
+    ]
+    metadatas = [dict(records[h], record_hash=h) for h in added]
+
+    if os.path.exists(os.path.join(index_dir, 'index.faiss')):
+        vectorstore = FAISS.load_local(index_dir, embeddings=embeddings, allow_dangerous_deserialization=True)
+        if removed:
+            vectorstore.delete(removed)
+        if text_embeddings:
+            vectorstore.add_embeddings(text_embeddings, metadatas=metadatas, ids=added)
+    else:
+        vectorstore = FAISS.from_embeddings(text_embeddings, embeddings, metadatas=metadatas, ids=added)
+
+    manifest = {'model': EMBEDDING_MODEL, 'records': sorted(records)}
+    version_dir = write_version(vectorstore, index_dir, manifest)
+    if index_type != 'flat':
+        write_ann_index(version_dir, index_type)
+    activate_version(index_dir, version_dir)
+    prune_versions(index_dir)
+    print(f"Wrote {version_dir} ({vectorstore.index.ntotal} vectors) and pointed {index_dir} at it "
+          f"in {time.perf_counter() - started:.1f}s")
+    print("Send SIGHUP to a running app.py to load it and drop its cached answers")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Incrementally build the FAISS knowledge-base index")
+    parser.add_argument('--index', default='faiss_index', help="index directory")
+    parser.add_argument('--sources', nargs='+', default=CURATED_SOURCES, help="Q/A JSON files")
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--index-type', choices=INDEX_TYPES, default='flat',
+                        help="also build this ANN index next to the flat one")
+    args = parser.parse_args()
+    build_index(args.index, args.sources, args.batch_size, args.workers, index_type=args.index_type)
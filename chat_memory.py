@@ -0,0 +1,270 @@
+import os
+import sys
+import time
+import base64
+import threading
+from datetime import datetime
+from collections import OrderedDict
+from bson import ObjectId
+from langchain_core.messages import HumanMessage, AIMessage
+
+# Conversation window settings for /api/chat
+HISTORY_MAX_TURNS = int(os.environ.get('HISTORY_MAX_TURNS', '6'))
+HISTORY_TOKEN_BUDGET = int(os.environ.get('HISTORY_TOKEN_BUDGET', '600'))
+SUMMARY_TOKEN_BUDGET = int(os.environ.get('SUMMARY_TOKEN_BUDGET', '200'))
+# Number of evicted turns to collect before folding them into the summary
+SUMMARY_BATCH_TURNS = int(os.environ.get('SUMMARY_BATCH_TURNS', '4'))
+
+# In-process cache of recent turns per user
+HISTORY_CACHE_MAX_USERS = int(os.environ.get('HISTORY_CACHE_MAX_USERS', '1000'))
+HISTORY_CACHE_TTL = int(os.environ.get('HISTORY_CACHE_TTL', '600'))  # seconds
+
+
+def estimate_tokens(text):
+    # Rough estimate (~4 characters per token) so we don't need a tokenizer
+    if not text:
+        return 0
+    return max(1, len(text) // 4)
+
+
+def truncate_to_tokens(text, budget):
+    if estimate_tokens(text) <= budget:
+        return text
+    return text[:budget * 4].rsplit(' ', 1)[0] + '...'
+
+
+def load_recent_turns(collection, user_id, limit=HISTORY_MAX_TURNS):
+    # Newest N turns via the (user_id, timestamp) index, returned oldest first
+    records = list(collection.find(
+        {'user_id': user_id},
+        {'_id': 0, 'query': 1, 'response': 1, 'timestamp': 1}
+    ).sort('timestamp', -1).limit(limit))
+    records.reverse()
+    return records
+
+
+def build_window(records, budget=HISTORY_TOKEN_BUDGET):
+    """Turn history records into messages, keeping the newest turns that fit the budget.
+
+    Returns (messages, oldest_timestamp) where oldest_timestamp is the timestamp
+    of the oldest turn that made it into the window (None if none did).
+    """
+    kept = []
+    used = 0
+    for record in reversed(records):
+        cost = estimate_tokens(record['query']) + estimate_tokens(record['response'])
+        if kept and used + cost > budget:
+            break
+        kept.append(record)
+        used += cost
+    kept.reverse()
+
+    messages = []
+    for record in kept:
+        messages.append(HumanMessage(content=record['query']))
+        messages.append(AIMessage(content=record['response']))
+    oldest = kept[0]['timestamp'] if kept else None
+    return messages, oldest
+
+
+def load_summary(summary_collection, user_id):
+    doc = summary_collection.find_one({'user_id': user_id}, {'_id': 0, 'summary': 1, 'summarized_until': 1})
+    return doc or {}
+
+
+def update_summary(chat_history_collection, summary_collection, user_id, window_start, summarize, doc=None):
+    """Fold turns that have dropped out of the window into the user's rolling summary.
+
+    Only turns newer than the last summarized timestamp are read, so each turn is
+    summarized once no matter how long the history grows. The newest evicted turns
+    are folded, so the summary always reaches the edge of the window; on a long
+    backlog (e.g. the first fold for an existing user) older unsummarized turns are
+    skipped rather than summarized ahead of the recent ones. Returns the new summary
+    document, or None if there was not enough to fold yet.
+    """
+    if window_start is None:
+        return None
+    if doc is None:
+        doc = load_summary(summary_collection, user_id)
+    time_filter = {'$lt': window_start}
+    if doc.get('summarized_until'):
+        time_filter['$gt'] = doc['summarized_until']
+
+    evicted = list(chat_history_collection.find(
+        {'user_id': user_id, 'timestamp': time_filter},
+        {'_id': 0, 'query': 1, 'response': 1, 'timestamp': 1}
+    ).sort('timestamp', -1).limit(SUMMARY_BATCH_TURNS * 4))
+    if len(evicted) < SUMMARY_BATCH_TURNS:
+        return None
+    evicted.reverse()
+
+    turns = "\n".join(
+        f"User: {record['query']}\nAssistant: {truncate_to_tokens(record['response'], 150)}"
+        for record in evicted
+    )
+    prompt = f"""
+Update the running summary of a conversation between a student and the KMIT assistant.
+Keep the facts the student asked about and anything they told us about themselves.
+Write at most {SUMMARY_TOKEN_BUDGET * 3 // 4} words.
+
+Current Summary:
+{doc.get('summary', '(none)')}
+
+New Turns:
+{turns}
+
+Updated Summary: """
+    summary = truncate_to_tokens(summarize(prompt.strip()).strip(), SUMMARY_TOKEN_BUDGET)
+    new_doc = {'summary': summary, 'summarized_until': evicted[-1]['timestamp']}
+    summary_collection.update_one({'user_id': user_id}, {'$set': new_doc}, upsert=True)
+    return new_doc
+
+
+
+def encode_history_cursor(chat):
+    # Legacy records without a datetime timestamp page by _id alone
+    timestamp = chat.get('timestamp')
+    key = f"{timestamp.isoformat() if isinstance(timestamp, datetime) else ''}|{chat['_id']}"
+    return base64.urlsafe_b64encode(key.encode('utf-8')).decode('ascii')
+
+
+def decode_history_cursor(cursor):
+    timestamp, chat_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('|')
+    return (datetime.fromisoformat(timestamp) if timestamp else None), ObjectId(chat_id)
+
+
+def load_history_page(collection, user_id, limit, before=None, projection=None):
+    """Newest-first page of a user's chats; returns (chats, next_cursor).
+
+    Chats with a datetime timestamp are paged by (timestamp, _id). Legacy
+    records whose timestamp is missing or stored as another type follow all of
+    them, newest _id first. before is a decoded next_cursor from the previous page.
+    """
+    timestamp, chat_id = before or (None, None)
+
+    def page(match, sort, count):
+        # One extra row tells us whether there is another page
+        pipeline = [{'$match': match}, {'$sort': sort}, {'$limit': count}]
+        if projection:
+            pipeline.append({'$project': projection})
+        return list(collection.aggregate(pipeline))
+
+    chats = []
+    if chat_id is None or timestamp is not None:
+        match = {'user_id': user_id, 'timestamp': {'$type': 'date'}}
+        if chat_id is not None:
+            # Keyset: strictly older than the last chat of the previous page
+            match['$or'] = [
+                {'timestamp': {'$lt': timestamp}},
+                {'timestamp': timestamp, '_id': {'$lt': chat_id}}
+            ]
+        chats = page(match, {'timestamp': -1, '_id': -1}, limit + 1)
+    if len(chats) <= limit:
+        match = {'user_id': user_id, 'timestamp': {'$not': {'$type': 'date'}}}
+        if chat_id is not None and timestamp is None:
+            match['_id'] = {'$lt': chat_id}
+        chats += page(match, {'_id': -1}, limit + 1 - len(chats))
+    next_cursor = encode_history_cursor(chats[limit - 1]) if len(chats) > limit else None
+    return chats[:limit], next_cursor
+
+class ConversationCache:
+    """Bounded LRU/TTL cache of each user's recent turns and summary.
+
+    Entries are filled from Mongo on a miss and then kept current by the chat
+    handler, so repeat messages from the same user skip the history read.
+    """
+
+    def __init__(self, max_users=HISTORY_CACHE_MAX_USERS, ttl=HISTORY_CACHE_TTL, max_turns=HISTORY_MAX_TURNS):
+        self.max_users = max_users
+        self.ttl = ttl
+        self.max_turns = max_turns
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _get(self, user_id):
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        if time.monotonic() - entry['loaded_at'] > self.ttl:
+            del self._entries[user_id]
+            return None
+        self._entries.move_to_end(user_id)
+        return entry
+
+    def get(self, user_id, loader):
+        """Return (records, summary_doc) for a user, calling loader() on a miss."""
+        with self._lock:
+            entry = self._get(user_id)
+            if entry is not None:
+                self.hits += 1
+                return list(entry['records']), entry['summary']
+            self.misses += 1
+        records, summary = loader()
+        with self._lock:
+            self._entries[user_id] = {
+                'records': list(records[-self.max_turns:]),
+                'summary': summary,
+                # Force a summary check on the first turn after a cold load
+                'turns_since_fold': SUMMARY_BATCH_TURNS,
+                'loaded_at': time.monotonic()
+            }
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return list(records), summary
+
+    def append(self, user_id, record):
+        """Add a freshly inserted turn and return how many turns ago the summary was last checked."""
+        with self._lock:
+            entry = self._get(user_id)
+            if entry is None:
+                return SUMMARY_BATCH_TURNS
+            entry['records'].append(record)
+            del entry['records'][:-self.max_turns]
+            entry['turns_since_fold'] += 1
+            return entry['turns_since_fold']
+
+    def set_summary(self, user_id, summary):
+        with self._lock:
+            entry = self._get(user_id)
+            if entry is not None:
+                entry['summary'] = summary
+                entry['turns_since_fold'] = 0
+
+    def mark_checked(self, user_id):
+        with self._lock:
+            entry = self._get(user_id)
+            if entry is not None:
+                entry['turns_since_fold'] = 0
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def memory_bytes(self):
+        # Approximate size of the cached strings, good enough for monitoring
+        total = sys.getsizeof(self._entries)
+        for user_id, entry in list(self._entries.items()):
+            total += sys.getsizeof(user_id)
+            for record in entry['records']:
+                total += sys.getsizeof(record['query']) + sys.getsizeof(record['response'])
+            total += sys.getsizeof((entry['summary'] or {}).get('summary') or '')
+        return total
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'users': len(self._entries),
+                'max_users': self.max_users,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'memory_bytes': self.memory_bytes()
+            }
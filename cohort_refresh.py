@@ -0,0 +1,296 @@
+"""Pre-warm dashboard snapshots for a whole cohort before the morning rush.
+
+    python cohort_refresh.py --mobiles mobiles.txt       # one mobile number per line
+    python cohort_refresh.py --from-users                # every user with a mobile_number
+    python cohort_refresh.py --from-users --at 06:30     # every day at 06:30
+
+Students are scraped through the pooled ScraperService by a bounded worker
+pool, with starts to the portal host rate-limited. Every finished student is
+appended to a checkpoint file, so a run that crashes picks up where it left
+off (failed students are retried). Results go into the dashboard_snapshots
+collection /api/dashboard-data reads from, along with their change history,
+and a report of throughput, failures and per-stage timings is printed at the
+end.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import statistics
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+MONGO_URI = os.environ.get('MONGO_URI', 'mongodb://localhost:27017/')
+COHORT_WORKERS = int(os.environ.get('COHORT_WORKERS', '4'))
+# Scrapes started per second against one portal host
+COHORT_RATE_PER_HOST = float(os.environ.get('COHORT_RATE_PER_HOST', '2'))
+COHORT_CHECKPOINT = os.environ.get('COHORT_CHECKPOINT', 'cohort_checkpoint.jsonl')
+
+
+class HostRateLimiter:
+    """Token bucket per host: at most `rate` starts per second, bursts up to `burst`."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}  # host -> (tokens, last refill)
+        self._lock = threading.Lock()
+
+    def acquire(self, host):
+        """Block until host has a token; returns the seconds spent waiting."""
+        if self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                tokens, last = self._buckets.get(host, (self.burst, now))
+                tokens = min(self.burst, tokens + (now - last) * self.rate)
+                if tokens >= 1:
+                    self._buckets[host] = (tokens - 1, now)
+                    return waited
+                self._buckets[host] = (tokens, now)
+                delay = (1 - tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class Checkpoint:
+    """Append-only JSONL of finished students for one day's run."""
+
+    def __init__(self, path, run_date):
+        self.path = path
+        self.run_date = run_date
+        self.done = {}  # mobile number -> last record
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            lines = self._read(path)
+            if lines and lines[0].get('run_date') == run_date:
+                for record in lines[1:]:
+                    self.done[record['mobile_number']] = record
+            else:
+                # Yesterday's (or an unreadable) checkpoint: start over
+                lines = []
+            if not lines:
+                os.remove(path)
+        if not os.path.exists(path):
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(json.dumps({'run_date': run_date}) + '\n')
+
+    @staticmethod
+    def _read(path):
+        # A crash mid-append leaves a truncated last line; keep everything before
+        # it and rewrite the file so the next append starts on a fresh line
+        lines = []
+        with open(path, 'r', encoding='utf-8') as f:
+            raw = f.read().splitlines()
+        for line in raw:
+            if not line.strip():
+                continue
+            try:
+                lines.append(json.loads(line))
+            except ValueError:
+                print(f"Dropping unreadable checkpoint line in {path}: {line[:80]!r}")
+                with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                    f.writelines(json.dumps(record) + '\n' for record in lines)
+                os.replace(path + '.tmp', path)
+                break
+        return lines
+
+    def succeeded(self, mobile_number):
+        record = self.done.get(mobile_number)
+        return record is not None and record['status'] == 'ok'
+
+    def record(self, record):
+        with self._lock:
+            self.done[record['mobile_number']] = record
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def load_mobiles(path=None, users_collection=None):
+    mobiles = []
+    if path:
+        with open(path, 'r', encoding='utf-8') as f:
+            mobiles.extend(line.strip() for line in f if line.strip() and not line.startswith('#'))
+    if users_collection is not None:
+        cursor = users_collection.find({'mobile_number': {'$exists': True, '$nin': [None, '']}}, {'mobile_number': 1})
+        mobiles.extend(str(user['mobile_number']) for user in cursor)
+    # Keep the order, drop duplicates
+    return list(dict.fromkeys(mobiles))
+
+
+def refresh_student(mobile_number, scrape, limiter, host, store):
+    from dashboard_jobs import has_dashboard_data
+
+    timings = {}
+    started = time.perf_counter()
+    record = {'mobile_number': mobile_number, 'status': 'ok', 'error': None}
+    try:
+        timings['rate_limited'] = limiter.acquire(host)
+        data = scrape(mobile_number, timings=timings)
+        if not has_dashboard_data(data):
+            raise RuntimeError("The portal returned no dashboard data")
+        if store is not None:
+            save_started = time.perf_counter()
+            store(mobile_number, data)
+            timings['store'] = time.perf_counter() - save_started
+    except Exception as e:
+        record['status'] = 'failed'
+        record['error'] = str(e) or type(e).__name__
+    record['seconds'] = round(time.perf_counter() - started, 3)
+    record['stages'] = {name: round(seconds, 3) for name, seconds in timings.items()}
+    record['finished_at'] = datetime.now().isoformat()
+    return record
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def build_report(records, skipped, elapsed):
+    ok = [r for r in records if r['status'] == 'ok']
+    failed = [r for r in records if r['status'] != 'ok']
+    stages = {}
+    for record in records:
+        for name, seconds in record['stages'].items():
+            stages.setdefault(name, []).append(seconds)
+    return {
+        'students': len(records) + skipped,
+        'refreshed': len(ok),
+        'failed': len(failed),
+        'skipped_from_checkpoint': skipped,
+        'elapsed_seconds': round(elapsed, 1),
+        'students_per_minute': round(len(records) / elapsed * 60, 1) if elapsed > 0 else None,
+        'seconds_per_student': {
+            'p50': percentile([r['seconds'] for r in records], 50),
+            'p95': percentile([r['seconds'] for r in records], 95)
+        } if records else {},
+        'stages': {
+            name: {
+                'mean': round(statistics.mean(values), 3),
+                'p50': percentile(values, 50),
+                'p95': percentile(values, 95)
+            }
+            for name, values in stages.items()
+        },
+        'failures': [{'mobile_number': r['mobile_number'], 'error': r['error']} for r in failed]
+    }
+
+
+def print_report(report):
+    print(f"\nRefreshed {report['refreshed']}/{report['students']} students in {report['elapsed_seconds']}s "
+          f"({report['students_per_minute']} per minute), {report['failed']} failed, "
+          f"{report['skipped_from_checkpoint']} already done")
+    if report['stages']:
+        print(f"\n{'stage':<14} {'mean s':>8} {'p50 s':>8} {'p95 s':>8}")
+        for name, values in report['stages'].items():
+            print(f"{name:<14} {values['mean']:>8.3f} {values['p50']:>8.3f} {values['p95']:>8.3f}")
+    errors = {}
+    for failure in report['failures']:
+        errors[failure['error']] = errors.get(failure['error'], 0) + 1
+    for error, count in sorted(errors.items(), key=lambda item: -item[1])[:10]:
+        print(f"  {count} x {error}")
+
+
+def run_cohort(mobiles, scrape, store=None, workers=COHORT_WORKERS, rate_per_host=COHORT_RATE_PER_HOST,
+               checkpoint_path=COHORT_CHECKPOINT, host=None, limit=None):
+    """Refresh every mobile number not already done today; returns the report dict."""
+    checkpoint = Checkpoint(checkpoint_path, datetime.now().date().isoformat())
+    pending = [m for m in mobiles if not checkpoint.succeeded(m)]
+    skipped = len(mobiles) - len(pending)
+    if limit is not None:
+        pending = pending[:limit]
+    limiter = HostRateLimiter(rate_per_host, burst=workers)
+    print(f"Refreshing {len(pending)} students with {workers} workers ({skipped} already done today)")
+
+    records = []
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='cohort-refresh') as pool:
+        futures = [pool.submit(refresh_student, mobile, scrape, limiter, host, store) for mobile in pending]
+        # Checkpoint students as they finish, so a hung scrape can't hold back the others
+        for done, future in enumerate(as_completed(futures), start=1):
+            record = future.result()
+            checkpoint.record(record)
+            records.append(record)
+            if done % 25 == 0 or done == len(futures):
+                print(f"  {done}/{len(futures)} done")
+    report = build_report(records, skipped, time.perf_counter() - started)
+
+    # A finished run with nothing left to retry doesn't need its checkpoint
+    if limit is None and not report['failed']:
+        checkpoint.clear()
+    return report
+
+
+def seconds_until(at):
+    hour, minute = (int(part) for part in at.split(':'))
+    now = datetime.now()
+    target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if target <= now:
+        target += timedelta(days=1)
+    return (target - now).total_seconds()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-refresh dashboard snapshots for a cohort")
+    parser.add_argument('--mobiles', help="file with one mobile number per line")
+    parser.add_argument('--from-users', action='store_true', help="every user in the users collection with a mobile_number")
+    parser.add_argument('--workers', type=int, default=COHORT_WORKERS)
+    parser.add_argument('--rate', type=float, default=COHORT_RATE_PER_HOST, help="scrapes started per second per portal host")
+    parser.add_argument('--checkpoint', default=COHORT_CHECKPOINT)
+    parser.add_argument('--limit', type=int, help="only refresh this many students this run")
+    parser.add_argument('--netra-url', help="portal base URL, e.g. a local stand-in")
+    parser.add_argument('--no-store', action='store_true', help="scrape without writing snapshots to Mongo")
+    parser.add_argument('--report', help="also write the report as JSON here")
+    parser.add_argument('--at', help="run every day at HH:MM instead of once")
+    args = parser.parse_args()
+    if not args.mobiles and not args.from_users:
+        parser.error("pass --mobiles and/or --from-users")
+
+    import sa
+    if args.netra_url:
+        sa.NETRA_URL = args.netra_url
+    from scraper_service import ScraperService
+    from dashboard_history import record_scrape
+
+    db = None
+    if args.from_users or not args.no_store:
+        from pymongo import MongoClient
+        db = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)['campus-genie']
+    store = None if args.no_store else (lambda mobile, data: record_scrape(db, mobile, data))
+
+    # A private browser pool sized to the worker pool, with room for everyone queued
+    service = ScraperService(concurrency=args.workers, max_contexts=args.workers * 2, max_queue=args.workers * 4)
+    host = urlparse(sa.NETRA_URL).netloc
+    try:
+        while True:
+            if args.at:
+                wait = seconds_until(args.at)
+                print(f"Next cohort refresh at {args.at} (in {wait / 3600:.1f}h)")
+                time.sleep(wait)
+            mobiles = load_mobiles(args.mobiles, db['users'] if args.from_users else None)
+            report = run_cohort(mobiles, service.scrape, store, args.workers, args.rate, args.checkpoint, host, args.limit)
+            print_report(report)
+            if args.report:
+                with open(args.report, 'w', encoding='utf-8') as f:
+                    json.dump(report, f, indent=2)
+            if not args.at:
+                break
+    finally:
+        service.shutdown()
+    sys.exit(1 if report['failed'] else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+import os
+import re
+import json
+
+CURATED_SOURCES = ['Data.json', 'Updated_Data.json']
+# Squared L2 distance between normalized MiniLM vectors (0.1 ~ cosine 0.95)
+DIRECT_ANSWER_MAX_DISTANCE = float(os.environ.get('DIRECT_ANSWER_MAX_DISTANCE', '0.1'))
+
+
+# Same normalization the original retrieval code used for questions
+def preprocess_text(text):
+    text = text.lower()
+    tokens = re.findall(r'\b\w+\b', text)
+    return " ".join(tokens)
+
+
+def load_qa_records(path):
+    # Data.json is a plain list, Updated_Data.json keeps the pairs under "data"
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get('data', [])
+    return [item for item in data if item.get('question') and item.get('answer')]
+
+
+def load_curated_answers(paths=CURATED_SOURCES):
+    """Build the normalized question -> curated answer lookup.
+
+    Later sources win, so Updated_Data.json overrides Data.json.
+    """
+    answers = {}
+    for path in paths:
+        if not os.path.exists(path):
+            print(f"Curated source '{path}' not found, skipping")
+            continue
+        for item in load_qa_records(path):
+            answers[preprocess_text(item['question'])] = item['answer']
+    return answers
+
+
+def direct_answer(curated_answers, query, scored_results=None, max_distance=DIRECT_ANSWER_MAX_DISTANCE):
+    """Return (answer, path) when a curated answer can be served without the LLM.
+
+    scored_results is the output of similarity_search_with_score; the top hit
+    counts only if it is close enough and carries a curated answer in its
+    metadata, or its text is itself one of the curated questions.
+    """
+    answer = curated_answers.get(preprocess_text(query))
+    if answer is not None:
+        return answer, 'curated_exact'
+    if scored_results:
+        doc, distance = scored_results[0]
+        if distance <= max_distance:
+            answer = doc.metadata.get('answer') or curated_answers.get(preprocess_text(doc.page_content))
+            if answer is not None:
+                return answer, 'curated_match'
+    return None, None
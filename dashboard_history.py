@@ -0,0 +1,112 @@
+"""Change history for dashboard scrapes.
+
+Every scrape is compared with the student's previous snapshot and only the
+difference is stored, in one dashboard_versions document per student per
+day: new session statuses, the attendance percentage delta and timetable
+days that changed. The overall percentage also goes into attendance_daily,
+one small document per student per day behind a (mobile_number, day) index,
+so semester trends are a single index range scan.
+"""
+from datetime import datetime
+from dashboard_jobs import save_snapshot
+
+SNAPSHOTS = 'dashboard_snapshots'
+VERSIONS = 'dashboard_versions'
+ATTENDANCE_DAILY = 'attendance_daily'
+
+
+def ensure_indexes(db):
+    db[SNAPSHOTS].create_index('mobile_number', unique=True)
+    db[VERSIONS].create_index([('mobile_number', 1), ('day', 1)], unique=True)
+    db[ATTENDANCE_DAILY].create_index([('mobile_number', 1), ('day', 1)], unique=True)
+
+
+def diff_dashboard(previous, current):
+    """What changed between two scrapes, as a dict (empty when nothing did)."""
+    previous = previous or {}
+    changes = {}
+
+    old_sessions = previous.get('sessions') or []
+    new_sessions = current.get('sessions') or []
+    if new_sessions != old_sessions:
+        if new_sessions[:len(old_sessions)] == old_sessions:
+            changes['sessions_added'] = new_sessions[len(old_sessions):]
+        else:
+            # A new working day (or corrected marks): keep the whole list
+            changes['sessions'] = new_sessions
+
+    old_percentage = previous.get('overall_attendance_percentage')
+    new_percentage = current.get('overall_attendance_percentage')
+    if new_percentage is not None and new_percentage != old_percentage:
+        changes['percentage'] = new_percentage
+        changes['percentage_delta'] = round(new_percentage - old_percentage, 2) if old_percentage is not None else None
+
+    old_days = {day['header']: day['rows'] for day in previous.get('timetable') or []}
+    new_days = {day['header']: day['rows'] for day in current.get('timetable') or []}
+    changed_days = [{'header': header, 'rows': rows} for header, rows in new_days.items() if old_days.get(header) != rows]
+    removed_days = [header for header in old_days if header not in new_days]
+    if changed_days:
+        changes['timetable_changed'] = changed_days
+    if removed_days:
+        changes['timetable_removed'] = removed_days
+    return changes
+
+
+def record_scrape(db, mobile_number, data, now=None):
+    """Store a scrape: diff into today's version document, update the daily series and the latest snapshot.
+
+    Returns the changes that were written.
+    """
+    now = now or datetime.now()
+    day = now.date().isoformat()
+    previous = db[SNAPSHOTS].find_one({'mobile_number': mobile_number}, {'_id': 0, 'data': 1})
+    changes = diff_dashboard(previous['data'] if previous else None, data)
+
+    update = {
+        '$setOnInsert': {'first_checked_at': now},
+        '$set': {'last_checked_at': now},
+        '$inc': {'checks': 1}
+    }
+    if changes:
+        update['$push'] = {'changes': {'at': now, **changes}}
+    db[VERSIONS].update_one({'mobile_number': mobile_number, 'day': day}, update, upsert=True)
+
+    percentage = data.get('overall_attendance_percentage')
+    if percentage is not None:
+        sessions = data.get('sessions') or []
+        db[ATTENDANCE_DAILY].update_one(
+            {'mobile_number': mobile_number, 'day': day},
+            {'$set': {
+                'percentage': percentage,
+                'sessions_present': sum(1 for status in sessions if status == 'Present'),
+                'sessions_total': len(sessions),
+                'at': now
+            }},
+            upsert=True
+        )
+
+    save_snapshot(db[SNAPSHOTS], mobile_number, data)
+    return changes
+
+
+def day_range_query(mobile_number, start_day=None, end_day=None):
+    query = {'mobile_number': mobile_number}
+    if start_day or end_day:
+        query['day'] = {}
+        if start_day:
+            query['day']['$gte'] = start_day
+        if end_day:
+            query['day']['$lte'] = end_day
+    return query
+
+
+def attendance_series(db, mobile_number, start_day=None, end_day=None):
+    """Daily attendance percentages for a student, oldest first; days are YYYY-MM-DD strings."""
+    return list(db[ATTENDANCE_DAILY].find(
+        day_range_query(mobile_number, start_day, end_day),
+        {'_id': 0, 'day': 1, 'percentage': 1, 'sessions_present': 1, 'sessions_total': 1}
+    ).sort('day', 1))
+
+
+def dashboard_changes(db, mobile_number, start_day=None, end_day=None):
+    return list(db[VERSIONS].find(day_range_query(mobile_number, start_day, end_day), {'_id': 0, 'mobile_number': 0}).sort('day', 1))
@@ -0,0 +1,149 @@
+import os
+import time
+import uuid
+import threading
+from datetime import datetime
+from collections import OrderedDict, Counter
+from concurrent.futures import ThreadPoolExecutor
+
+# How old a student's snapshot may get before a read kicks off a background refresh
+DASHBOARD_TTL_SECONDS = float(os.environ.get('DASHBOARD_TTL_SECONDS', '900'))
+DASHBOARD_REFRESH_WORKERS = int(os.environ.get('DASHBOARD_REFRESH_WORKERS', '2'))
+# Refresh jobs allowed to wait for a worker before new ones are turned away
+DASHBOARD_MAX_PENDING_JOBS = int(os.environ.get('DASHBOARD_MAX_PENDING_JOBS', '50'))
+# Finished jobs kept around for polling
+DASHBOARD_JOB_HISTORY = int(os.environ.get('DASHBOARD_JOB_HISTORY', '1000'))
+
+
+class RefreshQueueFull(Exception):
+    pass
+
+
+def has_dashboard_data(data):
+    # A failed login still returns the empty skeleton; don't let it replace a good snapshot
+    return bool(data) and (data.get('timetable') or data.get('sessions')
+                           or data.get('overall_attendance_percentage') is not None)
+
+
+def save_snapshot(collection, mobile_number, data):
+    collection.update_one(
+        {'mobile_number': mobile_number},
+        {'$set': {'data': data, 'updated_at': datetime.now()}},
+        upsert=True
+    )
+
+
+class DashboardRefresher:
+    """Per-student dashboard snapshots refreshed by background scrape jobs.
+
+    Snapshots live in Mongo keyed by mobile number with the time they were
+    scraped. Reads return the stored snapshot straight away and queue a
+    refresh when it is older than the TTL (stale-while-revalidate). Only one
+    refresh per student runs at a time; asking again returns the same job.
+    """
+
+    def __init__(self, scrape, collection, ttl=DASHBOARD_TTL_SECONDS, workers=DASHBOARD_REFRESH_WORKERS,
+                 max_pending=DASHBOARD_MAX_PENDING_JOBS, history=DASHBOARD_JOB_HISTORY, save=None):
+        self.scrape = scrape
+        self.collection = collection
+        # save(mobile_number, data) stores a scrape; defaults to overwriting the snapshot
+        self._save = save or (lambda mobile_number, data: save_snapshot(collection, mobile_number, data))
+        self.ttl = ttl
+        self.max_pending = max_pending
+        self.history = history
+        self.counts = Counter()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='dashboard-refresh')
+        self._jobs = OrderedDict()  # job id -> job
+        self._active = {}  # mobile number -> job id of its queued/running refresh
+        self._lock = threading.Lock()
+
+    def submit(self, mobile_number):
+        """Queue a refresh for the student, or return the one already in flight."""
+        with self._lock:
+            job_id = self._active.get(mobile_number)
+            if job_id is not None:
+                self.counts['deduplicated'] += 1
+                return dict(self._jobs[job_id])
+            if len(self._active) >= self.max_pending:
+                self.counts['rejected'] += 1
+                raise RefreshQueueFull("Too many dashboard refreshes in progress, please try again shortly")
+            job = {
+                'job_id': uuid.uuid4().hex,
+                'mobile_number': mobile_number,
+                'status': 'queued',
+                'error': None,
+                'created_at': time.time(),
+                'started_at': None,
+                'finished_at': None
+            }
+            self._jobs[job['job_id']] = job
+            self._active[mobile_number] = job['job_id']
+            self._trim_history()
+            self.counts['submitted'] += 1
+        self._executor.submit(self._run, job)
+        return dict(job)
+
+    def _trim_history(self):
+        while len(self._jobs) > self.history:
+            oldest = next((key for key, job in self._jobs.items() if job['status'] in ('done', 'failed')), None)
+            if oldest is None:
+                break
+            del self._jobs[oldest]
+
+    def _run(self, job):
+        job['status'] = 'running'
+        job['started_at'] = time.time()
+        try:
+            data = self.scrape(job['mobile_number'])
+            if not has_dashboard_data(data):
+                raise RuntimeError("The portal returned no dashboard data")
+            self.save(job['mobile_number'], data)
+            job['status'] = 'done'
+            self.counts['succeeded'] += 1
+        except Exception as e:
+            print(f"Dashboard refresh failed for {job['mobile_number']}: {e}")
+            job['status'] = 'failed'
+            job['error'] = str(e) or type(e).__name__
+            self.counts['failed'] += 1
+        finally:
+            job['finished_at'] = time.time()
+            with self._lock:
+                if self._active.get(job['mobile_number']) == job['job_id']:
+                    del self._active[job['mobile_number']]
+
+    def save(self, mobile_number, data):
+        self._save(mobile_number, data)
+
+    def get_job(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def snapshot(self, mobile_number):
+        return self.collection.find_one({'mobile_number': mobile_number}, {'_id': 0})
+
+    def read(self, mobile_number):
+        """Return (snapshot or None, refresh job or None), queueing a refresh if it is missing or stale."""
+        snapshot = self.snapshot(mobile_number)
+        age = (datetime.now() - snapshot['updated_at']).total_seconds() if snapshot else None
+        job = None
+        if snapshot is None or age > self.ttl:
+            self.counts['stale_reads' if snapshot else 'missing_reads'] += 1
+            try:
+                job = self.submit(mobile_number)
+            except RefreshQueueFull:
+                pass
+        else:
+            self.counts['fresh_reads'] += 1
+        if snapshot is not None:
+            snapshot['age_seconds'] = round(age, 1)
+        return snapshot, job
+
+    def stats(self):
+        with self._lock:
+            return {
+                'active_jobs': len(self._active),
+                'tracked_jobs': len(self._jobs),
+                'ttl_seconds': self.ttl,
+                **self.counts
+            }
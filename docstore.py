@@ -0,0 +1,160 @@
+"""SQLite docstore for faiss_index, read lazily by FAISS position.
+
+    python docstore.py [faiss_index]
+
+converts an existing index.pkl into docstore.sqlite once. After that the app
+loads index.faiss plus the SQLite file and only reads the rows for the hits
+a search returns, instead of unpickling every Document at startup.
+"""
+import os
+import sys
+import json
+import sqlite3
+import threading
+from langchain_core.documents import Document
+from langchain_community.docstore.base import Docstore
+from ann_index import load_ann_index
+
+DOCSTORE_NAME = 'docstore.sqlite'
+FAISS_MMAP = os.environ.get('FAISS_MMAP', '1') == '1'
+
+
+class PositionMap:
+    """Stands in for FAISS.index_to_docstore_id: position i maps to docstore key i."""
+
+    def __init__(self, size):
+        self.size = size
+
+    def __getitem__(self, position):
+        if 0 <= position < self.size:
+            return position
+        raise KeyError(position)
+
+    def get(self, position, default=None):
+        return position if 0 <= position < self.size else default
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        return iter(range(self.size))
+
+    def items(self):
+        return ((i, i) for i in range(self.size))
+
+    def values(self):
+        return iter(range(self.size))
+
+
+class SqliteDocstore(Docstore):
+    """Read-only docstore backed by an SQLite file.
+
+    The file is opened once, when the index is loaded, and the connection is
+    shared by all threads. An open file keeps reading the build it was opened
+    from, so the docstore can't drift from the FAISS index loaded with it when
+    build_index.py swaps in a new faiss_index.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        self._lock = threading.Lock()  # primary-key reads, so one at a time is cheap
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchone()
+
+    def search(self, search):
+        row = self._execute(
+            'SELECT doc_id, page_content, metadata FROM documents WHERE position = ?', (int(search),)
+        )
+        if row is None:
+            return f"ID {search} not found."
+        doc_id, page_content, metadata = row
+        return Document(id=doc_id, page_content=page_content, metadata=json.loads(metadata))
+
+    def count(self):
+        return self._execute('SELECT COUNT(*) FROM documents')[0]
+
+    def close(self):
+        self._conn.close()
+
+
+def export_docstore(vectorstore, index_dir):
+    """Write the documents of a loaded FAISS store to index_dir/docstore.sqlite."""
+    path = os.path.join(index_dir, DOCSTORE_NAME)
+    tmp_path = path + '.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    conn.execute('CREATE TABLE documents (position INTEGER PRIMARY KEY, doc_id TEXT, page_content TEXT, metadata TEXT)')
+    rows = []
+    for position, doc_id in vectorstore.index_to_docstore_id.items():
+        doc = vectorstore.docstore.search(doc_id)
+        rows.append((position, doc_id, doc.page_content, json.dumps(doc.metadata)))
+    conn.executemany('INSERT INTO documents VALUES (?, ?, ?, ?)', rows)
+    conn.commit()
+    conn.close()
+    os.replace(tmp_path, path)
+    return len(rows)
+
+
+def read_index(faiss, path):
+    # Memory-map the vectors so workers share the page cache instead of each
+    # holding a private copy; not every index type supports it
+    if FAISS_MMAP:
+        try:
+            return faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError as e:
+            print(f"Could not memory-map {path} ({e}), reading it into memory")
+    return faiss.read_index(path)
+
+
+def load_vectorstore(index_dir, embeddings):
+    """Load faiss_index, preferring the SQLite docstore over the pickled index.pkl.
+
+    When FAISS_INDEX_TYPE names an ANN index that has been built, it replaces
+    the flat index for searching.
+    """
+    import faiss
+    from langchain_community.vectorstores import FAISS
+
+    # Resolve faiss_index once, so every file below comes from the same build
+    index_dir = os.path.realpath(index_dir)
+    docstore_path = os.path.join(index_dir, DOCSTORE_NAME)
+    if not os.path.exists(docstore_path):
+        print(f"No {DOCSTORE_NAME} in '{index_dir}', falling back to index.pkl")
+        vectorstore = FAISS.load_local(
+            index_dir,
+            embeddings=embeddings,
+            allow_dangerous_deserialization=True  # Only enable if you trust the source
+        )
+    else:
+        index = read_index(faiss, os.path.join(index_dir, 'index.faiss'))
+        docstore = SqliteDocstore(docstore_path)
+        if docstore.count() != index.ntotal:
+            raise ValueError(f"{docstore_path} has {docstore.count()} documents but the index has {index.ntotal} vectors; "
+                             f"re-run 'python docstore.py {index_dir}'")
+        vectorstore = FAISS(embeddings, index, docstore, PositionMap(index.ntotal))
+
+    ann_index = load_ann_index(index_dir, lambda path: read_index(faiss, path))
+    if ann_index is not None:
+        if ann_index.ntotal != vectorstore.index.ntotal:
+            raise ValueError(f"The ANN index has {ann_index.ntotal} vectors but index.faiss has "
+                             f"{vectorstore.index.ntotal}; rebuild it with build_index.py")
+        vectorstore.index = ann_index
+    return vectorstore
+
+
+if __name__ == '__main__':
+    from langchain_community.vectorstores import FAISS
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+
+    index_dir = sys.argv[1] if len(sys.argv) > 1 else 'faiss_index'
+    vectorstore = FAISS.load_local(
+        index_dir,
+        embeddings=HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2"),
+        allow_dangerous_deserialization=True
+    )
+    count = export_docstore(vectorstore, index_dir)
+    print(f"Wrote {count} documents to {os.path.join(index_dir, DOCSTORE_NAME)}")
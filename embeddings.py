@@ -0,0 +1,192 @@
+import os
+import time
+import queue
+import threading
+from concurrent.futures import Future
+from collections import OrderedDict
+from langchain_core.embeddings import Embeddings
+
+EMBEDDING_CACHE_SIZE = int(os.environ.get('EMBEDDING_CACHE_SIZE', '4096'))
+EMBEDDING_BATCHING = os.environ.get('EMBEDDING_BATCHING', '1') == '1'
+EMBEDDING_BATCH_MAX_SIZE = int(os.environ.get('EMBEDDING_BATCH_MAX_SIZE', '32'))
+EMBEDDING_BATCH_MAX_WAIT_MS = float(os.environ.get('EMBEDDING_BATCH_MAX_WAIT_MS', '5'))
+# 'huggingface' (PyTorch via sentence-transformers) or 'onnx' (int8 model via onnxruntime)
+EMBEDDING_BACKEND = os.environ.get('EMBEDDING_BACKEND', 'huggingface')
+EMBEDDING_MODEL = 'all-MiniLM-L6-v2'
+ONNX_MODEL_DIR = os.environ.get('ONNX_MODEL_DIR', 'embedding_models/all-MiniLM-L6-v2-int8')
+
+
+def normalize_query(text):
+    # MiniLM's tokenizer is uncased and ignores extra whitespace, so these
+    # variants produce the same vector and can share a cache entry
+    return " ".join(text.lower().split())
+
+
+class OnnxEmbeddings(Embeddings):
+    """all-MiniLM-L6-v2 exported to ONNX and dynamically quantized to int8.
+
+    Needs only onnxruntime and tokenizers, not torch. Pooling matches the
+    sentence-transformers model: attention-masked mean, then L2 normalization.
+    Create the model directory with export_onnx.py.
+    """
+
+    def __init__(self, model_dir=ONNX_MODEL_DIR, max_length=256, threads=None):
+        import numpy as np
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        self._np = np
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, 'tokenizer.json'))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()
+        options = onnxruntime.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(
+            os.path.join(model_dir, 'model.onnx'), options, providers=['CPUExecutionProvider']
+        )
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+    def embed_documents(self, texts):
+        np = self._np
+        encodings = self.tokenizer.encode_batch(list(texts))
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        inputs = {'input_ids': input_ids, 'attention_mask': attention_mask}
+        if 'token_type_ids' in self._input_names:
+            inputs['token_type_ids'] = np.zeros_like(input_ids)
+        token_embeddings = self.session.run(None, inputs)[0]
+        mask = attention_mask[..., None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.tolist()
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def load_embedding_model(backend=EMBEDDING_BACKEND):
+    """Load the configured embedding backend; heavy imports happen here, not at import time."""
+    if backend == 'onnx':
+        return OnnxEmbeddings()
+    if backend != 'huggingface':
+        raise ValueError(f"Unknown EMBEDDING_BACKEND '{backend}', expected 'huggingface' or 'onnx'")
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+
+
+class CachedEmbeddings(Embeddings):
+    """Thread-safe LRU cache around an embedding model's embed_query.
+
+    Document embedding (index building) is passed straight through.
+    """
+
+    def __init__(self, embeddings, max_size=EMBEDDING_CACHE_SIZE):
+        self.embeddings = embeddings
+        self.max_size = max_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def embed_documents(self, texts):
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text):
+        key = normalize_query(text)
+        with self._lock:
+            vector = self._cache.get(key)
+            if vector is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return list(vector)
+            self.misses += 1
+        # Encode outside the lock so concurrent misses don't serialize on the model
+        vector = tuple(self.embeddings.embed_query(text))
+        with self._lock:
+            self._cache[key] = vector
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+        return list(vector)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                'entries': len(self._cache),
+                'max_entries': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+        if isinstance(self.embeddings, BatchingEmbeddings):
+            stats['batching'] = self.embeddings.stats()
+        return stats
+
+
+class BatchingEmbeddings(Embeddings):
+    """Micro-batches embed_query calls from concurrent requests.
+
+    A worker thread takes the first waiting query, collects any others that
+    arrive within max_wait_ms (up to max_batch_size), encodes them with a
+    single embed_documents call and hands each caller its own vector.
+    """
+
+    def __init__(self, embeddings, max_batch_size=EMBEDDING_BATCH_MAX_SIZE, max_wait_ms=EMBEDDING_BATCH_MAX_WAIT_MS):
+        self.embeddings = embeddings
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self.batches = 0
+        self.queries = 0
+        self.largest_batch = 0
+        self._worker = threading.Thread(target=self._run, name='embedding-batcher', daemon=True)
+        self._worker.start()
+
+    def embed_documents(self, texts):
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text):
+        future = Future()
+        self._queue.put((text, future))
+        return future.result()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            texts = [text for text, _ in batch]
+            try:
+                vectors = self.embeddings.embed_documents(texts)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(vector)
+            self.batches += 1
+            self.queries += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+
+    def stats(self):
+        return {
+            'batches': self.batches,
+            'queries': self.queries,
+            'avg_batch_size': round(self.queries / self.batches, 2) if self.batches else 0.0,
+            'largest_batch': self.largest_batch,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000
+        }
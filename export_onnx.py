@@ -0,0 +1,63 @@
+"""Export all-MiniLM-L6-v2 to ONNX and quantize it to int8 for EMBEDDING_BACKEND=onnx.
+
+    python export_onnx.py [--out embedding_models/all-MiniLM-L6-v2-int8]
+
+Needs torch and transformers once, at export time; the app then only needs
+onnxruntime and tokenizers. Check retrieval parity afterwards with
+benchmarks/onnx_parity_check.py.
+"""
+import os
+import shutil
+import argparse
+from embeddings import ONNX_MODEL_DIR
+
+HF_MODEL = 'sentence-transformers/all-MiniLM-L6-v2'
+
+
+def export(out_dir=ONNX_MODEL_DIR, opset=14):
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    os.makedirs(out_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(HF_MODEL)
+    model = AutoModel.from_pretrained(HF_MODEL)
+    model.eval()
+
+    sample = tokenizer(["What is the EAPCET code for KMIT?"], return_tensors='pt')
+    fp32_path = os.path.join(out_dir, 'model.fp32.onnx')
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (sample['input_ids'], sample['attention_mask'], sample['token_type_ids']),
+            fp32_path,
+            input_names=['input_ids', 'attention_mask', 'token_type_ids'],
+            output_names=['last_hidden_state'],
+            dynamic_axes={
+                'input_ids': {0: 'batch', 1: 'sequence'},
+                'attention_mask': {0: 'batch', 1: 'sequence'},
+                'token_type_ids': {0: 'batch', 1: 'sequence'},
+                'last_hidden_state': {0: 'batch', 1: 'sequence'},
+            },
+            opset_version=opset,
+        )
+
+    # Dynamic quantization: int8 weights, activations quantized on the fly
+    quantize_dynamic(fp32_path, os.path.join(out_dir, 'model.onnx'), weight_type=QuantType.QInt8)
+    os.remove(fp32_path)
+
+    # tokenizer.json is all OnnxEmbeddings needs from the tokenizer
+    tmp_dir = os.path.join(out_dir, 'tokenizer_tmp')
+    tokenizer.save_pretrained(tmp_dir)
+    shutil.move(os.path.join(tmp_dir, 'tokenizer.json'), os.path.join(out_dir, 'tokenizer.json'))
+    shutil.rmtree(tmp_dir)
+    size_mb = os.path.getsize(os.path.join(out_dir, 'model.onnx')) / 1e6
+    print(f"Wrote {out_dir}/model.onnx ({size_mb:.1f} MB) and tokenizer.json")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Export a quantized ONNX MiniLM embedder")
+    parser.add_argument('--out', default=ONNX_MODEL_DIR)
+    parser.add_argument('--opset', type=int, default=14)
+    args = parser.parse_args()
+    export(args.out, args.opset)
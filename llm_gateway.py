@@ -0,0 +1,265 @@
+"""Async, connection-pooled client for the OpenAI-compatible LLM API.
+
+Flask handlers are synchronous, so the gateway runs its own event loop on a
+background thread and exposes blocking complete()/stream() wrappers. Every
+call has a deadline, 429/5xx/connection errors are retried with jittered
+exponential backoff, and when a fallback model is configured a slow primary
+call can be hedged with a second request to the fallback.
+
+Point LLM_BASE_URL at benchmarks/stub_openai_server.py to exercise it locally.
+"""
+import os
+import time
+import queue
+import random
+import asyncio
+import threading
+from collections import deque, Counter
+
+LLM_BASE_URL = os.environ.get('LLM_BASE_URL', 'https://openrouter.ai/api/v1')
+LLM_MODEL = os.environ.get('LLM_MODEL', 'qwen/qwen2.5-vl-32b-instruct:free')
+LLM_FALLBACK_MODEL = os.environ.get('LLM_FALLBACK_MODEL', '')
+LLM_DEADLINE_SECONDS = float(os.environ.get('LLM_DEADLINE_SECONDS', '30'))
+LLM_MAX_RETRIES = int(os.environ.get('LLM_MAX_RETRIES', '3'))
+LLM_BACKOFF_BASE = float(os.environ.get('LLM_BACKOFF_BASE', '0.5'))  # seconds
+LLM_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY', '16'))
+LLM_MAX_KEEPALIVE = int(os.environ.get('LLM_MAX_KEEPALIVE', '16'))
+# Hedge once the primary has taken longer than this percentile of its recent latencies
+LLM_HEDGE = os.environ.get('LLM_HEDGE', '1') == '1'
+LLM_HEDGE_PERCENTILE = float(os.environ.get('LLM_HEDGE_PERCENTILE', '95'))
+LLM_HEDGE_MIN_SAMPLES = int(os.environ.get('LLM_HEDGE_MIN_SAMPLES', '20'))
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class LLMDeadlineExceeded(Exception):
+    pass
+
+
+def estimate_tokens(text):
+    # Same ~4 characters per token rule as chat_memory, for when the API reports no usage
+    return max(1, len(text) // 4) if text else 0
+
+
+class LLMGateway:
+    def __init__(self, api_key, base_url=LLM_BASE_URL, model=LLM_MODEL, fallback_model=LLM_FALLBACK_MODEL,
+                 deadline=LLM_DEADLINE_SECONDS, max_retries=LLM_MAX_RETRIES, max_concurrency=LLM_MAX_CONCURRENCY,
+                 hedge=LLM_HEDGE, system_prompt="You are a helpful assistant.", max_tokens=200, temperature=0.7):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.model = model
+        self.fallback_model = fallback_model
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.max_concurrency = max_concurrency
+        self.hedge = hedge and bool(fallback_model)
+        self.system_prompt = system_prompt
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.latencies = deque(maxlen=500)
+        # Appended on the loop thread, read from request and /metrics threads
+        self._latency_lock = threading.Lock()
+        self.counts = Counter()
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run_loop, name='llm-gateway', daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _run_loop(self):
+        import httpx
+        from openai import AsyncOpenAI
+
+        asyncio.set_event_loop(self._loop)
+        # One pooled HTTP client for every request, so connections stay warm
+        http_client = httpx.AsyncClient(limits=httpx.Limits(
+            max_connections=self.max_concurrency,
+            max_keepalive_connections=LLM_MAX_KEEPALIVE
+        ))
+        self.client = AsyncOpenAI(base_url=self.base_url, api_key=self.api_key,
+                                  http_client=http_client, max_retries=0)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._ready.set()
+        self._loop.run_forever()
+
+    def _messages(self, prompt):
+        return [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": prompt}
+        ]
+
+    def _record_latency(self, seconds):
+        with self._latency_lock:
+            self.latencies.append(seconds)
+
+    def _sorted_latencies(self):
+        with self._latency_lock:
+            latencies = list(self.latencies)
+        return sorted(latencies)
+
+    def _hedge_delay(self):
+        if not self.hedge or len(self.latencies) < LLM_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = self._sorted_latencies()
+        index = min(len(ordered) - 1, int(len(ordered) * LLM_HEDGE_PERCENTILE / 100))
+        return ordered[index]
+
+    @staticmethod
+    def _is_retryable(error):
+        import openai
+
+        if isinstance(error, (openai.APIConnectionError, openai.APITimeoutError)):
+            return True
+        return isinstance(error, openai.APIStatusError) and error.status_code in RETRYABLE_STATUS
+
+    async def _with_retries(self, call, deadline_at):
+        attempt = 0
+        while True:
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                raise LLMDeadlineExceeded("LLM deadline exceeded")
+            try:
+                return await asyncio.wait_for(call(), timeout=remaining)
+            except asyncio.TimeoutError:
+                self.counts['deadline_exceeded'] += 1
+                raise LLMDeadlineExceeded("LLM deadline exceeded")
+            except Exception as e:
+                if attempt >= self.max_retries or not self._is_retryable(e):
+                    self.counts['errors'] += 1
+                    raise
+                # Full jitter: sleep a random fraction of the exponential backoff
+                backoff = random.uniform(0, LLM_BACKOFF_BASE * (2 ** attempt))
+                if time.monotonic() + backoff >= deadline_at:
+                    raise
+                attempt += 1
+                self.counts['retries'] += 1
+                await asyncio.sleep(backoff)
+
+    async def _create(self, model, prompt, deadline_at):
+        async def call():
+            async with self._semaphore:
+                return await self.client.chat.completions.create(
+                    model=model,
+                    messages=self._messages(prompt),
+                    max_tokens=self.max_tokens,
+                    temperature=self.temperature,
+                )
+        response = await self._with_retries(call, deadline_at)
+        answer = response.choices[0].message.content
+        self._count_tokens(prompt, answer, getattr(response, 'usage', None))
+        return answer
+
+    def _count_tokens(self, prompt, answer, usage):
+        if usage is not None and usage.prompt_tokens is not None:
+            self.counts['prompt_tokens'] += usage.prompt_tokens
+            self.counts['completion_tokens'] += usage.completion_tokens or 0
+        else:
+            self.counts['prompt_tokens'] += estimate_tokens(self.system_prompt) + estimate_tokens(prompt)
+            self.counts['completion_tokens'] += estimate_tokens(answer)
+
+    async def _complete(self, prompt, deadline):
+        deadline_at = time.monotonic() + deadline
+        started = time.monotonic()
+        primary = asyncio.ensure_future(self._create(self.model, prompt, deadline_at))
+        hedge_delay = self._hedge_delay()
+        if hedge_delay is None:
+            answer = await primary
+            self._record_latency(time.monotonic() - started)
+            self.counts['primary'] += 1
+            return answer
+
+        done, _ = await asyncio.wait({primary}, timeout=hedge_delay)
+        if done:
+            self._record_latency(time.monotonic() - started)
+            self.counts['primary'] += 1
+            return primary.result()
+
+        # The primary is slower than usual: race it against the fallback model
+        self.counts['hedged'] += 1
+        fallback = asyncio.ensure_future(self._create(self.fallback_model, prompt, deadline_at))
+        pending = {primary, fallback}
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    # Either way the primary took at least this long; recording the
+                    # cancelled (slow) primaries too keeps the hedge percentile honest
+                    self._record_latency(time.monotonic() - started)
+                    if task is primary:
+                        self.counts['primary'] += 1
+                    else:
+                        self.counts['hedge_won'] += 1
+                    return task.result()
+                error = task.exception()
+        raise error
+
+    def complete(self, prompt, deadline=None):
+        """Blocking completion with retries, a deadline and optional hedging."""
+        deadline = deadline or self.deadline
+        future = asyncio.run_coroutine_threadsafe(self._complete(prompt, deadline), self._loop)
+        try:
+            return future.result(timeout=deadline + 1)
+        except TimeoutError:
+            future.cancel()
+            raise LLMDeadlineExceeded("LLM deadline exceeded")
+
+    async def _stream(self, prompt, deadline, out):
+        deadline_at = time.monotonic() + deadline
+        try:
+            async with self._semaphore:
+                # Retries only cover opening the stream, never a half-sent answer
+                stream = await self._with_retries(lambda: self.client.chat.completions.create(
+                    model=self.model,
+                    messages=self._messages(prompt),
+                    max_tokens=self.max_tokens,
+                    temperature=self.temperature,
+                    stream=True,
+                    # Ask for a final usage chunk; servers that don't support it just omit it
+                    extra_body={'stream_options': {'include_usage': True}},
+                ), deadline_at)
+                parts, usage = [], None
+                async for chunk in stream:
+                    if time.monotonic() > deadline_at:
+                        raise LLMDeadlineExceeded("LLM deadline exceeded")
+                    if getattr(chunk, 'usage', None) is not None:
+                        usage = chunk.usage
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        parts.append(chunk.choices[0].delta.content)
+                        out.put(chunk.choices[0].delta.content)
+            self._count_tokens(prompt, ''.join(parts), usage)
+            self.counts['streamed'] += 1
+            out.put(None)
+        except BaseException as e:
+            out.put(e)
+
+    def stream(self, prompt, deadline=None):
+        """Blocking generator over the streamed answer text."""
+        deadline = deadline or self.deadline
+        out = queue.Queue()
+        future = asyncio.run_coroutine_threadsafe(self._stream(prompt, deadline, out), self._loop)
+        try:
+            while True:
+                item = out.get(timeout=deadline + 1)
+                if item is None:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        except queue.Empty:
+            raise LLMDeadlineExceeded("LLM deadline exceeded")
+        finally:
+            future.cancel()
+
+    def stats(self):
+        ordered = self._sorted_latencies()
+        return {
+            'model': self.model,
+            'fallback_model': self.fallback_model or None,
+            'hedging': self.hedge,
+            'hedge_after_seconds': self._hedge_delay(),
+            'p50_seconds': ordered[len(ordered) // 2] if ordered else None,
+            **self.counts
+        }
@@ -0,0 +1,126 @@
+"""Request-scoped timing spans, Prometheus metrics and JSON logs.
+
+span('stage') times a block, observes it in the stage histogram and adds it
+to the current request's span list, which app.py logs as one JSON line per
+request together with its request id. render() produces the Prometheus
+text exposition format for /metrics without needing prometheus_client.
+"""
+import sys
+import json
+import time
+import uuid
+import threading
+import contextvars
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_request_id = contextvars.ContextVar('request_id', default=None)
+_spans = contextvars.ContextVar('spans', default=None)
+
+
+def format_labels(names, values):
+    if not names:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in values)
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(names, escaped)) + '}'
+
+
+class Histogram:
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.setdefault(labels, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f"{self.name}_bucket{format_labels(self.labelnames + ('le',), labels + (bound,))} {count}")
+                lines.append(f"{self.name}_bucket{format_labels(self.labelnames + ('le',), labels + ('+Inf',))} {series[-1]}")
+                lines.append(f"{self.name}_sum{format_labels(self.labelnames, labels)} {series[-2]}")
+                lines.append(f"{self.name}_count{format_labels(self.labelnames, labels)} {series[-1]}")
+        return lines
+
+
+STAGE_SECONDS = Histogram('campus_genie_stage_seconds', 'Time spent per request stage', ('stage',))
+HTTP_REQUEST_SECONDS = Histogram('campus_genie_http_request_seconds', 'HTTP request latency',
+                                 ('endpoint', 'method', 'status'))
+SCRAPER_STAGE_SECONDS = Histogram('campus_genie_scraper_stage_seconds', 'Time spent per Netra scrape stage',
+                                  ('stage',), buckets=(0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120))
+
+# Callables read at scrape time, yielding (name, type, help, {label: value}, value)
+# samples built from the counters the caches and clients already keep
+_collectors = []
+
+
+def register_collector(collector):
+    _collectors.append(collector)
+
+
+def start_request(request_id=None):
+    request_id = request_id or uuid.uuid4().hex
+    _request_id.set(request_id)
+    _spans.set([])
+    return request_id
+
+
+def current_request_id():
+    return _request_id.get()
+
+
+def request_spans():
+    return _spans.get() or []
+
+
+@contextmanager
+def span(stage, histogram=STAGE_SECONDS):
+    """Time a block as one stage of the current request."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        histogram.observe(seconds, stage)
+        spans = _spans.get()
+        if spans is not None:
+            spans.append({'stage': stage, 'ms': round(seconds * 1000, 2)})
+
+
+def log_json(event, **fields):
+    record = {'ts': round(time.time(), 3), 'event': event, 'request_id': current_request_id(), **fields}
+    sys.stdout.write(json.dumps(record, default=str) + '\n')
+    sys.stdout.flush()
+
+
+def render():
+    lines = []
+    for metric in (STAGE_SECONDS, HTTP_REQUEST_SECONDS, SCRAPER_STAGE_SECONDS):
+        lines.extend(metric.render())
+    families = {}
+    for collector in _collectors:
+        try:
+            for name, type, help, labels, value in collector():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    families.setdefault(name, (type, help, []))[2].append((labels, value))
+        except Exception as e:
+            print(f"Metrics collector error: {e}")
+    for name, (type, help, samples) in families.items():
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} {type}")
+        for labels, value in samples:
+            lines.append(f"{name}{format_labels(tuple(labels), tuple(labels.values()))} {value}")
+    return '\n'.join(lines) + '\n'
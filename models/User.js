@@ -18,6 +18,11 @@ const UserSchema = new mongoose.Schema({
     required: true,
     minlength: 6
   },
+  // KMIT Netra login, used to scrape the student's dashboard
+  mobile_number: {
+    type: String,
+    trim: true
+  },
   createdAt: {
     type: Date,
     default: Date.now
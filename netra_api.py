@@ -0,0 +1,66 @@
+"""Parse the Netra portal's attendance/timetable JSON into the kmit_data.json shape.
+
+Experimental: the endpoint paths and payload layout below have not been
+captured from the live portal yet, so sa.py only uses this when
+NETRA_SCRAPE_MODE=api.
+
+The portal is a single-page app that renders its tables from these XHRs, so
+reading them directly skips panel expansion and DOM walking. The endpoint
+paths and payload layout are configurable because there is no published
+API to check them against; anything unexpected raises ValueError and
+sa.py falls back to scraping the rendered page.
+"""
+import os
+
+NETRA_ATTENDANCE_API = os.environ.get('NETRA_ATTENDANCE_API', '/api/student/attendance')
+NETRA_TIMETABLE_API = os.environ.get('NETRA_TIMETABLE_API', '/api/student/timetable')
+
+TIMETABLE_HEADER_ROW = ['PERIOD', 'SUBJECT']
+PRESENT_VALUES = {True, 1, '1', 'p', 'present', 'green'}
+ABSENT_VALUES = {False, 0, '0', 'a', 'absent', 'red'}
+
+
+def parse_session(value):
+    key = value.strip().lower() if isinstance(value, str) else value
+    if key in PRESENT_VALUES:
+        return 'Present'
+    if key in ABSENT_VALUES:
+        return 'Absent'
+    raise ValueError(f"Unrecognised session status: {value!r}")
+
+
+def parse_attendance(payload):
+    """Return (overall_attendance_percentage, sessions) from the attendance payload."""
+    try:
+        percentage = payload['overall']['percentage']
+        sessions = payload['lastWorkingDay']['sessions']
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Unexpected attendance payload: missing {e}")
+    if percentage is not None:
+        percentage = round(float(percentage), 2)
+    return percentage, [parse_session(status) for status in sessions]
+
+
+def parse_timetable(payload):
+    """Return timetable days as {header, rows} with the same header row the page table has."""
+    try:
+        days = payload['days']
+        return [
+            {
+                'header': day['day'],
+                'rows': [TIMETABLE_HEADER_ROW] + [[period['time'], period.get('subject') or ''] for period in day['periods']]
+            }
+            for day in days
+        ]
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Unexpected timetable payload: missing {e}")
+
+
+def parse_portal_data(attendance_payload, timetable_payload):
+    percentage, sessions = parse_attendance(attendance_payload)
+    return {
+        "attendance": [],
+        "sessions": sessions,
+        "overall_attendance_percentage": percentage,
+        "timetable": parse_timetable(timetable_payload)
+    }
@@ -0,0 +1,97 @@
+import os
+import re
+import math
+from collections import Counter, defaultdict
+
+HYBRID_RETRIEVAL = os.environ.get('HYBRID_RETRIEVAL', '1') == '1'
+LEXICAL_FAST_PATH = os.environ.get('LEXICAL_FAST_PATH', '1') == '1'
+BM25_K1 = float(os.environ.get('BM25_K1', '1.5'))
+BM25_B = float(os.environ.get('BM25_B', '0.75'))
+RRF_K = int(os.environ.get('RRF_K', '60'))
+# A BM25 result is decisive for a short keyword query when its top score is
+# high enough and clearly ahead of the runner-up
+LEXICAL_MAX_TERMS = int(os.environ.get('LEXICAL_MAX_TERMS', '6'))
+LEXICAL_MIN_SCORE = float(os.environ.get('LEXICAL_MIN_SCORE', '6.0'))
+LEXICAL_MARGIN = float(os.environ.get('LEXICAL_MARGIN', '1.25'))
+
+STOPWORDS = {
+    'a', 'an', 'the', 'is', 'are', 'was', 'were', 'be', 'of', 'in', 'on', 'at', 'to', 'for', 'and',
+    'or', 'what', 'which', 'who', 'how', 'when', 'where', 'why', 'do', 'does', 'did', 'i', 'me', 'my',
+    'you', 'your', 'it', 'its', 'this', 'that', 'there', 'can', 'about', 'with', 'tell', 'please', 'kmit'
+}
+
+
+def tokenize(text):
+    return [token for token in re.findall(r'\b\w+\b', text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """In-memory inverted index over the documents in faiss_index, keyed by FAISS position."""
+
+    def __init__(self, k1=BM25_K1, b=BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(list)  # term -> [(position, term frequency)]
+        self.doc_lengths = {}
+        self.avg_length = 0.0
+        self.idf = {}
+        self.canonical = {}  # text -> first position holding it
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore, **kwargs):
+        index = cls(**kwargs)
+        for position in range(vectorstore.index.ntotal):
+            doc = vectorstore.docstore.search(vectorstore.index_to_docstore_id[position])
+            index.add(position, doc.page_content)
+        index.finalize()
+        return index
+
+    def add(self, position, text):
+        # The scraped site content repeats whole chunks (headers, footers, the same
+        # page under several URLs). Index each text once so copies don't tie for
+        # the top score or inflate document frequencies
+        if text in self.canonical:
+            return
+        self.canonical[text] = position
+        tokens = tokenize(text)
+        self.doc_lengths[position] = len(tokens)
+        for term, tf in Counter(tokens).items():
+            self.postings[term].append((position, tf))
+
+    def finalize(self):
+        n = len(self.doc_lengths)
+        self.avg_length = sum(self.doc_lengths.values()) / n if n else 0.0
+        self.idf = {
+            term: math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self.postings.items()
+        }
+
+    def search(self, query, k=4):
+        """Return up to k (position, score) pairs, best first."""
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for position, tf in self.postings[term]:
+                norm = 1 - self.b + self.b * self.doc_lengths[position] / self.avg_length
+                scores[position] += idf * tf * (self.k1 + 1) / (tf + self.k1 * norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+
+def is_lexically_decisive(query, bm25_results, max_terms=LEXICAL_MAX_TERMS,
+                          min_score=LEXICAL_MIN_SCORE, margin=LEXICAL_MARGIN):
+    if not bm25_results or len(tokenize(query)) > max_terms:
+        return False
+    top = bm25_results[0][1]
+    runner_up = bm25_results[1][1] if len(bm25_results) > 1 else 0.0
+    return top >= min_score and top >= margin * runner_up
+
+
+def reciprocal_rank_fusion(rankings, k=RRF_K, limit=4):
+    """Fuse ranked lists of document keys; each list contributes 1 / (k + rank)."""
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] += 1.0 / (k + rank)
+    return [key for key, _ in sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]]
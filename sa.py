@@ -117,14 +117,47 @@
 #     app.run(debug=True, port=3000)
 
 from flask import Flask, request, jsonify
+import os
+import re
+import time
 import asyncio
+from contextlib import contextmanager
 from playwright.async_api import async_playwright
 import json  # Add this import
+from urllib.parse import urlparse
 from flask_cors import CORS  # Import CORS
+from netra_api import NETRA_ATTENDANCE_API, NETRA_TIMETABLE_API, parse_portal_data
+from dashboard_history import record_scrape
+from metrics import SCRAPER_STAGE_SECONDS
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
+NETRA_URL = os.environ.get('NETRA_URL', "http://kmit-netra.teleuniv.in")
+# 'dom' scrapes the rendered page; 'api' (experimental) reads the portal's JSON
+# endpoints and falls back to the DOM. The API endpoints and payloads in
+# netra_api.py are guesses until they are captured from the live portal.
+NETRA_SCRAPE_MODE = os.environ.get('NETRA_SCRAPE_MODE', 'dom')
+
+# Requests the scraper never needs: they only slow page loads down
+BLOCKED_RESOURCE_TYPES = {'image', 'font', 'media'}
+BLOCKED_URL_PATTERN = re.compile(
+    r'google-analytics|googletagmanager|doubleclick|facebook\.net|hotjar|clarity\.ms|/analytics|\.(png|jpe?g|gif|svg|webp|ico|woff2?|ttf|otf)(\?|$)',
+    re.IGNORECASE
+)
+
+
+_history_db = None
+
+
+def get_history_db():
+    global _history_db
+    if _history_db is None:
+        from pymongo import MongoClient
+        client = MongoClient(os.environ.get('MONGO_URI', 'mongodb://localhost:27017/'), serverSelectionTimeoutMS=5000)
+        _history_db = client['campus-genie']
+    return _history_db
+
 
 @app.route('/api/update-dashboard', methods=['POST'])
 def update_dashboard():
@@ -135,13 +168,19 @@ def update_dashboard():
         if not mobile_number:
             return jsonify({"error": "Mobile number is required"}), 400
 
-        # Fetch data from the KMIT Netra Portal
-        scraped_data = asyncio.run(login_to_kmit_netra(mobile_number))
+        # Fetch data from the KMIT Netra Portal using the shared warm browser
+        from scraper_service import get_scraper_service
+        scraped_data = get_scraper_service().scrape(mobile_number)
 
         # Save the retrieved data to a JSON file
         if scraped_data:
             with open('kmit_data.json', 'w') as json_file:
                 json.dump(scraped_data, json_file, indent=4)
+            # Keep the change history in Mongo too, so it survives the next scrape
+            try:
+                record_scrape(get_history_db(), mobile_number, scraped_data)
+            except Exception as e:
+                print("⚠ Could not record dashboard history:", e)
 
         # Return the scraped data as a JSON response
         return jsonify(scraped_data), 200
@@ -150,45 +189,204 @@ def update_dashboard():
         return jsonify({"error": str(e)}), 500
 
 
+async def block_unneeded_requests(route):
+    request = route.request
+    if request.resource_type in BLOCKED_RESOURCE_TYPES or BLOCKED_URL_PATTERN.search(request.url):
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+async def apply_lean_profile(target):
+    # Works on a page or a whole browser context
+    await target.route("**/*", block_unneeded_requests)
+
+
 async def login_to_kmit_netra(mobile_number):
     async with async_playwright() as p:
         browser = await p.chromium.launch(headless=True)  # Set headless=False for debugging
         page = await browser.new_page()
-        data = {
-            "attendance": [],
-            "sessions": [],
-            "overall_attendance_percentage": None,
-            "timetable": []
-        }
+        await apply_lean_profile(page)
+        try:
+            data, _ = await scrape_netra(page, mobile_number)
+        finally:
+            await browser.close()
+        return data
+
+
+async def login(page, mobile_number):
+    # 1. Go to login page
+    print("🌐 Opening KMIT Netra login page...")
+    await page.goto(f"{NETRA_URL}/", wait_until="domcontentloaded")
+
+    # 2. Wait for mobile number input
+    try:
+        await page.wait_for_selector('#login_mobilenumber', timeout=3000)
+        await page.fill('#login_mobilenumber', mobile_number)
+        await page.fill('#login_password', 'Kmit123$')  # Replace with secure password handling
+    except Exception as e:
+        print("❌ Error: Could not find login inputs.")
+        await page.screenshot(path='error_login_page.png')
+        return False
+
+    # 3. Click login and wait for the login form to go away
+    await page.click('button[type="submit"]')
+    try:
+        await page.wait_for_selector('#login_mobilenumber', state='detached', timeout=10000)
+    except Exception as e:
+        print("⚠ Login form still visible after submitting:", e)
+    print("✅ Logged in successfully!")
+    return True
 
+
+async def session_is_valid(page):
+    # The portal sends expired sessions back to the login form
+    try:
+        await page.wait_for_selector('.ant-page-header-heading-title, #login_mobilenumber', timeout=3000)
+    except Exception:
+        return False
+    return await page.query_selector('#login_mobilenumber') is None
+
+
+@contextmanager
+def stage(timings, name):
+    # Accumulate seconds per scrape stage into timings, when the caller wants them,
+    # and always into the scraper stage histogram behind /metrics
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        SCRAPER_STAGE_SECONDS.observe(seconds, name)
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + seconds
+
+
+async def fetch_portal_json(page):
+    """Replay the portal's attendance and timetable XHRs with the page's session cookies.
+
+    Returns (payloads, status): payloads is None unless both calls returned JSON.
+    """
+    request = page.context.request
+    responses = await asyncio.gather(*(
+        request.get(f"{NETRA_URL}{path}", timeout=10000) for path in (NETRA_ATTENDANCE_API, NETRA_TIMETABLE_API)
+    ))
+    payloads = []
+    for response in responses:
+        if not response.ok:
+            return None, response.status
         try:
-            # 1. Go to login page
-            print("🌐 Opening KMIT Netra login page...")
-            await page.goto("http://kmit-netra.teleuniv.in/", wait_until="load")
+            payloads.append(await response.json())
+        except Exception:
+            # Unknown paths come back as the SPA's index.html
+            return None, response.status
+    return payloads, 200
+
+
+async def scrape_netra_api(page, mobile_number, reuse_session=False, timings=None):
+    """Read attendance and timetable from the portal's JSON API.
+
+    Returns (data, logged_in); data is None when the API can't be used and
+    the caller should fall back to the DOM.
+    """
+    if reuse_session:
+        print("\n📡 Fetching portal data with the existing session...")
+        with stage(timings, 'api_fetch'):
+            payloads, status = await fetch_portal_json(page)
+        if payloads is None and status not in (401, 403):
+            print(f"⚠ Portal API returned {status}")
+            return None, True
+        if payloads is None:
+            print("🔑 Session expired, logging in again...")
+
+    if not reuse_session or payloads is None:
+        with stage(timings, 'login'):
+            if not await login(page, mobile_number):
+                return None, False
+        print("\n📡 Fetching portal data...")
+        with stage(timings, 'api_fetch'):
+            payloads, status = await fetch_portal_json(page)
+        if payloads is None:
+            print(f"⚠ Portal API returned {status}")
+            return None, True
 
-            # 2. Wait for mobile number input (10s timeout)
+    try:
+        data = parse_portal_data(*payloads)
+    except ValueError as e:
+        print("⚠ Could not parse portal API data:", e)
+        return None, True
+    print(f"📊 Overall Attendance Percentage: {data['overall_attendance_percentage']}%, "
+          f"{len(data['sessions'])} sessions, {len(data['timetable'])} timetable days")
+    return data, True
+
+
+def capture_portal_json(page):
+    # Keep the JSON the page itself fetches while the DOM path runs
+    captured = {}
+
+    async def on_response(response):
+        path = urlparse(response.url).path
+        if path in (NETRA_ATTENDANCE_API, NETRA_TIMETABLE_API) and response.ok:
             try:
-                await page.wait_for_selector('#login_mobilenumber', timeout=3000)
-                await page.fill('#login_mobilenumber', mobile_number)
-                await page.fill('#login_password', 'Kmit123$')  # Replace with secure password handling
-            except Exception as e:
-                print("❌ Error: Could not find login inputs.")
-                await page.screenshot(path='error_login_page.png')
-                await browser.close()
-                return data
-
-            # 3. Click login
-            await page.click('button[type="submit"]')
-            await page.wait_for_load_state('networkidle')
-            print("✅ Logged in successfully!")
+                captured[path] = await response.json()
+            except Exception:
+                pass
+
+    page.on('response', on_response)
+    return captured
+
+
+async def scrape_netra(page, mobile_number, reuse_session=False, mode=None, timings=None):
+    """Scrape attendance and timetable with an existing page.
+
+    With reuse_session the page's browser context is assumed to hold a valid
+    session cookie and login is skipped unless the portal asks for it again.
+    In the experimental 'api' mode the portal's JSON endpoints are read
+    directly and the rendered page is only scraped if that fails; the default
+    'dom' mode always scrapes the page. Returns (data, logged_in) so
+    callers can remember whether the context is still logged in. Pass a dict
+    as timings to get seconds spent per stage (login, api_fetch, attendance,
+    timetable).
+    """
+    if (mode or NETRA_SCRAPE_MODE) == 'api':
+        data, logged_in = await scrape_netra_api(page, mobile_number, reuse_session, timings)
+        if data is not None:
+            return data, logged_in
+        print("↩ Falling back to scraping the rendered pages")
+        reuse_session = logged_in
+    return await scrape_netra_dom(page, mobile_number, reuse_session, timings)
+
+
+async def scrape_netra_dom(page, mobile_number, reuse_session=False, timings=None):
+    data = {
+        "attendance": [],
+        "sessions": [],
+        "overall_attendance_percentage": None,
+        "timetable": []
+    }
+    logged_in = False
+    captured = capture_portal_json(page)
 
-            # 4. Navigate to attendance page
+    try:
+        # 4. Navigate to attendance page
+        if reuse_session:
+            print("\n📖 Navigating to attendance page with the existing session...")
+            with stage(timings, 'attendance'):
+                await page.goto(f"{NETRA_URL}/student/attendance", wait_until="domcontentloaded")
+                logged_in = await session_is_valid(page)
+            if not logged_in:
+                print("🔑 Session expired, logging in again...")
+
+        if not logged_in:
+            with stage(timings, 'login'):
+                if not await login(page, mobile_number):
+                    return data, False
+            logged_in = True
             print("\n📖 Navigating to attendance page...")
-            await page.goto("http://kmit-netra.teleuniv.in/student/attendance", wait_until="networkidle")
-            
-            # Debugging: Log the page content to verify the HTML structure
-            print(await page.content())
+            with stage(timings, 'attendance'):
+                await page.goto(f"{NETRA_URL}/student/attendance", wait_until="domcontentloaded")
 
+        with stage(timings, 'attendance'):
             try:
                 # Wait for the header to load with an increased timeout
                 print("⏳ Waiting for attendance page header...")
@@ -196,8 +394,7 @@ async def login_to_kmit_netra(mobile_number):
             except Exception as e:
                 print("⚠ Could not find attendance page header:", e)
                 await page.screenshot(path='error_attendance_page.png')
-                await browser.close()
-                return data
+                return data, logged_in
 
             # 5. Extract attendance details
             attendance_data = await extract_attendance(page)
@@ -205,22 +402,32 @@ async def login_to_kmit_netra(mobile_number):
             data['sessions'] = attendance_data['sessions']
             data['overall_attendance_percentage'] = attendance_data['overall_attendance_percentage']
 
-            # 6. Navigate to timetable page
-            print("\n📅 Navigating to timetable page...")
-            await page.goto("http://kmit-netra.teleuniv.in/student/time-table", wait_until="networkidle")
+        # 6. Navigate to timetable page
+        print("\n📅 Navigating to timetable page...")
+        with stage(timings, 'timetable'):
+            await page.goto(f"{NETRA_URL}/student/time-table", wait_until="domcontentloaded")
             await page.wait_for_selector('.ant-page-header-heading-title', timeout=3000)
 
             # 7. Extract timetable details
             timetable_data = await extract_timetable(page)
             data['timetable'] = timetable_data
 
-        except Exception as e:
-            print(f"❌ An error occurred: {e}")
+        # Prefer the JSON the page loaded over what was read off the DOM
+        if NETRA_ATTENDANCE_API in captured and NETRA_TIMETABLE_API in captured:
+            try:
+                data.update(parse_portal_data(captured[NETRA_ATTENDANCE_API], captured[NETRA_TIMETABLE_API]))
+                print("📡 Using the portal API responses captured while scraping")
+            except ValueError as e:
+                print("⚠ Captured portal API data was not usable:", e)
+
+    except Exception as e:
+        print(f"❌ An error occurred: {e}")
+        try:
             await page.screenshot(path='error_final.png')
+        except Exception:
+            pass
 
-        finally:
-            await browser.close()
-            return data
+    return data, logged_in
 
 
 async def extract_attendance(page):
@@ -239,10 +446,18 @@ async def extract_attendance(page):
         overall_xpath = '//div[contains(@class, "ant-collapse-header") and .//h4[text()="Overall"]]'
         await page.wait_for_selector(overall_xpath, timeout=3000)
         await page.click(overall_xpath)
-        await page.wait_for_selector('div.ant-collapse-content-active')  # Wait for content to load
-        await page.wait_for_timeout(1000)  # Additional wait for dynamic content to load
+        # Wait for the data itself rather than a fixed delay: the progress bar
+        # gets its width and the session icons render once the XHR returns
+        await page.wait_for_function('''() => {
+            const bar = document.querySelector('.ant-progress-bg');
+            return bar && /width:\\s*[\\d.]+%/.test(bar.getAttribute('style') || '');
+        }''', timeout=5000)
     except Exception as e:
         print("⚠ Error expanding 'Overall' section:", e)
+    try:
+        await page.wait_for_selector('div.ant-collapse-content-active span > svg', timeout=2000)
+    except Exception:
+        print("⚠ No session icons rendered")
 
     # 2. Extract Overall Attendance Percentage
     try:
@@ -292,12 +507,18 @@ async def extract_timetable(page):
     timetable_data = []
 
     try:
-        # Expand all collapsible sections in the timetable
+        # Expand all collapsible sections in one in-page script, then wait
+        # until every panel has rendered its table
         print("🔄 Expanding all collapsible sections...")
-        collapsible_headers = await page.query_selector_all('//div[contains(@class, "ant-collapse-header")]')
-        for header in collapsible_headers:
-            await header.click()
-            await page.wait_for_timeout(1000)  # Wait for content to load
+        await page.wait_for_selector('div.ant-collapse-item', timeout=5000)
+        await page.evaluate('''() => {
+            document.querySelectorAll('div.ant-collapse-item:not(.ant-collapse-item-active) > .ant-collapse-header')
+                .forEach(header => header.click());
+        }''')
+        await page.wait_for_function('''() => {
+            const days = Array.from(document.querySelectorAll('div.ant-collapse-item'));
+            return days.length > 0 && days.every(day => day.querySelector('div.ant-collapse-content-box table tr'));
+        }''', timeout=5000)
 
         # Extract timetable data for each day
         timetable_data = await page.evaluate('''() => {
@@ -0,0 +1,203 @@
+"""Long-lived Playwright scraper for the Netra portal.
+
+One background event loop owns one warm Chromium. Each mobile number gets
+its own isolated browser context (kept in a bounded LRU pool) so its session
+cookie survives between refreshes and login can be skipped. Scrapes run
+under a concurrency limit, callers beyond the queue limit are turned away,
+and a health check relaunches the browser if it crashes.
+"""
+import os
+import time
+import asyncio
+import threading
+from collections import OrderedDict, Counter
+from playwright.async_api import async_playwright
+from sa import scrape_netra, apply_lean_profile
+from metrics import SCRAPER_STAGE_SECONDS
+
+SCRAPER_CONCURRENCY = int(os.environ.get('SCRAPER_CONCURRENCY', '2'))
+SCRAPER_MAX_CONTEXTS = int(os.environ.get('SCRAPER_MAX_CONTEXTS', '16'))
+SCRAPER_MAX_QUEUE = int(os.environ.get('SCRAPER_MAX_QUEUE', '20'))
+SCRAPER_TIMEOUT = float(os.environ.get('SCRAPER_TIMEOUT', '90'))  # seconds per scrape, including queueing
+SCRAPER_CONTEXT_TTL = float(os.environ.get('SCRAPER_CONTEXT_TTL', '1800'))  # drop idle sessions after this
+SCRAPER_HEALTH_INTERVAL = float(os.environ.get('SCRAPER_HEALTH_INTERVAL', '30'))
+SCRAPER_HEADLESS = os.environ.get('SCRAPER_HEADLESS', '1') == '1'
+
+
+class ScraperBusy(Exception):
+    pass
+
+
+class ScraperService:
+    def __init__(self, concurrency=SCRAPER_CONCURRENCY, max_contexts=SCRAPER_MAX_CONTEXTS,
+                 max_queue=SCRAPER_MAX_QUEUE, headless=SCRAPER_HEADLESS):
+        self.concurrency = concurrency
+        self.max_contexts = max_contexts
+        self.max_queue = max_queue
+        self.headless = headless
+        self.counts = Counter()
+        self._playwright = None
+        self._browser = None
+        self._contexts = OrderedDict()  # mobile number -> {'context', 'logged_in', 'lock', 'last_used'}
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run_loop, name='scraper-service', daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._browser_lock = asyncio.Lock()
+        self._loop.create_task(self._health_loop())
+        self._ready.set()
+        self._loop.run_forever()
+
+    async def _close_browser(self):
+        for entry in self._contexts.values():
+            try:
+                await entry['context'].close()
+            except Exception:
+                pass
+        self._contexts.clear()
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+            self._browser = None
+
+    async def _ensure_browser(self):
+        async with self._browser_lock:
+            if self._browser is not None and self._browser.is_connected():
+                return self._browser
+            if self._browser is not None:
+                print("⚠ Browser disconnected, relaunching...")
+                self.counts['browser_recycled'] += 1
+            await self._close_browser()
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            self._browser = await self._playwright.chromium.launch(headless=self.headless)
+            self.counts['browser_launches'] += 1
+            print("🌐 Scraper browser launched")
+            return self._browser
+
+    async def _get_context(self, browser, mobile_number):
+        entry = self._contexts.get(mobile_number)
+        if entry is not None:
+            self._contexts.move_to_end(mobile_number)
+            return entry
+        # Make room by closing the least recently used idle context
+        while len(self._contexts) >= self.max_contexts:
+            idle = next((key for key, e in self._contexts.items() if not e['lock'].locked()), None)
+            if idle is None:
+                break
+            await self._contexts.pop(idle)['context'].close()
+            self.counts['contexts_evicted'] += 1
+        context = await browser.new_context()
+        await apply_lean_profile(context)
+        entry = {
+            'context': context,
+            'logged_in': False,
+            'lock': asyncio.Lock(),
+            'last_used': time.monotonic()
+        }
+        self._contexts[mobile_number] = entry
+        self.counts['contexts_created'] += 1
+        return entry
+
+    async def _scrape(self, mobile_number, timings=None):
+        queued = time.perf_counter()
+        async with self._semaphore:
+            waited = time.perf_counter() - queued
+            SCRAPER_STAGE_SECONDS.observe(waited, 'queued')
+            if timings is not None:
+                timings['queued'] = waited
+            browser = await self._ensure_browser()
+            entry = await self._get_context(browser, mobile_number)
+            # One scrape at a time per student; their pages share a session
+            async with entry['lock']:
+                page = await entry['context'].new_page()
+                try:
+                    reused = entry['logged_in']
+                    data, entry['logged_in'] = await scrape_netra(page, mobile_number, reuse_session=reused, timings=timings)
+                    self.counts['session_reused' if reused and entry['logged_in'] else 'logins'] += 1
+                finally:
+                    entry['last_used'] = time.monotonic()
+                    try:
+                        await page.close()
+                    except Exception:
+                        pass
+            self.counts['scrapes'] += 1
+            return data
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(SCRAPER_HEALTH_INTERVAL)
+            try:
+                if self._browser is not None and not self._browser.is_connected():
+                    await self._ensure_browser()
+                # Close sessions nobody has used for a while
+                now = time.monotonic()
+                for key, entry in list(self._contexts.items()):
+                    if now - entry['last_used'] > SCRAPER_CONTEXT_TTL and not entry['lock'].locked():
+                        del self._contexts[key]
+                        await entry['context'].close()
+                        self.counts['contexts_expired'] += 1
+            except Exception as e:
+                print(f"⚠ Scraper health check error: {e}")
+
+    def scrape(self, mobile_number, timeout=SCRAPER_TIMEOUT, timings=None):
+        """Blocking scrape through the shared browser; raises ScraperBusy when the queue is full.
+
+        timings, if given, is filled with seconds per stage (queued, login, ...).
+        """
+        with self._pending_lock:
+            if self._pending >= self.max_queue:
+                self.counts['rejected'] += 1
+                raise ScraperBusy("Too many dashboard refreshes in progress, please try again shortly")
+            self._pending += 1
+        try:
+            future = asyncio.run_coroutine_threadsafe(self._scrape(mobile_number, timings), self._loop)
+            try:
+                return future.result(timeout=timeout)
+            except TimeoutError:
+                future.cancel()
+                self.counts['timeouts'] += 1
+                raise
+        finally:
+            with self._pending_lock:
+                self._pending -= 1
+
+    def health(self):
+        return {
+            'browser_connected': bool(self._browser is not None and self._browser.is_connected()),
+            'contexts': len(self._contexts),
+            'logged_in_contexts': sum(1 for e in self._contexts.values() if e['logged_in']),
+            'pending': self._pending,
+            'concurrency': self.concurrency,
+            'max_queue': self.max_queue,
+            **self.counts
+        }
+
+    def shutdown(self):
+        async def stop():
+            await self._close_browser()
+            if self._playwright is not None:
+                await self._playwright.stop()
+        asyncio.run_coroutine_threadsafe(stop(), self._loop).result(timeout=30)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_scraper_service():
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = ScraperService()
+        return _service
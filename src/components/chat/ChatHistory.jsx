@@ -4,9 +4,23 @@ import { format } from 'date-fns';
 
 const ChatHistory = ({ userId, onSelect, visible, onToggle }) => {
   const [history, setHistory] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(false);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState(null);
 
+  // The list only shows queries, so ask for the light summary projection
+  const fetchPage = async (cursor) => {
+    const params = new URLSearchParams({ limit: '30', fields: 'summary' });
+    if (cursor) params.set('before', cursor);
+    const response = await fetch(`http://127.0.0.1:4000/api/chat/history/${userId}?${params}`);
+    const data = await response.json();
+    if (!response.ok) {
+      throw new Error(data.error || 'Failed to fetch chat history');
+    }
+    return data;
+  };
+
   const fetchHistory = async () => {
     if (!userId) {
       setError('User ID is required to fetch chat history');
@@ -16,22 +30,32 @@ const ChatHistory = ({ userId, onSelect, visible, onToggle }) => {
     try {
       setLoading(true);
       setError(null);
-      const response = await fetch(`http://127.0.0.1:4000/api/chat/history/${userId}`);
-      const data = await response.json();
-      
-      if (!response.ok) {
-        throw new Error(data.error || 'Failed to fetch chat history');
-      }
-      
-      setHistory(Array.isArray(data) ? data : []);
+      const data = await fetchPage();
+      setHistory(data.items || []);
+      setNextCursor(data.next_cursor);
     } catch (err) {
       setError(err.message);
       setHistory([]);
+      setNextCursor(null);
     } finally {
       setLoading(false);
     }
   };
 
+  const loadMore = async () => {
+    if (!nextCursor || loadingMore) return;
+    try {
+      setLoadingMore(true);
+      const data = await fetchPage(nextCursor);
+      setHistory((prev) => [...prev, ...(data.items || [])]);
+      setNextCursor(data.next_cursor);
+    } catch (err) {
+      setError(err.message);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const clearHistory = async () => {
     if (!userId) {
       setError('User ID is required to clear chat history');
@@ -51,6 +75,7 @@ const ChatHistory = ({ userId, onSelect, visible, onToggle }) => {
       }
       
       setHistory([]);
+      setNextCursor(null);
     } catch (err) {
       setError(err.message);
     } finally {
@@ -116,6 +141,15 @@ const ChatHistory = ({ userId, onSelect, visible, onToggle }) => {
                 </p>
               </button>
             ))}
+            {nextCursor && (
+              <button
+                onClick={loadMore}
+                disabled={loadingMore}
+                className="w-full p-3 text-sm text-primary hover:bg-secondary/10 disabled:opacity-50"
+              >
+                {loadingMore ? 'Loading...' : 'Load older chats'}
+              </button>
+            )}
           </div>
         )}
       </div>
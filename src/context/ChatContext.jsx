@@ -27,7 +27,9 @@ export const ChatProvider = ({ children }) => {
     setError(null);
     try {
       // Fetch chat history from the backend with user ID
-      const response = await axios.get(`http://127.0.0.1:4000/api/chat/history/${user?._id}`);
+      const response = await axios.get(`http://127.0.0.1:4000/api/chat/history/${user?._id}`, {
+        params: { limit: 20, fields: 'summary' }
+      });
       setMessages(response.data.messages || []); // Ensure messages are an array
     } catch (err) {
       console.error('Failed to fetch chat history:', err);
@@ -52,24 +54,74 @@ export const ChatProvider = ({ children }) => {
     setIsLoading(true);
     setError(null);
 
+    const botMessageId = `${Date.now() + 1}`;
+    const updateBotMessage = (changes) => {
+      setMessages((prevMessages) =>
+        prevMessages.map((msg) => (msg.id === botMessageId ? { ...msg, ...changes } : msg))
+      );
+    };
+
     try {
-      // Send the query to the Flask backend with user ID
-      const response = await axios.post('http://127.0.0.1:4000/api/chat', { 
-        query: text,
-        userId: user?._id 
+      // Stream the answer from the Flask backend as server-sent events
+      const response = await fetch('http://127.0.0.1:4000/api/chat/stream', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ query: text, userId: user?._id }),
       });
-
-      // Add bot response to the chat
-      const botMessage = {
-        id: `${Date.now() + 1}`,
-        text: Array.isArray(response.data.response)
-          ? response.data.response.join('\n') // Join bullet points into a single string
-          : response.data.response || 'No response available.',
-        sender: 'bot',
-        timestamp: new Date().toISOString(),
-      };
-
-      setMessages((prevMessages) => [...prevMessages, botMessage]);
+      if (!response.ok || !response.body) {
+        const data = await response.json().catch(() => ({}));
+        throw new Error(data.error || 'Failed to send message');
+      }
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      let answer = '';
+      let started = false;
+
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        // Events are separated by a blank line
+        const events = buffer.split('\n\n');
+        buffer = events.pop();
+        for (const rawEvent of events) {
+          const eventLine = rawEvent.split('\n').find((line) => line.startsWith('event: '));
+          const dataLine = rawEvent.split('\n').find((line) => line.startsWith('data: '));
+          if (!dataLine) continue;
+          const event = eventLine ? eventLine.slice(7) : 'message';
+          const data = JSON.parse(dataLine.slice(6));
+
+          if (event === 'error') {
+            throw new Error(data.error || 'Failed to send message');
+          } else if (event === 'done') {
+            // Use the stored message id so ratings reach the right history row
+            updateBotMessage({ id: data.message_id || botMessageId, answeredBy: data.answered_by });
+          } else {
+            answer += data.token;
+            if (!started) {
+              // Replace the loading animation with the answer as soon as the first token arrives
+              started = true;
+              setIsLoading(false);
+              setMessages((prevMessages) => [
+                ...prevMessages,
+                { id: botMessageId, text: answer, sender: 'bot', timestamp: new Date().toISOString() },
+              ]);
+            } else {
+              updateBotMessage({ text: answer });
+            }
+          }
+        }
+      }
+
+      if (!started) {
+        setMessages((prevMessages) => [
+          ...prevMessages,
+          { id: botMessageId, text: 'No response available.', sender: 'bot', timestamp: new Date().toISOString() },
+        ]);
+      }
     } catch (err) {
       console.error('Failed to send message:', err);
       setError('Failed to send message. Please try again.');
@@ -12,11 +12,64 @@ const ChatHistoryPage = () => {
   const { user } = useAuth();
   const navigate = useNavigate();
   const [sessions, setSessions] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(false);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState(null);
   const [searchQuery, setSearchQuery] = useState('');
   const [selectedSession, setSelectedSession] = useState(null);
 
+  // Transform the data to match our UI needs
+  const toSession = (chat) => ({
+    _id: chat._id,
+    id: chat._id.slice(-6),
+    title: chat.query.slice(0, 50) + (chat.query.length > 50 ? '...' : ''),
+    timestamp: chat.timestamp,
+    // Summary pages carry a shortened response; the full chat is fetched when opened
+    truncated: Boolean(chat.response_truncated),
+    messages: [
+      {
+        role: 'user',
+        content: chat.query,
+        timestamp: chat.timestamp
+      },
+      {
+        role: 'assistant',
+        content: chat.response,
+        timestamp: chat.timestamp
+      }
+    ]
+  });
+
+  const fetchPage = async (cursor) => {
+    const params = new URLSearchParams({ limit: '30', fields: 'summary' });
+    if (cursor) params.set('before', cursor);
+    const response = await fetch(`http://127.0.0.1:4000/api/chat/history/${user._id}?${params}`);
+    const data = await response.json();
+
+    if (!response.ok) {
+      throw new Error(data.error || 'Failed to fetch chat sessions');
+    }
+    return data;
+  };
+
+  const selectSession = async (session) => {
+    setSelectedSession(session);
+    if (!session.truncated) return;
+    try {
+      const response = await fetch(`http://127.0.0.1:4000/api/chat/history/${user._id}/${session._id}`);
+      const chat = await response.json();
+      if (!response.ok) {
+        throw new Error(chat.error || 'Failed to fetch chat');
+      }
+      const full = toSession(chat);
+      setSessions((prev) => prev.map((s) => (s._id === full._id ? full : s)));
+      setSelectedSession((current) => (current?._id === full._id ? full : current));
+    } catch (err) {
+      setError(err.message);
+    }
+  };
+
   const fetchSessions = async () => {
     if (!user?._id) {
       setError('Please log in to view chat history');
@@ -26,43 +79,35 @@ const ChatHistoryPage = () => {
     try {
       setLoading(true);
       setError(null);
-      const response = await fetch(`http://127.0.0.1:4000/api/chat/history/${user._id}`);
-      const data = await response.json();
-      
-      if (!response.ok) {
-        throw new Error(data.error || 'Failed to fetch chat sessions');
-      }
-      
-      // Transform the data to match our UI needs
-      const transformedData = Array.isArray(data) ? data.map(chat => ({
-        _id: chat._id,
-        id: chat._id.slice(-6),
-        title: chat.query.slice(0, 50) + (chat.query.length > 50 ? '...' : ''),
-        timestamp: chat.timestamp,
-        messages: [
-          {
-            role: 'user',
-            content: chat.query,
-            timestamp: chat.timestamp
-          },
-          {
-            role: 'assistant',
-            content: chat.response,
-            timestamp: chat.timestamp
-          }
-        ]
-      })) : [];
-      
+      const data = await fetchPage();
+      const transformedData = (data.items || []).map(toSession);
+
       setSessions(transformedData);
-      if (transformedData.length > 0) setSelectedSession(transformedData[0]);
+      setNextCursor(data.next_cursor);
+      if (transformedData.length > 0) selectSession(transformedData[0]);
     } catch (err) {
       setError(err.message);
       setSessions([]);
+      setNextCursor(null);
     } finally {
       setLoading(false);
     }
   };
 
+  const loadMore = async () => {
+    if (!nextCursor || loadingMore) return;
+    try {
+      setLoadingMore(true);
+      const data = await fetchPage(nextCursor);
+      setSessions((prev) => [...prev, ...(data.items || []).map(toSession)]);
+      setNextCursor(data.next_cursor);
+    } catch (err) {
+      setError(err.message);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   useEffect(() => {
     fetchSessions();
   }, [user]);
@@ -113,7 +158,7 @@ const ChatHistoryPage = () => {
                   className={`p-4 border-b border-border cursor-pointer transition-colors ${
                     selectedSession?._id === session._id ? 'bg-primary/5' : 'hover:bg-secondary/5'
                   }`}
-                  onClick={() => setSelectedSession(session)}
+                  onClick={() => selectSession(session)}
                 >
                   <div className="flex items-start gap-3">
                     <div className="flex-shrink-0 w-8 h-8 rounded-full bg-primary/10 flex items-center justify-center">
@@ -141,6 +186,15 @@ const ChatHistoryPage = () => {
               ))}
             </AnimatePresence>
           )}
+          {!loading && !error && nextCursor && !searchQuery && (
+            <button
+              onClick={loadMore}
+              disabled={loadingMore}
+              className="w-full p-3 text-sm text-primary hover:bg-secondary/5 disabled:opacity-50"
+            >
+              {loadingMore ? 'Loading...' : 'Load older chats'}
+            </button>
+          )}
         </div>
       </div>
 
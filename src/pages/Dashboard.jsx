@@ -11,21 +11,96 @@ const Dashboard = () => {
   });
   const [timetableData, setTimetableData] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [error, setError] = useState('');
+  // The Netra login to scrape: from the profile, or entered here once and remembered
+  const [mobileNumber, setMobileNumber] = useState(
+    user?.mobile_number || localStorage.getItem('netraMobileNumber') || ''
+  );
+  const [mobileInput, setMobileInput] = useState('');
+
+  useEffect(() => {
+    if (user?.mobile_number && !mobileNumber) {
+      setMobileNumber(user.mobile_number);
+    }
+  }, [user?.mobile_number]);
 
   useEffect(() => {
     // Fetch data when component mounts
-    fetchDashboardData();
-  }, []);
+    if (mobileNumber) {
+      setLoading(true);
+      fetchDashboardData();
+    } else {
+      setLoading(false);
+    }
+  }, [mobileNumber]);
+
+  const saveMobileNumber = async (e) => {
+    e.preventDefault();
+    const value = mobileInput.trim();
+    if (!/^\d{10}$/.test(value)) {
+      setError('Enter your 10-digit Netra mobile number');
+      return;
+    }
+    setError('');
+    localStorage.setItem('netraMobileNumber', value);
+    if (user?._id) {
+      // Stored on the profile too, so the morning cohort refresh includes this student
+      try {
+        await fetch('http://localhost:4000/api/auth/profile', {
+          method: 'PUT',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify({ userId: user._id, mobile_number: value })
+        });
+      } catch (err) {
+        console.error('Error saving mobile number:', err);
+      }
+    }
+    setMobileNumber(value);
+  };
 
-  const fetchDashboardData = async () => {
+  const changeMobileNumber = () => {
+    localStorage.removeItem('netraMobileNumber');
+    setMobileInput(mobileNumber);
+    setMobileNumber('');
+    setAttendanceData({ timestamp: '', sessions: [] });
+    setTimetableData([]);
+  };
+
+  const waitForRefresh = async (statusUrl) => {
+    // Poll the background refresh job until it finishes
+    for (let attempt = 0; attempt < 60; attempt++) {
+      await new Promise((resolve) => setTimeout(resolve, 2000));
+      const response = await fetch(`http://localhost:4000${statusUrl}`);
+      const job = await response.json();
+      if (!response.ok || job.status === 'done' || job.status === 'failed') {
+        return job.status === 'done';
+      }
+    }
+    return false;
+  };
+
+  const fetchDashboardData = async (afterRefresh = false) => {
     try {
-      const response = await fetch('http://localhost:4000/api/dashboard-data');
+      const response = await fetch(
+        `http://localhost:4000/api/dashboard-data?mobile_number=${encodeURIComponent(mobileNumber)}`
+      );
       const data = await response.json();
-      setAttendanceData(data.attendance);
-      setTimetableData(data.timetable);
+      if (!response.ok) {
+        setError(data.error || 'Could not load the dashboard');
+        setLoading(false);
+        return;
+      }
+      setError('');
+      // Stale or missing snapshots are served straight away and refreshed in the background
+      setAttendanceData({ timestamp: data.last_updated || '', sessions: data.sessions || [] });
+      setTimetableData(data.timetable || []);
       setLoading(false);
+      if (data.refresh && !afterRefresh && await waitForRefresh(data.refresh.status_url)) {
+        fetchDashboardData(true);
+      }
     } catch (error) {
       console.error('Error fetching dashboard data:', error);
+      setError('Could not reach the server, please try again');
       setLoading(false);
     }
   };
@@ -114,8 +189,48 @@ const Dashboard = () => {
         <p className="text-muted-foreground">
           Here's what's happening with your academic journey today.
         </p>
+        {mobileNumber && (
+          <button onClick={changeMobileNumber} className="mt-2 text-sm text-primary hover:underline">
+            Netra number {mobileNumber} · change
+          </button>
+        )}
       </motion.div>
 
+      {error && (
+        <motion.div
+          variants={itemVariants}
+          className="mb-8 p-4 rounded-lg border border-red-300 bg-red-50 text-red-700 flex items-center"
+        >
+          <AlertCircle className="mr-2 w-5 h-5" />
+          <span>{error}</span>
+        </motion.div>
+      )}
+
+      {!mobileNumber && (
+        <motion.form
+          variants={itemVariants}
+          onSubmit={saveMobileNumber}
+          className="mb-8 p-6 rounded-xl bg-card border border-border shadow-sm"
+        >
+          <label htmlFor="netraMobileNumber" className="block text-sm font-medium mb-2">
+            Enter your Netra mobile number to load your attendance and timetable
+          </label>
+          <div className="flex gap-2">
+            <input
+              id="netraMobileNumber"
+              type="tel"
+              value={mobileInput}
+              onChange={(e) => setMobileInput(e.target.value)}
+              placeholder="10-digit mobile number"
+              className="flex-1 px-3 py-2 border rounded-md"
+            />
+            <button type="submit" className="px-4 py-2 bg-primary text-white rounded-md">
+              Load dashboard
+            </button>
+          </div>
+        </motion.form>
+      )}
+
       {/* Stats Grid */}
       <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-4 gap-6 mb-8">
         {stats.map((stat, index) => (
@@ -0,0 +1,257 @@
+"""Write-behind queue for chat history writes.
+
+Requests enqueue inserts and updates and return straight away; a background
+thread writes them to Mongo with ordered bulk_write batches once the batch
+fills up or the flush interval passes. If Mongo can't be reached, or more
+than max_pending writes pile up in memory, writes go to an append-only spill
+file instead. While anything is spilled, newer writes are appended behind it
+so a rating can never reach Mongo before the chat it rates; the spill is
+replayed in order once Mongo answers again. Replays are safe to repeat:
+inserts carry client-side _ids (duplicates are skipped) and updates are $set.
+"""
+import os
+import time
+import signal
+import threading
+from collections import deque, Counter
+from bson import json_util
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+
+WRITE_BEHIND = os.environ.get('WRITE_BEHIND', '1') == '1'
+WRITE_BATCH_SIZE = int(os.environ.get('WRITE_BATCH_SIZE', '200'))
+WRITE_FLUSH_INTERVAL_MS = float(os.environ.get('WRITE_FLUSH_INTERVAL_MS', '100'))
+WRITE_MAX_PENDING = int(os.environ.get('WRITE_MAX_PENDING', '5000'))
+WRITE_SPILL_PATH = os.environ.get('WRITE_SPILL_PATH', 'chat_write_spill.jsonl')
+WRITE_RETRY_SECONDS = float(os.environ.get('WRITE_RETRY_SECONDS', '5'))
+
+DUPLICATE_KEY = 11000
+
+
+class WriteBehindQueue:
+    def __init__(self, collection, enabled=WRITE_BEHIND, batch_size=WRITE_BATCH_SIZE,
+                 flush_interval_ms=WRITE_FLUSH_INTERVAL_MS, max_pending=WRITE_MAX_PENDING,
+                 spill_path=WRITE_SPILL_PATH, retry_seconds=WRITE_RETRY_SECONDS):
+        self.collection = collection
+        self.enabled = enabled
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_pending = max_pending
+        self.spill_path = spill_path
+        self.draining_path = spill_path + '.draining'
+        self.retry_seconds = retry_seconds
+        self.counts = Counter()
+        self._buffer = deque()
+        self._lock = threading.Lock()  # buffer, spill file and spilling flag
+        self._flush_lock = threading.Lock()  # one writer to Mongo at a time
+        self._wake = threading.Event()
+        self._stopping = False
+        self._retry_at = 0.0
+        # Anything left on disk by a previous run is older than what comes next
+        self._spilling = os.path.exists(self.spill_path) or os.path.exists(self.draining_path)
+        self._thread = None
+        if enabled:
+            self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+            self._thread.start()
+
+    def insert(self, doc):
+        """Queue an insert; doc must already have its _id."""
+        self._enqueue({'op': 'insert', 'doc': doc})
+
+    def update(self, filter, update):
+        self._enqueue({'op': 'update', 'filter': filter, 'update': update})
+
+    def pending(self):
+        return len(self._buffer)
+
+    def pending_insert(self, _id):
+        """The queued (buffered or spilled) insert with this _id, or None."""
+        with self._lock:
+            for op in self._buffer:
+                if op['op'] == 'insert' and op['doc']['_id'] == _id:
+                    return op['doc']
+            if not self._spilling:
+                return None
+            for path in (self.draining_path, self.spill_path):
+                if not os.path.exists(path):
+                    continue
+                with open(path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        if line.strip():
+                            op = json_util.loads(line)
+                            if op['op'] == 'insert' and op['doc']['_id'] == _id:
+                                return op['doc']
+        return None
+
+    def _enqueue(self, op):
+        if not self.enabled:
+            unwritten = self._write([op])
+            if unwritten:
+                raise RuntimeError("Could not write to MongoDB")
+            return
+        with self._lock:
+            if self._spilling or len(self._buffer) >= self.max_pending:
+                if not self._spilling:
+                    self.counts['overflows'] += 1
+                # Keep order: whatever is buffered goes to disk ahead of this op
+                self._spill_locked(list(self._buffer) + [op])
+                self._buffer.clear()
+                return
+            self._buffer.append(op)
+            self.counts['queued'] += 1
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self._wake.set()
+
+    def _spill_locked(self, ops):
+        with open(self.spill_path, 'a', encoding='utf-8') as f:
+            for op in ops:
+                f.write(json_util.dumps(op) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self._spilling = True
+        self.counts['spilled'] += len(ops)
+
+    def _spill_ahead_locked(self, ops):
+        if not os.path.exists(self.spill_path):
+            self._spill_locked(ops)
+            return
+        tmp_path = self.spill_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as out, open(self.spill_path, 'r', encoding='utf-8') as existing:
+            for op in ops:
+                out.write(json_util.dumps(op) + '\n')
+            for line in existing:
+                out.write(line)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp_path, self.spill_path)
+        self.counts['spilled'] += len(ops)
+
+    def _write(self, ops):
+        """Ordered bulk write; returns the ops that still need writing (empty on success)."""
+        remaining = ops
+        while remaining:
+            requests = [
+                InsertOne(op['doc']) if op['op'] == 'insert' else UpdateOne(op['filter'], op['update'])
+                for op in remaining
+            ]
+            try:
+                self.collection.bulk_write(requests, ordered=True)
+                self.counts['written'] += len(remaining)
+                self.counts['batches'] += 1
+                return []
+            except BulkWriteError as e:
+                errors = e.details.get('writeErrors') or []
+                if not errors:
+                    return remaining
+                # Everything before the failed op went through; the failed op itself
+                # won't succeed on a retry either (duplicates are earlier replays)
+                error = errors[0]
+                self.counts['written'] += error['index']
+                if error.get('code') == DUPLICATE_KEY:
+                    self.counts['duplicates_skipped'] += 1
+                else:
+                    self.counts['dropped'] += 1
+                    print(f"Write-behind dropped a chat history write: {error.get('errmsg')}")
+                remaining = remaining[error['index'] + 1:]
+            except PyMongoError as e:
+                print(f"Write-behind flush failed, spilling to disk: {e}")
+                self.counts['flush_errors'] += 1
+                return remaining
+        return []
+
+    def _drain_spill(self):
+        # Replay spilled writes in order; returns False if Mongo is still unavailable
+        while True:
+            with self._lock:
+                if not os.path.exists(self.draining_path):
+                    if not os.path.exists(self.spill_path):
+                        self._spilling = False
+                        return True
+                    os.replace(self.spill_path, self.draining_path)
+            batch = []
+            with open(self.draining_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        batch.append(json_util.loads(line))
+                    if len(batch) >= self.batch_size:
+                        if self._write(batch):
+                            return False
+                        batch = []
+            if batch and self._write(batch):
+                return False
+            self.counts['replayed_files'] += 1
+            os.remove(self.draining_path)
+
+    def flush(self):
+        """Write everything queued so far; returns False if some of it had to stay on disk."""
+        with self._flush_lock:
+            if self._spilling:
+                if time.monotonic() < self._retry_at:
+                    return False
+                if not self._drain_spill():
+                    self._retry_at = time.monotonic() + self.retry_seconds
+                    return False
+            while True:
+                with self._lock:
+                    batch = [self._buffer.popleft() for _ in range(min(len(self._buffer), self.batch_size))]
+                if not batch:
+                    return True
+                unwritten = self._write(batch)
+                if unwritten:
+                    with self._lock:
+                        # The failed writes go to disk ahead of anything that overflowed
+                        # there meanwhile, and newer buffered writes follow them
+                        self._spill_ahead_locked(unwritten)
+                        self._spill_locked(list(self._buffer))
+                        self._buffer.clear()
+                    self._retry_at = time.monotonic() + self.retry_seconds
+                    return False
+
+    def _run(self):
+        while not self._stopping:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Write-behind error: {e}")
+
+    def close(self, timeout=10):
+        """Stop the flusher and write (or spill) whatever is left."""
+        if self._thread is None:
+            return
+        self._stopping = True
+        self._wake.set()
+        self._thread.join(timeout)
+        self._retry_at = 0.0
+        if not self.flush():
+            print(f"Write-behind: unwritten chat history kept in {self.spill_path} for the next start")
+        self._thread = None
+
+    def close_on_sigterm(self):
+        """Close the queue on SIGTERM (docker stop, systemd), which skips atexit."""
+        previous = signal.getsignal(signal.SIGTERM)
+
+        def handle(signum, frame):
+            self.close()
+            if callable(previous):
+                previous(signum, frame)
+            else:
+                raise SystemExit(128 + signum)
+
+        try:
+            signal.signal(signal.SIGTERM, handle)
+        except ValueError:
+            pass  # Not the main thread; the server running us handles shutdown
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'pending': len(self._buffer),
+            'spilling': self._spilling,
+            'batch_size': self.batch_size,
+            'flush_interval_ms': self.flush_interval * 1000,
+            'avg_batch': round(self.counts['written'] / self.counts['batches'], 1) if self.counts['batches'] else 0,
+            **self.counts
+        }